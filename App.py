@@ -1,21 +1,101 @@
-import openpyxl
-import matplotlib.pyplot as plt
 import numpy as np
-from openpyxl.drawing.image import Image
-from scipy.stats import linregress
-from scipy.integrate import simpson
-import tkinter as tk
-from tkinter import filedialog, messagebox
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import io
 import os
+import re
+from array import array
+from collections import namedtuple
+from contextlib import nullcontext
+
+from cache import ResultCache, hash_file, make_cache_key
+from curve import CURVE_DTYPES, Curve
+from ingest import CHUNK_ROWS, is_text_export, iter_text_export, load_dimensions_file, read_text_export
+from instrumentation import Instrumentation
+from plotting import EXCEL_IMAGE_ANCHOR, decimate_min_max, make_excel_image, render_stress_strain_png
+from sidecar import hash_source, load_sidecar_array, save_sidecar
 
 # File paths and constants
 SEARCH_WORDS = ['Force', 'Length, L', 'Width, W', 'Stroke', 'Thickness, T', 'Maximum Stress, σc']
+DATA_WORDS = ['Force', 'Stroke']
+DIMENSION_WORDS = ['Length, L', 'Width, W', 'Thickness, T']
+RESULT_WORDS = ['Stress', 'Strain', 'Maximum Stress, σc', 'Comp. Modulus, Ec']
+MODULUS_LABEL = 'Comp. Modulus, Ec'
+MODULUS_WINDOW_SIZE = 50
+MODULUS_STRAIN_SPAN = 1.0  # Strain (%) covered by each window when windows are chosen by strain span
+MODULUS_MIN_POINTS = 5  # Fewest points a strain-span modulus window may hold
+YIELD_OFFSET = 0.2  # Strain (%) between the modulus line and the offset-yield line
+PLATEAU_STRAIN_RANGE = (20, 30)  # Strain (%) over which the plateau stress is averaged
+YIELD_LABELS = {'toe_strain': 'Toe Strain', 'yield_stress': 'Offset Yield Stress, σy',
+                'yield_strain': 'Offset Yield Strain', 'plateau_stress': 'Plateau Stress, σpl'}
+ENERGY_STRAIN_PERCENTAGES = (10, 20, 30, 40, 50)
+OUTPUT_LAYOUTS = ('sheet', 'companion')
+HEADER_ROWS = 50  # Labels and specimen dimensions must sit within these first rows
+LABEL_INDEX_CACHE_SIZE = 64
+PROGRESS_ROWS = 5000  # Rows streamed between two progress reports
+POLL_INTERVAL_MS = 100  # How often the GUI checks on a running job
+EXCEL_MAX_ROWS = 1048576  # Rows a worksheet can hold
+RECORD_PART = re.compile(r'_part(\d+)$')  # Stem suffix of the continuation files of a split record
+
+# tkinter is only imported when the GUI starts, so headless runs never load it
+tk = filedialog = messagebox = ttk = None
+
+
+class AnalysisCancelled(Exception):
+    """Raised inside a running analysis when the user cancels it."""
+
+
+ModulusFit = namedtuple('ModulusFit', ['slope', 'intercept', 'r', 'start', 'end'])
+YieldResult = namedtuple('YieldResult', ['fit', 'toe_strain', 'yield_strain', 'yield_stress', 'plateau_stress'])
+# How a curve is read and fitted: its storage precision, the strain span (%) of the modulus windows
+# (None for MODULUS_WINDOW_SIZE points), the points written back (None for all) and whether further
+# sheets and part files continue the record
+AnalysisOptions = namedtuple('AnalysisOptions', ['dtype', 'modulus_span', 'output_points', 'join_parts'],
+                             defaults=('float64', None, None, False))
+
+
+def _import_tkinter():
+    """Import tkinter into the module globals used by the GUI."""
+    global tk, filedialog, messagebox, ttk
+    import tkinter as tk
+    from tkinter import filedialog, messagebox, ttk
+
+
+class ProgressFile(io.FileIO):
+    """Binary file that reports how many bytes have been read from it after every read.
+
+    openpyxl parses a workbook while it decompresses it, so the bytes read from the
+    archive follow the parsing. ``progress(bytes_read, file_size)`` may raise to stop it.
+    """
+
+    def __init__(self, file_path, progress):
+        super().__init__(file_path, 'rb')
+        self.progress = progress
+        self.size = os.fstat(self.fileno()).st_size
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        self.progress(self.bytes_read, self.size)
+        return data
+
+
+def load_excel(file_path, progress=None):
+    """Load an Excel workbook.
+
+    ``progress(bytes_read, file_size)`` is called as the file is read, and may raise
+    AnalysisCancelled to stop the load.
+    """
+    import openpyxl
 
-
-def load_excel(file_path):
-    """Load an Excel workbook."""
     try:
-        return openpyxl.load_workbook(file_path)
+        if progress is None:
+            return openpyxl.load_workbook(file_path)
+        with ProgressFile(file_path, progress) as f:
+            return openpyxl.load_workbook(f)
+    except AnalysisCancelled:
+        raise
     except Exception as e:
         raise FileNotFoundError(f"Failed to load file {file_path}: {e}")
 
@@ -42,101 +122,1012 @@ def find_second_cell_value(sheet, positions, word):
     return float(value)
 
 
-def calculate_stress_and_strain(file_path, search_words):
-    """Calculate and save stress and strain values in the Excel sheet."""
-    workbook = load_excel(file_path)
-    sheet = workbook.active
-    positions = find_words_in_excel(sheet, search_words + ['Stress', 'Strain'])
-
+class LabelIndex:
+    """Index of the text labels in the header region of a sheet.
+
+    Built from a single scan of the first ``header_rows`` rows, so its cost does not depend
+    on the length of the record. It maps every label to its cells, for exact and substring
+    lookups, and keeps the header-region values so the number two rows below a label can be
+    read without going back to the sheet.
+    """
+
+    def __init__(self, header_rows=HEADER_ROWS):
+        self.header_rows = header_rows
+        self.labels = {}
+        self.values = {}
+        self._substring_matches = {}
+
+    @classmethod
+    def from_cells(cls, cells, header_rows=HEADER_ROWS):
+        """Rebuild an index from the (row, column, value) triples given by :meth:`to_cells`."""
+        index = cls(header_rows)
+        for row, column, value in cells:
+            index.values[(row, column)] = value
+            if isinstance(value, str):
+                index.labels.setdefault(value, []).append((row, column))
+        return index
+
+    def to_cells(self):
+        """List the text and numeric values of the index as JSON-serializable (row, column, value) triples."""
+        return [[row, column, value] for (row, column), value in self.values.items()
+                if isinstance(value, (str, int, float))]
+
+    @classmethod
+    def from_sheet(cls, sheet, header_rows=HEADER_ROWS):
+        """Build the index from the header region of a loaded or read-only sheet."""
+        index = cls(header_rows)
+        last_row = min(header_rows, sheet.max_row or header_rows)
+        for row_index, row in enumerate(sheet.iter_rows(min_row=1, max_row=last_row, values_only=True), start=1):
+            index.add_row(row_index, row)
+        return index
+
+    def add_row(self, row_index, row):
+        """Add the values of one header-region row to the index."""
+        for column, value in enumerate(row, start=1):
+            if value is None:
+                continue
+            self.values[(row_index, column)] = value
+            if isinstance(value, str):
+                self.labels.setdefault(value, []).append((row_index, column))
+
+    def find(self, label, substring=False):
+        """Return the cells holding a label, exactly or as part of their text, in sheet order."""
+        if not substring:
+            return list(self.labels.get(label, []))
+        if label not in self._substring_matches:
+            self._substring_matches[label] = sorted(
+                cell for text, cells in self.labels.items() if label in text for cell in cells)
+        return list(self._substring_matches[label])
+
+    def positions(self, words):
+        """Return the cells of several labels, in the same form as find_words_in_excel."""
+        return {word: self.find(word) for word in words}
+
+    def value_below(self, word):
+        """Retrieve the numeric value two rows below the specified word."""
+        cells = self.find(word)
+        if not cells:
+            raise ValueError(f"'{word}' not found in the Excel file.")
+        row, col = cells[0]
+        value = self.values.get((row + 2, col))
+        if value is None or not isinstance(value, (int, float)):
+            raise ValueError(f"The cell two rows below '{word}' does not contain a numeric value.")
+        return float(value)
+
+
+_label_index_cache = {}
+
+
+def _label_index_key(file_path, header_rows):
+    """Identify a file's content by path, modification time and size."""
+    stat = os.stat(file_path)
+    return os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, header_rows
+
+
+def cache_label_index(file_path, index):
+    """Keep the label index of an unchanged file for the next time it is opened."""
+    if len(_label_index_cache) >= LABEL_INDEX_CACHE_SIZE:
+        _label_index_cache.pop(next(iter(_label_index_cache)))
+    _label_index_cache[_label_index_key(file_path, index.header_rows)] = index
+
+
+def get_label_index(sheet, file_path=None, header_rows=HEADER_ROWS):
+    """Return the label index of a sheet, reusing the one cached for its unchanged file.
+
+    The cache lives in this process; a pipeline with a sidecar refills it from the labels
+    stored there (see :func:`sidecar.save_sidecar`).
+    """
+    if file_path is None:
+        return LabelIndex.from_sheet(sheet, header_rows)
+    index = _label_index_cache.get(_label_index_key(file_path, header_rows))
+    if index is None:
+        index = LabelIndex.from_sheet(sheet, header_rows)
+        cache_label_index(file_path, index)
+    return index
+
+
+def get_updated_file_path(file_path):
+    """Build the path of the updated file, in the same directory as the input file."""
+    directory = os.path.dirname(file_path)  # Get the directory of the input file
+    updated_file_name = 'updated_' + os.path.basename(file_path)  # Create the updated file name
+    return os.path.join(directory, updated_file_name)  # Full path for the updated file
+
+
+def read_numeric_column(sheet, header_row, column):
+    """Read the numeric values below a header into an array in one column sweep."""
+    values = next(sheet.iter_cols(min_row=header_row + 1, max_row=max(sheet.max_row, header_row + 1),
+                                  min_col=column, max_col=column, values_only=True), ())
+    numeric = np.fromiter((isinstance(v, (int, float)) for v in values), dtype=bool, count=len(values))
+    return np.array(values, dtype=object)[numeric].astype(float)
+
+
+def read_data_column(sheet, positions, word):
+    """Read every numeric value below each occurrence of a header as one array."""
+    columns = [read_numeric_column(sheet, row, col) for row, col in positions.get(word, [])]
+    return np.concatenate(columns) if columns else np.empty(0)
+
+
+def read_data_columns(sheet, positions, data_words=DATA_WORDS):
+    """Read the columns of several data words, keeping only the rows where all of them are numeric.
+
+    The k-th header of each word is paired with the k-th header of the others, and a row
+    with a blank or text cell in any column of the pair is left out of all of them, so
+    the columns stay aligned. Headers without a partner are read as in :func:`read_data_column`.
+    """
+    occurrences = [positions.get(word, []) for word in data_words]
+    paired = min(map(len, occurrences))
+    parts = {word: [] for word in data_words}
+    for k in range(paired):
+        headers = [found[k] for found in occurrences]
+        first_row = min(row for row, _ in headers) + 1  # Header cells below it are text and drop out
+        last_row = max(sheet.max_row, first_row)
+        values = [next(sheet.iter_cols(min_row=first_row, max_row=last_row, min_col=col, max_col=col,
+                                       values_only=True), ()) for _, col in headers]
+        numeric = np.logical_and.reduce([np.fromiter((isinstance(v, (int, float)) for v in column), dtype=bool,
+                                                     count=len(column)) for column in values])
+        for word, column in zip(data_words, values):
+            parts[word].append(np.array(column, dtype=object)[numeric].astype(float))
+    for word, found in zip(data_words, occurrences):
+        parts[word].extend(read_numeric_column(sheet, row, col) for row, col in found[paired:])
+    return {word: np.concatenate(parts[word]) if parts[word] else np.empty(0) for word in data_words}
+
+
+def write_column(sheet, header_row, column, values):
+    """Write values into a column starting two rows below its header."""
+    values = np.asarray(values).tolist()
+    if not values:
+        return
+    first_row = header_row + 2
+    cells = sheet.iter_rows(min_row=first_row, max_row=first_row + len(values) - 1,
+                            min_col=column, max_col=column)
+    for (cell,), value in zip(cells, values):
+        cell.value = value
+
+
+def compute_stress_and_strain(force, stroke, length, width, thickness):
+    """Convert Force and Stroke arrays into stress (MPa) and strain (%) arrays."""
+    stress = np.asarray(force, dtype=float) / (length * width)
+    strain = (np.asarray(stroke, dtype=float) / thickness) * 100
+    return stress, strain
+
+
+def extract_stress_and_strain(sheet, positions):
+    """Calculate stress and strain arrays from the Force and Stroke columns of a sheet."""
     # Extract required values
     length = find_second_cell_value(sheet, positions, 'Length, L')
     width = find_second_cell_value(sheet, positions, 'Width, W')
     thickness = find_second_cell_value(sheet, positions, 'Thickness, T')
 
-    # Calculate stress
-    stress = []
-    for force_row, force_col in positions.get('Force', []):
-        for r in range(force_row + 1, sheet.max_row + 1):
-            force = sheet.cell(row=r, column=force_col).value
-            if isinstance(force, (int, float)):
-                stress.append(force / (length * width))
-
-    # Save stress
-    if 'Stress' in positions:
-        stress_row, stress_col = positions['Stress'][0]
-        for i, s in enumerate(stress):
-            sheet.cell(row=stress_row + i + 2, column=stress_col, value=s)
-
-    # Calculate strain
-    strain = []
-    for stroke_row, stroke_col in positions.get('Stroke', []):
-        for r in range(stroke_row + 1, sheet.max_row + 1):
-            stroke = sheet.cell(row=r, column=stroke_col).value
-            if isinstance(stroke, (int, float)):
-                strain.append((stroke / thickness) * 100)
-
-    # Save strain
-    if 'Strain' in positions:
-        strain_row, strain_col = positions['Strain'][0]
-        for i, st in enumerate(strain):
-            sheet.cell(row=strain_row + i + 2, column=strain_col, value=st)
-
-    # Save the updated file in the same directory as the input file
-    directory = os.path.dirname(file_path)  # Get the directory of the input file
-    updated_file_name = 'updated_' + os.path.basename(file_path)  # Create the updated file name
-    updated_file_path = os.path.join(directory, updated_file_name)  # Full path for the updated file
+    # Calculate stress and strain
+    columns = read_data_columns(sheet, positions, ['Force', 'Stroke'])
+    return compute_stress_and_strain(columns['Force'], columns['Stroke'], length, width, thickness)
+
+
+def _take_chunk(buffers, data_words, whole=False):
+    """Move the buffered values of every data word into one array each, emptying those buffers.
+
+    Unless ``whole``, only the first column of each word is taken; its later columns hold
+    the continuation of the record and wait until the end of the sheet.
+    """
+    chunk = {}
+    for word in data_words:
+        columns = [values for buffer_word, _, values in buffers if buffer_word == word]
+        parts = []
+        for values in (columns if whole else columns[:1]):
+            parts.append(np.array(values, dtype=float))
+            del values[:]
+        chunk[word] = np.concatenate(parts) if parts else np.empty(0)
+    return chunk
+
+
+def _group_buffers(buffers, data_words):
+    """Pair the k-th buffered column of each data word, so their rows are kept or dropped together.
+
+    Returns tuples of (column, values); columns without a partner form a tuple of their own.
+    """
+    by_word = [[(column, values) for buffer_word, column, values in buffers if buffer_word == word]
+               for word in data_words]
+    paired = min(map(len, by_word))
+    return ([tuple(found[k] for found in by_word) for k in range(paired)]
+            + [(entry,) for found in by_word for entry in found[paired:]])
+
+
+def iter_excel_chunks(file_path, data_words=DATA_WORDS, header_rows=HEADER_ROWS, chunk_rows=CHUNK_ROWS,
+                      progress=None, join_parts=False):
+    """Stream the data columns of a workbook in read-only mode, a chunk of rows at a time.
+
+    The active sheet comes first, and its header region feeds a LabelIndex, which is
+    yielded once that region has been read. With ``join_parts`` the data then continues on
+    every other worksheet that names the data words within its first ``header_rows`` rows,
+    in workbook order, so a record too long for one sheet can be split over several; other
+    sheets are never read without it. Every following
+    item is a dict with one array per data word. As in :func:`read_data_columns`, a row is
+    only kept if every column of a pair is numeric, and a word with several columns on one
+    sheet continues from one column to the next, so its later columns are only yielded at
+    the end of their sheet.
+
+    ``progress(rows_read, total_rows)`` is called every PROGRESS_ROWS rows; total_rows is
+    None when a sheet does not record its size. The callback may raise to stop the scan.
+    """
+    import openpyxl
 
-    workbook.save(updated_file_path)
-    return stress, strain, updated_file_path
+    try:
+        workbook = openpyxl.load_workbook(file_path, read_only=True)
+    except Exception as e:
+        raise FileNotFoundError(f"Failed to load file {file_path}: {e}")
 
+    index = LabelIndex(header_rows)
+    try:
+        sheets = [workbook.active]
+        if join_parts:
+            sheets += [sheet for sheet in workbook.worksheets if sheet is not workbook.active]
+        sizes = [sheet.max_row for sheet in sheets]
+        total_rows = None if None in sizes else sum(sizes)
+        rows_read = 0
+        yielded_index = False
+        for number, sheet in enumerate(sheets):
+            buffers = []  # (word, column, values) for every data header found on this sheet
+            groups = []  # The buffers read together, see _group_buffers
+            for row_index, row in enumerate(sheet.iter_rows(min_row=1, values_only=True), start=1):
+                rows_read += 1
+                if progress is not None and rows_read % PROGRESS_ROWS == 0:
+                    progress(rows_read, total_rows)
+
+                for group in groups:
+                    cells = [row[column - 1] if column <= len(row) else None for column, _ in group]
+                    if all(isinstance(value, (int, float)) for value in cells):
+                        for (_, values), value in zip(group, cells):
+                            values.append(value)
+
+                if row_index <= header_rows:
+                    if number == 0:
+                        index.add_row(row_index, row)
+                    for column, value in enumerate(row, start=1):
+                        if value.__class__ is str and value in data_words:
+                            buffers.append((value, column, array('d')))
+                            groups = _group_buffers(buffers, data_words)
+                    if number == 0 and row_index == header_rows:
+                        yielded_index = True
+                        yield index
+                elif not buffers:
+                    break  # No data on this sheet
+                elif row_index % chunk_rows == 0:
+                    yield _take_chunk(buffers, data_words)
+            if not yielded_index:
+                yielded_index = True
+                yield index  # The sheet ended within the header region
+            if buffers:
+                yield _take_chunk(buffers, data_words, whole=True)
+    finally:
+        workbook.close()
+    if progress is not None:
+        progress(total_rows or rows_read, total_rows)
+
+
+def stream_excel(file_path, data_words=DATA_WORDS, header_rows=HEADER_ROWS, progress=None, join_parts=False):
+    """Scan a workbook once in read-only mode for its labels, dimensions and data columns.
+
+    Rows are streamed as plain values, so no Cell objects are built and memory only grows
+    with the numbers kept from the data columns. The header region feeds a LabelIndex on
+    the way, in the same pass as the data, which with ``join_parts`` continues on any
+    further sheet holding the data headers (see :func:`iter_excel_chunks`). Returns the
+    index and one array per data word.
+
+    ``progress(rows_read, total_rows)`` is called every PROGRESS_ROWS rows; total_rows is
+    None when the workbook does not record its size. The callback may raise to stop the scan.
+    """
+    chunks = iter_excel_chunks(file_path, data_words, header_rows, progress=progress, join_parts=join_parts)
+    index = next(chunks)
+    parts = {word: [] for word in data_words}
+    for chunk in chunks:
+        for word in data_words:
+            parts[word].append(chunk[word])
+    cache_label_index(file_path, index)
+    columns = {word: np.concatenate(parts[word]) if parts[word] else np.empty(0) for word in data_words}
+    return index, columns
+
+
+def read_workbook_data(workbook, positions, data_words=DATA_WORDS, header_rows=HEADER_ROWS, join_parts=False):
+    """Read the data columns of a loaded workbook's active sheet.
+
+    With ``join_parts`` they continue on every further sheet that has the data headers.
+    """
+    first = read_data_columns(workbook.active, positions, data_words)
+    parts = {word: [first[word]] for word in data_words}
+    for sheet in workbook.worksheets:
+        if sheet is workbook.active or not join_parts:
+            continue
+        sheet_positions = LabelIndex.from_sheet(sheet, header_rows).positions(data_words)
+        if any(sheet_positions.get(word) for word in data_words):
+            columns = read_data_columns(sheet, sheet_positions, data_words)
+            for word in data_words:
+                parts[word].append(columns[word])
+    return {word: np.concatenate(parts[word]) for word in data_words}
+
+
+def get_record_parts(file_path):
+    """List the files of a record split over several files.
+
+    The first file is the one given; ``<stem>_part2<ext>``, ``<stem>_part3<ext>``, ... next
+    to it continue the record for as long as they exist.
+    """
+    stem, extension = os.path.splitext(file_path)
+    parts = [file_path]
+    while os.path.exists(f"{stem}_part{len(parts) + 1}{extension}"):
+        parts.append(f"{stem}_part{len(parts) + 1}{extension}")
+    return parts
+
+
+def is_record_part(file_path):
+    """Check whether a file continues a split record (``<stem>_part2<ext>`` and later)."""
+    match = RECORD_PART.search(os.path.splitext(os.path.basename(file_path))[0])
+    return bool(match) and int(match.group(1)) >= 2
+
+
+def hash_record(file_path, join_parts=False):
+    """Hash the content of a record, combining the hashes of its part files with ``join_parts``.
+
+    The ``.specimen.json`` giving the dimensions of a text export is hashed with it.
+    """
+    parts = get_record_parts(file_path) if join_parts else [file_path]
+    if len(parts) == 1:
+        return hash_source(file_path)
+    return make_cache_key([hash_source(parts[0])] + [hash_file(part) for part in parts[1:]])
+
+
+def read_part_columns(parts, data_words=DATA_WORDS, join_parts=False):
+    """Read and join the data columns of the continuation files of a record; see :func:`stream_excel`."""
+    columns = {word: [] for word in data_words}
+    for part in parts:
+        if is_text_export(part):
+            part_columns, _ = read_text_export(part, data_words)
+        else:
+            _, part_columns = stream_excel(part, data_words, join_parts=join_parts)
+        for word in data_words:
+            columns[word].append(part_columns[word])
+    return {word: np.concatenate(columns[word]) if columns[word] else np.empty(0) for word in data_words}
+
+
+def iter_record(file_path, data_words=DATA_WORDS, chunk_rows=CHUNK_ROWS, join_parts=False):
+    """Read a whole test record as one stream of chunks, across its sheets and part files with ``join_parts``.
+
+    Yields the (length, width, thickness) of the specimen first, from the first file,
+    then one dict of arrays per data word for every chunk of at most about ``chunk_rows``
+    rows, so any length of record is read in bounded memory.
+    """
+    for number, part in enumerate(get_record_parts(file_path) if join_parts else [file_path]):
+        if is_text_export(part):
+            chunks = iter_text_export(part, data_words, DIMENSION_WORDS if number == 0 else (), chunk_rows)
+            dimensions = next(chunks)
+            if number == 0:
+                for word, value in load_dimensions_file(part, DIMENSION_WORDS).items():
+                    dimensions.setdefault(word, value)
+                yield get_text_dimensions(part, dimensions)
+        else:
+            chunks = iter_excel_chunks(part, data_words, chunk_rows=chunk_rows, join_parts=join_parts)
+            index = next(chunks)
+            if number == 0:
+                yield tuple(index.value_below(word) for word in DIMENSION_WORDS)
+        for chunk in chunks:
+            yield {word: chunk[word] for word in data_words}
+
+
+def get_text_dimensions(file_path, dimensions):
+    """Order the dimensions read from a text export as (length, width, thickness)."""
+    for word in DIMENSION_WORDS:
+        if word not in dimensions:
+            raise ValueError(f"'{word}' not found in the header block of {file_path} or its .specimen.json file.")
+    return tuple(dimensions[word] for word in DIMENSION_WORDS)
+
+
+def read_stress_and_strain(file_path, join_parts=False):
+    """Stream a workbook in read-only mode, or a CSV/TXT export, and return its stress and strain arrays."""
+    if is_text_export(file_path):
+        columns, dimensions = read_text_export(file_path, DATA_WORDS, DIMENSION_WORDS)
+        length, width, thickness = get_text_dimensions(file_path, dimensions)
+    else:
+        index, columns = stream_excel(file_path, join_parts=join_parts)
+        length, width, thickness = (index.value_below(word) for word in DIMENSION_WORDS)
+    return compute_stress_and_strain(columns['Force'], columns['Stroke'], length, width, thickness)
+
+
+def write_stress_and_strain(sheet, positions, stress, strain):
+    """Write stress and strain values below their headers."""
+    if positions.get('Stress'):
+        write_column(sheet, *positions['Stress'][0], stress)
+    if positions.get('Strain'):
+        write_column(sheet, *positions['Strain'][0], strain)
+
+
+def write_maximum_stress(sheet, positions, max_stress):
+    """Write the maximum stress two rows below its label."""
+    if not positions.get('Maximum Stress, σc'):
+        raise ValueError("'Maximum Stress, σc' not found in the Excel file.")
+    max_stress_row, max_stress_col = positions['Maximum Stress, σc'][0]
+    sheet.cell(row=max_stress_row + 2, column=max_stress_col, value=max_stress)
 
-def plot_stress_strain_curve(stress, strain, file_path):
-    """Plot and save the stress-strain curve to the Excel file."""
+
+def sliding_window_regression(stress, strain, window_size=MODULUS_WINDOW_SIZE):
+    """Fit a line to every window of the curve in one pass.
+
+    The sums of x, y, x², y² and xy over each window come from cumulative sums, so the
+    whole scan costs O(n) whatever the window size. Returns the slope, intercept and
+    correlation coefficient r of each window, in the same way as scipy.stats.linregress.
+    Windows where every strain value is identical have no fit and get a NaN r.
+    """
+    if window_size < 2:
+        raise ValueError("The modulus window must contain at least 2 points.")
+    x = np.asarray(strain, dtype=float)
+    y = np.asarray(stress, dtype=float)
+    if len(x) != len(y):
+        raise ValueError("Stress and strain lengths mismatch.")
+    if len(x) < window_size:
+        empty = np.empty(0)
+        return empty, empty, empty
+
+    # Centre the data so the running sums stay small and lose less precision
+    x_offset, y_offset = x.mean(), y.mean()
+    x = x - x_offset
+    y = y - y_offset
+
+    def window_sums(values):
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        return cumulative[window_size:] - cumulative[:-window_size]
+
+    sum_x, sum_y = window_sums(x), window_sums(y)
+    ss_x = window_sums(x * x) - sum_x * sum_x / window_size
+    ss_y = window_sums(y * y) - sum_y * sum_y / window_size
+    ss_xy = window_sums(x * y) - sum_x * sum_y / window_size
+
+    # Rounding can leave tiny negative sums of squares for flat windows
+    ss_x = np.maximum(ss_x, 0.0)
+    ss_y = np.maximum(ss_y, 0.0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.where(ss_x > 0, ss_xy / ss_x, np.nan)
+        r = np.where(ss_y > 0, ss_xy / np.sqrt(ss_x * ss_y), 0.0)
+    r = np.where(ss_x > 0, np.clip(r, -1.0, 1.0), np.nan)
+    intercept = (sum_y / window_size + y_offset) - slope * (sum_x / window_size + x_offset)
+    return slope, intercept, r
+
+
+def find_best_modulus_window(stress, strain, window_size=MODULUS_WINDOW_SIZE):
+    """Find the window of the curve with the highest correlation coefficient.
+
+    Returns a ModulusFit whose start and end are the slice indices of the window
+    (``strain[start:end]``), or None when the curve is shorter than the window.
+    On ties the earliest window wins, as in the original linregress loop.
+    """
+    slope, intercept, r = sliding_window_regression(stress, strain, window_size)
+    if not len(r) or np.all(np.isnan(r)):
+        return None
+    best = int(np.nanargmax(r))
+
+    # Refit the chosen window directly so the reported values carry no running-sum rounding
+    return fit_modulus_window(stress, strain, best, window_size)
+
+
+def fit_modulus_window(stress, strain, start, window_size=MODULUS_WINDOW_SIZE):
+    """Fit a line to the window of the curve starting at ``start`` and return it as a ModulusFit."""
+    x = np.asarray(strain, dtype=float)[start:start + window_size]
+    y = np.asarray(stress, dtype=float)[start:start + window_size]
+    dx, dy = x - x.mean(), y - y.mean()
+    ss_x, ss_y, ss_xy = np.dot(dx, dx), np.dot(dy, dy), np.dot(dx, dy)
+    slope = ss_xy / ss_x
+    r = float(np.clip(ss_xy / np.sqrt(ss_x * ss_y), -1.0, 1.0)) if ss_y > 0 else 0.0
+    intercept = y.mean() - slope * x.mean()
+    return ModulusFit(float(slope), float(intercept), r, start, start + window_size)
+
+
+def compute_compression_modulus(stress, strain, window_size=MODULUS_WINDOW_SIZE):
+    """Return the slope of the most linear window of the stress-strain curve."""
+    fit = find_best_modulus_window(stress, strain, window_size)
+    return fit.slope if fit else 0
+
+
+def write_compression_modulus(sheet, modulus, index=None):
+    """Write the compression modulus two rows below every 'Comp. Modulus, Ec' label."""
+    index = index or LabelIndex.from_sheet(sheet)
+    for row, col in index.find(MODULUS_LABEL):
+        sheet.cell(row=row + 2, column=col, value=modulus)
+
+
+def _join_curves(curves):
+    """Join (stress, strain) curves end to end for the batched calculations.
+
+    Returns the joined stress and strain, the start and length of each curve and the
+    curve number of every point. Empty curves are skipped; the indices of the curves kept
+    come last.
+    """
+    kept = [k for k, (stress, _) in enumerate(curves) if len(stress)]
+    lengths = np.array([len(curves[k][0]) for k in kept], dtype=np.intp)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.intp)
+    stress = np.concatenate([np.asarray(curves[k][0], dtype=float) for k in kept]) if kept else np.empty(0)
+    strain = np.concatenate([np.asarray(curves[k][1], dtype=float) for k in kept]) if kept else np.empty(0)
     if len(stress) != len(strain):
         raise ValueError("Stress and strain lengths mismatch.")
+    owner = np.repeat(np.arange(len(kept)), lengths)
+    return stress, strain, starts, lengths, owner, kept
+
+
+def _strain_keys(strain, owner, low, high):
+    """Scale the running maximum strain of each joined curve into [0, 1) and add its curve number.
+
+    The keys never decrease along the joined curves, so one searchsorted locates strain
+    values in every curve at once. Returns the keys and the scale; strain s of curve k
+    has the key (s - low) / scale + k.
+    """
+    scale = (high - low) * (1 + 1e-9) or 1.0
+    return np.maximum.accumulate((strain - low) / scale + owner), scale
+
+
+def span_window_regression(stress, strain, strain_span=MODULUS_STRAIN_SPAN, min_points=MODULUS_MIN_POINTS,
+                           starts=(0,)):
+    """Fit a line to the window starting at every point, covering ``strain_span`` % strain.
+
+    A window holds the points whose (running maximum) strain lies within the span of its
+    first point, so sparse and dense records are fitted over the same part of the curve.
+    The window sums come from prefix sums, so the scan is O(n) whatever the span. Several
+    curves can be scanned together by joining them and giving the ``starts`` of each.
+
+    Returns the slope, intercept and r of each window, plus its end (exclusive). Windows
+    that hold fewer than ``min_points`` points or run past the end of their curve, and
+    windows whose strain values are all identical, get a NaN r.
+    """
+    x = np.asarray(strain, dtype=float)
+    y = np.asarray(stress, dtype=float)
+    if len(x) != len(y):
+        raise ValueError("Stress and strain lengths mismatch.")
+    if not len(x):
+        empty = np.empty(0)
+        return empty, empty, empty, np.empty(0, dtype=np.intp)
+    starts = np.asarray(starts, dtype=np.intp)
+    lengths = np.diff(np.append(starts, len(x)))
+    owner = np.repeat(np.arange(len(starts)), lengths)
+    stops = (starts + lengths)[owner]
+
+    keys, scale = _strain_keys(x, owner, x.min(), x.max())
+    end = np.minimum(np.searchsorted(keys, keys + strain_span / scale, side='right'), stops)
+    count = end - np.arange(len(x))
+
+    # Centre each curve on its own means so the prefix sums stay small and lose less precision
+    x_offset = (np.add.reduceat(x, starts) / lengths)[owner]
+    y_offset = (np.add.reduceat(y, starts) / lengths)[owner]
+    x = x - x_offset
+    y = y - y_offset
+
+    def window_sums(values):
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        return cumulative[end] - cumulative[:-1]
+
+    sum_x, sum_y = window_sums(x), window_sums(y)
+    ss_x = np.maximum(window_sums(x * x) - sum_x * sum_x / count, 0.0)
+    ss_y = np.maximum(window_sums(y * y) - sum_y * sum_y / count, 0.0)
+    ss_xy = window_sums(x * y) - sum_x * sum_y / count
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.where(ss_x > 0, ss_xy / ss_x, np.nan)
+        r = np.where(ss_y > 0, ss_xy / np.sqrt(ss_x * ss_y), 0.0)
+    valid = (ss_x > 0) & (count >= min_points) & (end < stops)
+    r = np.where(valid, np.clip(r, -1.0, 1.0), np.nan)
+    intercept = (sum_y / count + y_offset) - slope * (sum_x / count + x_offset)
+    return slope, intercept, r, end
+
+
+def _best_span_fits(stress, strain, starts, owner, strain_span, min_points, limits=None):
+    """Find the strain-span window with the highest r in each joined curve, as ModulusFits local to each curve.
+
+    With ``limits`` (one exclusive end per curve) only the windows ending within them are considered.
+    """
+    _, _, r, end = span_window_regression(stress, strain, strain_span, min_points, starts)
+    filled = np.where(np.isnan(r), -np.inf, r)
+    if limits is not None:
+        filled = np.where(end <= limits[owner], filled, -np.inf)
+    best_r = np.maximum.reduceat(filled, starts)
+    positions = np.arange(len(r))
+    # The earliest of equally good windows wins, as with fixed windows
+    best = np.minimum.reduceat(np.where(filled == best_r[owner], positions, len(r)), starts)
+    stops = np.append(starts[1:], len(r))
+    fits = []
+    for k, start in enumerate(starts):
+        if np.isneginf(best_r[k]):
+            fits.append(None)
+            continue
+        curve_stress, curve_strain = stress[start:stops[k]], strain[start:stops[k]]
+        fits.append(fit_modulus_window(curve_stress, curve_strain, int(best[k] - start), int(end[best[k]] - best[k])))
+    return fits
+
+
+def find_best_span_window(stress, strain, strain_span=MODULUS_STRAIN_SPAN, min_points=MODULUS_MIN_POINTS):
+    """Find the window covering ``strain_span`` % strain with the highest correlation coefficient.
+
+    Returns a ModulusFit, or None when no window of the curve covers the span with at
+    least ``min_points`` points.
+    """
+    return find_best_span_windows([(stress, strain)], strain_span, min_points)[0]
+
+
+def find_best_span_windows(curves, strain_span=MODULUS_STRAIN_SPAN, min_points=MODULUS_MIN_POINTS):
+    """Find the best strain-span modulus window of every (stress, strain) curve in one pass."""
+    stress, strain, starts, _, owner, kept = _join_curves(curves)
+    fits = [None] * len(curves)
+    if kept:
+        for k, fit in zip(kept, _best_span_fits(stress, strain, starts, owner, strain_span, min_points)):
+            fits[k] = fit
+    return fits
+
+
+def _loading_ends(stress, strain, starts, owner, plateau_start):
+    """Return the (exclusive) end of the initial loading region of each joined curve.
+
+    The region runs up to the highest stress reached before ``plateau_start`` % strain, so
+    it stops at the first peak of a curve that softens and at the plateau of one that does
+    not. A curve with no point before that strain keeps all of its points.
+    """
+    positions = np.arange(len(stress))
+    stops = np.append(starts[1:], len(stress))
+    rising = np.where(strain <= plateau_start, stress, -np.inf)
+    peak = np.maximum.reduceat(rising, starts)
+    first_peak = np.minimum.reduceat(np.where(rising == peak[owner], positions, len(stress)), starts)
+    return np.where(np.isneginf(peak), stops, first_peak + 1)
+
+
+def _loading_fits(stress, strain, starts, owner, plateau_start, window_size, strain_span, min_points):
+    """Find the best modulus window within the loading region of each joined curve, as ModulusFits local to each curve."""
+    ends = _loading_ends(stress, strain, starts, owner, plateau_start)
+    if strain_span:
+        return _best_span_fits(stress, strain, starts, owner, strain_span, min_points, ends)
+    return [find_best_modulus_window(stress[start:end], strain[start:end], window_size)
+            for start, end in zip(starts, ends)]
+
+
+def find_loading_fits(curves, plateau_start=PLATEAU_STRAIN_RANGE[0], window_size=MODULUS_WINDOW_SIZE,
+                      strain_span=None, min_points=MODULUS_MIN_POINTS):
+    """Find the modulus line of the initial loading region of every (stress, strain) curve.
+
+    Ec is the most linear window anywhere on the curve, which on a foam can lie in the
+    densification region; the toe and the offset yield are taken from the most linear
+    window before the plateau or first peak instead (see :func:`_loading_ends`). The
+    windows hold ``window_size`` points, or cover ``strain_span`` % strain if given.
+    Returns one ModulusFit per curve, or None where no window fits in the region.
+    """
+    stress, strain, starts, _, owner, kept = _join_curves(curves)
+    fits = [None] * len(curves)
+    if kept:
+        local = _loading_fits(stress, strain, starts, owner, plateau_start, window_size, strain_span, min_points)
+        for k, fit in zip(kept, local):
+            fits[k] = fit
+    return fits
+
+
+def compute_yield_batch(curves, fits=None, offset=YIELD_OFFSET, plateau_range=PLATEAU_STRAIN_RANGE,
+                        strain_span=None, min_points=MODULUS_MIN_POINTS, window_size=MODULUS_WINDOW_SIZE):
+    """Find the toe correction, offset yield and plateau stress of many curves in one call.
+
+    Each curve's modulus line is the given fit or, when ``fits`` is None, the best window
+    of its loading region as found by :func:`find_loading_fits`, over windows of
+    ``window_size`` points or, given ``strain_span``, of that much strain (%) as for Ec.
+    The toe strain is where that line meets zero stress (never below 0).
+    The offset yield is the first point past the start of the fit where the curve falls
+    below the line shifted right by ``offset`` % strain from the toe, interpolated between
+    the points either side. The plateau stress is the mean stress over ``plateau_range``,
+    i.e. the trapezoid integral between its two strains divided by their difference.
+
+    All curves are joined into one array, so the crossings and the integrals come from a
+    handful of vectorized passes and prefix sums over every point at once. Returns one
+    YieldResult per curve; values that cannot be found (no fit, no crossing, a curve that
+    does not cover the plateau range) are None.
+    """
+    stress, strain, starts, lengths, owner, kept = _join_curves(curves)
+    results = [YieldResult(None, None, None, None, None)] * len(curves)
+    if not kept:
+        return results
+    if fits is None:
+        fits = _loading_fits(stress, strain, starts, owner, plateau_range[0], window_size, strain_span, min_points)
+    else:
+        fits = [fits[k] for k in kept]
+    stops = starts + lengths
+    positions = np.arange(len(stress))
+
+    usable = np.array([fit is not None and fit.slope > 0 for fit in fits])
+    slope = np.array([fit.slope if ok else np.nan for fit, ok in zip(fits, usable)])
+    intercept = np.array([fit.intercept if ok else np.nan for fit, ok in zip(fits, usable)])
+    fit_start = starts + np.array([fit.start if ok else 0 for fit, ok in zip(fits, usable)])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        toe = np.maximum(-intercept / slope, 0.0)
+
+    # Offset yield: the first point where the curve drops below the offset line
+    distance = stress - slope[owner] * (strain - toe[owner] - offset)
+    below = (distance <= 0) & (positions >= fit_start[owner])
+    crossing = np.minimum.reduceat(np.where(below, positions, len(stress)), starts)
+    found = usable & (crossing < stops)
+    after = np.minimum(crossing, len(stress) - 1)
+    before = np.maximum(after - 1, starts)
+    d0, d1 = distance[before], distance[after]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.where((after > before) & (d0 != d1), d0 / (d0 - d1), 1.0)
+    yield_strain = strain[before] + fraction * (strain[after] - strain[before])
+    yield_stress = stress[before] + fraction * (stress[after] - stress[before])
+
+    # Plateau: trapezoid prefix sums, with the intervals joining two curves left out
+    first, last = plateau_range
+    areas = 0.5 * (stress[1:] + stress[:-1]) * np.diff(strain)
+    areas[stops[:-1] - 1] = 0.0
+    prefix = np.concatenate(([0.0], np.cumsum(areas)))
+    keys, scale = _strain_keys(strain, owner, min(strain.min(), first), max(strain.max(), last))
+
+    def integral_upto(cutoff):
+        target = (cutoff - min(strain.min(), first)) / scale + np.arange(len(kept))
+        below_cutoff = np.searchsorted(keys, target, side='right') - 1
+        index = np.maximum(below_cutoff, starts)
+        following = np.minimum(index + 1, stops - 1)
+        x0, x1 = strain[index], strain[following]
+        y0, y1 = stress[index], stress[following]
+        dx = np.where(following > index, np.minimum(cutoff, x1) - x0, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gradient = np.where(x1 > x0, (y1 - y0) / (x1 - x0), 0.0)
+        return prefix[index] + dx * (y0 + 0.5 * gradient * dx), below_cutoff >= starts, target
+
+    integral_first, has_first, _ = integral_upto(first)
+    integral_last, _, target_last = integral_upto(last)
+    covered = has_first & (keys[stops - 1] >= target_last)
+    plateau = (integral_last - integral_first) / (last - first)
+
+    for i, k in enumerate(kept):
+        results[k] = YieldResult(
+            fits[i],
+            float(toe[i]) if usable[i] else None,
+            float(yield_strain[i]) if found[i] else None,
+            float(yield_stress[i]) if found[i] else None,
+            float(plateau[i]) if covered[i] else None,
+        )
+    return results
+
+
+def compute_yield(stress, strain, fit=None, offset=YIELD_OFFSET, plateau_range=PLATEAU_STRAIN_RANGE,
+                  strain_span=None, min_points=MODULUS_MIN_POINTS, window_size=MODULUS_WINDOW_SIZE):
+    """Find the toe correction, offset yield and plateau stress of one curve; see :func:`compute_yield_batch`."""
+    fits = None if fit is None else [fit]
+    return compute_yield_batch([(stress, strain)], fits, offset, plateau_range, strain_span, min_points,
+                               window_size)[0]
+
+
+def write_yield(sheet, results, index=None):
+    """Write the toe strain, offset yield and plateau stress under those of their labels present in the sheet."""
+    index = index or LabelIndex.from_sheet(sheet)
+    for key, label in YIELD_LABELS.items():
+        if results.get(key) is None:
+            continue
+        cells = index.find(label, substring=True)
+        if cells:
+            row, col = cells[0]
+            sheet.cell(row=row + 2, column=col, value=results[key])
+
+
+def get_energy_label(max_strain_percentage):
+    """Build the label under which the energy up to a strain percentage is saved."""
+    return f"Energy up to {max_strain_percentage}% Strain, E{max_strain_percentage / 100:g}"
+
+
+class EnergyCurve:
+    """Cumulative energy under a stress-strain curve, for any strain cutoff.
+
+    The running integral is computed once with cumulative Simpson's rule. The energy up to
+    a cutoff is then found by a binary search for the last point below it, plus the
+    trapezoid from that point to the cutoff itself, so every query costs O(log n).
+    Cutoffs are strain percentages, converted to decimals as in the original 40% calculation.
+
+    Simpson's rule needs strictly increasing strain, so a point repeating the strain of
+    the one before it adds a zero-width interval only and is left out; the first point of
+    each repeated strain is kept, as in :class:`incremental.StreamingAnalysis`.
+    """
+
+    def __init__(self, stress, strain):
+        stress = np.asarray(stress, dtype=float)
+        strain = np.asarray(strain, dtype=float)
+        if len(stress) != len(strain):
+            raise ValueError("Stress and strain lengths mismatch.")
+        steps = np.diff(strain)
+        if np.any(steps < 0):
+            # Integrate along increasing strain so the binary search sees a sorted curve
+            order = np.argsort(strain, kind='stable')
+            stress, strain = stress[order], strain[order]
+            steps = np.diff(strain)
+        if np.any(steps == 0):
+            keep = np.concatenate(([True], steps > 0))
+            stress, strain = stress[keep], strain[keep]
+        self.stress = stress
+        self.strain = strain
+        if len(strain) >= 2:
+            from scipy.integrate import cumulative_simpson
+
+            self.cumulative = cumulative_simpson(stress, x=strain, initial=0)
+        else:
+            self.cumulative = np.zeros(len(strain))
+
+    @classmethod
+    def from_cumulative(cls, stress, strain, cumulative):
+        """Wrap a curve sorted by strain and its already computed running integral."""
+        curve = cls.__new__(cls)
+        curve.stress, curve.strain, curve.cumulative = stress, strain, cumulative
+        return curve
+
+    def energy_upto(self, max_strain_percentages, strict=True):
+        """Return the energy up to one strain percentage, or an array for several.
+
+        A cutoff with fewer than two points below it raises ValueError, or gives NaN when
+        ``strict`` is False.
+        """
+        percentages = np.asarray(max_strain_percentages, dtype=float)
+        max_strain = np.atleast_1d(percentages) / 100  # Convert percentages to decimal values
+
+        last = np.searchsorted(self.strain, max_strain, side='right') - 1
+        too_low = last < 1
+        if strict and np.any(too_low):
+            raise ValueError(f"Not enough data points below {np.atleast_1d(percentages)[too_low][0]:g}% strain.")
+        last = np.maximum(last, 0)
+
+        # Add the slice between the last point and the cutoff, with stress interpolated linearly
+        following = np.minimum(last + 1, len(self.strain) - 1)
+        x0, x1 = self.strain[last], self.strain[following]
+        y0, y1 = self.stress[last], self.stress[following]
+        dx = np.where(following > last, np.minimum(max_strain, x1) - x0, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = np.where(x1 > x0, (y1 - y0) / (x1 - x0), 0.0)
+        energy = np.where(too_low, np.nan, self.cumulative[last] + dx * (y0 + 0.5 * slope * dx))
+        return float(energy[0]) if percentages.ndim == 0 else energy
+
+
+def compute_energy_upto_strain(stress, strain, max_strain_percentage=40):
+    """Return the energy under the stress-strain curve up to a strain percentage."""
+    return EnergyCurve(stress, strain).energy_upto(max_strain_percentage)
+
+
+def compute_energies(stress, strain, max_strain_percentages=ENERGY_STRAIN_PERCENTAGES):
+    """Return the energies up to several strain percentages, keyed by percentage.
+
+    Cutoffs with fewer than two points below them get None instead of an energy.
+    """
+    energies = EnergyCurve(stress, strain).energy_upto(list(max_strain_percentages), strict=False)
+    return {p: (None if np.isnan(e) else e) for p, e in zip(max_strain_percentages, energies.tolist())}
+
+
+def write_energy(sheet, energy, max_strain_percentage=40, index=None):
+    """Write the energy two rows below the first cell containing its label."""
+    energy_label = get_energy_label(max_strain_percentage)
+    index = index or LabelIndex.from_sheet(sheet)
+    cells = index.find(energy_label, substring=True)
+    if not cells:
+        raise ValueError(f"Label '{energy_label}' not found in the Excel sheet.")
+    row, col = cells[0]
+    sheet.cell(row=row + 2, column=col, value=energy)
+
+
+def write_energies(sheet, energies, index=None):
+    """Write every energy whose label is present in the sheet, in one pass over the labels."""
+    index = index or LabelIndex.from_sheet(sheet)
+    for max_strain_percentage, energy in energies.items():
+        if energy is None:
+            continue
+        cells = index.find(get_energy_label(max_strain_percentage), substring=True)
+        if cells:
+            row, col = cells[0]
+            sheet.cell(row=row + 2, column=col, value=energy)
+
+
+def render_stress_strain_plot(stress, strain, plot_file=None):
+    """Plot the stress-strain curve as an in-memory PNG, also saving it to plot_file if given."""
+    png = render_stress_strain_png(stress, strain)
+    if plot_file:
+        with open(plot_file, 'wb') as f:
+            f.write(png.getvalue())
+    return png
+
+
+def insert_plot(sheet, image):
+    """Insert a plot, given as a PNG buffer or file path, into the sheet."""
+    sheet.add_image(make_excel_image(image), EXCEL_IMAGE_ANCHOR)
+
+
+def get_results_file_path(file_path):
+    """Build the path of the companion results file, next to the input file."""
+    stem, _ = os.path.splitext(file_path)
+    return stem + '_results.xlsx'
+
+
+def get_result_rows(results):
+    """List the scalar results as (label, value, unit) rows, in template order."""
+    rows = [
+        ('Length, L', results.get('length'), 'mm'),
+        ('Width, W', results.get('width'), 'mm'),
+        ('Thickness, T', results.get('thickness'), 'mm'),
+        ('Maximum Stress, σc', results.get('max_stress'), 'MPa'),
+        (MODULUS_LABEL, results.get('modulus'), 'MPa'),
+    ]
+    fit = results.get('modulus_fit')
+    if fit is not None:
+        rows.append(('Modulus Fit Rows', f"{fit.start}-{fit.end - 1}", ''))
+        rows.append(('Modulus Fit r', fit.r, ''))
+    energies = dict(results.get('energies', {}))
+    if 'energy' in results:
+        energies[results['energy_strain_percentage']] = results['energy']
+    for max_strain_percentage in sorted(p for p in energies if energies[p] is not None):
+        rows.append((get_energy_label(max_strain_percentage), energies[max_strain_percentage], 'MPa*%'))
+    for key, unit in (('toe_strain', '%'), ('yield_stress', 'MPa'), ('yield_strain', '%'), ('plateau_stress', 'MPa')):
+        rows.append((YIELD_LABELS[key], results.get(key), unit))
+    return [row for row in rows if row[1] is not None]
+
+
+def write_results_workbook(output_path, results, stress=None, strain=None, plot_image=None, layout='sheet'):
+    """Stream the results into a new write-only workbook.
+
+    Only the results are written, so the time and memory this takes grow with the curve
+    and not with the input workbook. With the 'sheet' layout everything goes on one
+    compact 'Results' sheet; with 'companion' the curve gets its own 'Curve' sheet. A curve
+    longer than a sheet can hold goes on over 'Curve 2', 'Curve 3', ...
+    """
+    if layout not in OUTPUT_LAYOUTS:
+        raise ValueError(f"Unknown output layout '{layout}'.")
+
+    import openpyxl
+
+    workbook = openpyxl.Workbook(write_only=True)
+    summary = workbook.create_sheet('Results')
+    summary.append(['Property', 'Value', 'Unit'])
+    for row in get_result_rows(results):
+        summary.append(list(row))
+
+    if stress is not None and strain is not None:
+        stress, strain = np.asarray(stress), np.asarray(strain)
+        if layout == 'companion':
+            curve_sheet, used_rows = workbook.create_sheet('Curve'), 0
+        else:
+            summary.append([])
+            curve_sheet, used_rows = summary, len(get_result_rows(results)) + 2
+        start, number = 0, 1
+        while True:
+            stop = start + EXCEL_MAX_ROWS - used_rows - 2
+            curve_sheet.append(['Stress', 'Strain'])
+            curve_sheet.append(['MPa', '%'])
+            for row in zip(stress[start:stop].tolist(), strain[start:stop].tolist()):
+                curve_sheet.append(row)
+            if stop >= len(stress):
+                break
+            start, number = stop, number + 1
+            curve_sheet, used_rows = workbook.create_sheet(f'Curve {number}'), 0
+
+    if plot_image is not None:
+        summary.add_image(make_excel_image(plot_image), 'E2')
+
+    workbook.save(output_path)
+    return output_path
+
+
+def calculate_stress_and_strain(file_path, search_words, cache=None):
+    """Calculate and save stress and strain values in the Excel sheet."""
+    pipeline = AnalysisPipeline(file_path, search_words, cache=cache)
+    stress, strain = pipeline.calculate_stress_and_strain()
+    updated_file_path = pipeline.save()
+    return stress, strain, updated_file_path
+
 
-    # Plot
-    plt.figure(figsize=(8, 6))
-    plt.plot(strain, stress, marker='o', label='Stress-Strain Curve')
-    plt.xlabel('Strain (%)')
-    plt.ylabel('Stress (MPa)')
-    plt.title('Stress-Strain Curve')
-    plt.grid(True)
-    plt.legend()
-    plot_file = 'stress_strain_plot.png'
-    plt.savefig(plot_file)
-    plt.close()
+def plot_stress_strain_curve(stress, strain, file_path):
+    """Plot and save the stress-strain curve to the Excel file."""
+    png = render_stress_strain_plot(stress, strain)
 
     # Insert into Excel
     workbook = load_excel(file_path)
-    sheet = workbook.active
-    img = Image(plot_file)
-    img.width, img.height = 400, 300
-    sheet.add_image(img, 'A20')
+    insert_plot(workbook.active, png)
     workbook.save(file_path)
 
 
-def calculate_compression_modulus(stress, strain, file_path):
+def calculate_compression_modulus(stress, strain, file_path, window_size=MODULUS_WINDOW_SIZE):
     """Calculate and save the Compression Modulus (Ec) in the Excel file."""
-    stress = np.array(stress)
-    strain = np.array(strain)
-
-    window_size = 50
-    max_r2, best_slope = -1, 0
-
-    for i in range(len(strain) - window_size + 1):
-        subset_strain = strain[i:i + window_size]
-        subset_stress = stress[i:i + window_size]
-        slope, _, r2, _, _ = linregress(subset_strain, subset_stress)
-        if r2 > max_r2:
-            max_r2, best_slope = r2, slope
+    best_slope = compute_compression_modulus(stress, strain, window_size)
 
     workbook = load_excel(file_path)
     sheet = workbook.active
-    for row in sheet.iter_rows():
-        for cell in row:
-            if cell.value == 'Comp. Modulus, Ec':
-                sheet.cell(row=cell.row + 2, column=cell.column, value=best_slope)
+    write_compression_modulus(sheet, best_slope, get_label_index(sheet, file_path))
     workbook.save(file_path)
 
 
@@ -145,26 +1136,18 @@ def calculate_maximum_stress(sheet, positions, file_path):
     if 'Stress' not in positions or 'Maximum Stress, σc' not in positions:
         raise ValueError("'Stress' or 'Maximum Stress, σc' not found in the Excel file.")
 
-    # Get stress column
-    stress_col = positions['Stress'][0][1]
-    stress_values = [
-        sheet.cell(row=r, column=stress_col).value
-        for r in range(2, sheet.max_row + 1)  # Start from row 2 to skip headers
-        if isinstance(sheet.cell(row=r, column=stress_col).value, (int, float))
-    ]
+    # Get stress column, below its header
+    stress_values = read_data_column(sheet, positions, 'Stress')
 
-    if not stress_values:
+    if not len(stress_values):
         raise ValueError("No numeric values found in the 'Stress' column.")
 
     # Find the maximum stress
-    max_stress = max(stress_values)
+    max_stress = float(np.max(stress_values))
     print(f"Calculated Maximum Stress: {max_stress} MPa")
 
-    # Get the cell position for "Maximum Stress, σc"
-    max_stress_row, max_stress_col = positions['Maximum Stress, σc'][0]
-
     # Save the value in the sheet
-    sheet.cell(row=max_stress_row + 2, column=max_stress_col, value=max_stress)
+    write_maximum_stress(sheet, positions, max_stress)
 
     # Save the workbook
     workbook = sheet.parent
@@ -174,60 +1157,430 @@ def calculate_maximum_stress(sheet, positions, file_path):
 
 def calculate_energy_upto_strain(stress, strain, file_path):
     """Calculate and save the energy under the stress-strain curve up to 40% strain."""
-    stress = np.array(stress)
-    strain = np.array(strain)
-
-    # Fixed maximum strain percentage
     max_strain_percentage = 40  # Hardcoded to 40%
-    max_strain = max_strain_percentage / 100  # Convert percentage to a decimal value
-
-    # Filter the stress and strain arrays based on the chosen strain percentage
-    valid_indices = strain <= max_strain
-    strain_subset = strain[valid_indices]
-    stress_subset = stress[valid_indices]
-
-    if len(strain_subset) < 2:
-        raise ValueError(f"Not enough data points below {max_strain_percentage}% strain.")
-
-    # Calculate energy using Simpson's rule
-    energy = simpson(stress_subset, x=strain_subset)
-
-    # Generate the fixed label
-    energy_label = f"Energy up to {max_strain_percentage}% Strain, E0.4"
+    energy = compute_energy_upto_strain(stress, strain, max_strain_percentage)
 
-    # Load the workbook and search for the label
+    # Load the workbook, update the value under the label and save it
     workbook = load_excel(file_path)
     sheet = workbook.active
-
-    # Search for the label and update the value
-    label_found = False
-    for row in sheet.iter_rows():
-        for cell in row:
-            if cell.value and energy_label in str(cell.value):
-                # Save the calculated energy under the correct label
-                sheet.cell(row=cell.row + 2, column=cell.column, value=energy)
-                label_found = True
-                break
-        if label_found:
-            break
-
-    if not label_found:
-        raise ValueError(f"Label '{energy_label}' not found in the Excel sheet.")
-
-    # Save the workbook
+    write_energy(sheet, energy, max_strain_percentage, get_label_index(sheet, file_path))
     workbook.save(file_path)
     print(f"Energy up to {max_strain_percentage}% strain saved: {energy} MPa*%")
 
 
+class AnalysisPipeline:
+    """Run the compression test calculations on a workbook that is loaded and saved only once.
+
+    Every step works on the curve kept on the instance and writes its result into the
+    in-memory workbook; nothing touches the disk until :meth:`save`. With ``read_only`` the
+    input is streamed by :func:`stream_excel` instead, and the results are saved with the
+    'sheet' layout unless ``output_layout`` picks another (see :func:`write_results_workbook`).
+    A CSV/TXT export can be given instead of a workbook and is saved with the 'companion' layout.
+
+    ``cache`` and ``sidecar`` let unchanged input skip parsing and calculation, ``progress``
+    reports the read of the input and ``instrumentation`` records every stage. Once
+    ``cancel_event`` is set, the next stage raises AnalysisCancelled. ``dtype``,
+    ``modulus_span``, ``output_points`` and ``join_parts`` are the fields of :class:`AnalysisOptions`.
+    """
+
+    STEPS = ('stress_strain', 'max_stress', 'modulus', 'energy', 'energies', 'yield', 'plot')
+
+    def __init__(self, file_path, search_words=SEARCH_WORDS, read_only=False, output_layout=None, cache=None,
+                 sidecar=False, progress=None, instrumentation=None, cancel_event=None, dtype='float64',
+                 modulus_span=None, output_points=None, join_parts=False):
+        if output_layout is not None and output_layout not in OUTPUT_LAYOUTS:
+            raise ValueError(f"Unknown output layout '{output_layout}'.")
+        if np.dtype(dtype).name not in CURVE_DTYPES:
+            raise ValueError(f"Unsupported curve dtype '{dtype}'.")
+        if output_points is not None and output_points < 1:
+            raise ValueError("output_points must be at least 1.")
+        self.file_path = file_path
+        self.parts = get_record_parts(file_path) if join_parts else [file_path]
+        self.text_export = is_text_export(file_path)
+        if self.text_export and output_layout is None:
+            output_layout = 'companion'
+        elif read_only and output_layout is None:
+            output_layout = 'sheet'  # Saving an updated copy would load the input in full a second time
+        if output_layout == 'companion':
+            self.output_path = get_results_file_path(file_path)
+        else:
+            self.output_path = get_updated_file_path(file_path)
+            if self.text_export:
+                self.output_path = os.path.splitext(self.output_path)[0] + '.xlsx'
+        self.search_words = list(search_words) + RESULT_WORDS
+        self.read_only = read_only
+        self.output_layout = output_layout
+        self.cache = cache
+        self.sidecar = sidecar
+        self.progress = progress
+        self.instrumentation = instrumentation
+        self.cancel_event = cancel_event
+        self.dtype = np.dtype(dtype).name
+        self.modulus_span = modulus_span
+        self.output_points = output_points
+        self.join_parts = join_parts
+        self.content_hash = None
+        self.workbook = self.sheet = self.index = self.columns = self.dimensions = None
+        self.positions = {}
+        self.energy_curve = None
+        self.curve = None
+        self.results = {}
+        self.completed = []
+
+    def open(self):
+        """Load the input workbook, or stream it in read-only mode, unless already done."""
+        if self.sheet is not None or self.columns is not None:
+            return
+        if self.text_export:
+            with self._stage('read_text_export') as stage:
+                self.columns, self.dimensions = read_text_export(self.file_path, DATA_WORDS, DIMENSION_WORDS,
+                                                                 progress=self.progress)
+                self._read_parts()
+                stage['rows'] = len(self.columns['Force'])
+        elif self.read_only:
+            with self._stage('stream_excel') as stage:
+                self.index, self.columns = stream_excel(self.file_path, progress=self.progress,
+                                                        join_parts=self.join_parts)
+                self.positions = self.index.positions(self.search_words)
+                self._read_parts()
+                stage['rows'] = max((len(column) for column in self.columns.values()), default=0)
+        else:
+            self._load_workbook()
+
+    def _read_parts(self):
+        """Append the data of the continuation files of the record to the columns read so far."""
+        if len(self.parts) > 1:
+            rest = read_part_columns(self.parts[1:], join_parts=self.join_parts)
+            self.columns = {word: np.concatenate([self.columns[word], rest[word]]) for word in DATA_WORDS}
+
+    def _load_workbook(self):
+        """Fully load the input workbook and write every result calculated so far into it."""
+        with self._stage('load_excel') as stage:
+            self.workbook = load_excel(self.file_path, self.progress)
+            self.sheet = self.workbook.active
+            self.index = get_label_index(self.sheet, self.file_path)
+            self.positions = self.index.positions(self.search_words)
+            stage['rows'] = self.sheet.max_row
+            for step in self.completed:
+                self._write_step(self.sheet, self.index, step)
+
+    @property
+    def stress(self):
+        return None if self.curve is None else self.curve.stress
+
+    @property
+    def strain(self):
+        return None if self.curve is None else self.curve.strain
+
+    def _stage(self, name, rows=None):
+        """Record a stage with the pipeline's instrumentation, if it has any, unless the run was cancelled."""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise AnalysisCancelled("Analysis cancelled.")
+        if self.instrumentation is None:
+            return nullcontext({})
+        return self.instrumentation.stage(name, rows)
+
+    def _rows(self):
+        """Return the number of points of the stress-strain curve, or None before it exists."""
+        return None if self.curve is None else len(self.curve)
+
+    def get_content_hash(self):
+        """Hash the input file, or every file of a split record together, once per pipeline."""
+        if self.content_hash is None:
+            self.content_hash = hash_record(self.file_path, self.join_parts)
+        return self.content_hash
+
+    def _cache_key(self, step, **params):
+        """Build the cache key of a step from the input content and the step parameters."""
+        if self.dtype != 'float64':
+            params['dtype'] = self.dtype
+        if self.join_parts:
+            params['join_parts'] = True
+        return make_cache_key(self.get_content_hash(), step=step, search_words=self.search_words, **params)
+
+    def _cached(self, step, **params):
+        """Return the cached (arrays, scalars) of a step, or None without a cache or on a miss."""
+        if self.cache is None:
+            return None
+        return self.cache.get(self._cache_key(step, **params))
+
+    def _store(self, step, arrays=None, scalars=None, **params):
+        """Store the result of a step in the cache, if there is one."""
+        if self.cache is not None:
+            self.cache.put(self._cache_key(step, **params), arrays, scalars)
+
+    def _require_curve(self):
+        """Calculate stress and strain if no previous step has done it yet."""
+        if self.curve is None:
+            self.calculate_stress_and_strain()
+
+    def _complete(self, step):
+        """Record a finished step and write its result if the workbook is in memory."""
+        if step not in self.completed:
+            self.completed.append(step)
+        if self.sheet is not None and self.output_layout is None:
+            self._write_step(self.sheet, self.index, step)
+
+    def _write_step(self, sheet, index, step):
+        """Write the result of one step into a sheet."""
+        positions = index.positions(self.search_words)
+        if step == 'stress_strain':
+            header_rows = [row for word in ('Stress', 'Strain') for row, _ in positions.get(word, [])[:1]]
+            capacity = EXCEL_MAX_ROWS - 1 - max(header_rows, default=0)
+            write_stress_and_strain(sheet, positions, *self.get_output_curve(capacity))
+        elif step == 'max_stress':
+            write_maximum_stress(sheet, positions, self.results['max_stress'])
+        elif step == 'modulus':
+            write_compression_modulus(sheet, self.results['modulus'], index)
+        elif step == 'energy':
+            write_energy(sheet, self.results['energy'], self.results['energy_strain_percentage'], index)
+        elif step == 'energies':
+            write_energies(sheet, self.results['energies'], index)
+        elif step == 'yield':
+            write_yield(sheet, self.results, index)
+        elif step == 'plot':
+            insert_plot(sheet, self.results['plot_image'])
+
+    def calculate_stress_and_strain(self):
+        """Calculate stress and strain and write them into the workbook."""
+        with self._stage('stress_strain') as stage:
+            sidecar = self.sidecar and len(self.parts) == 1  # A sidecar only describes one file
+            mapped = load_sidecar_array(self.file_path) if sidecar else None
+            if mapped and mapped[1].get('dtype') != self.dtype:
+                mapped = None  # Parse again rather than change the precision of the stored curve
+            if mapped and mapped[1].get('join_parts', False) != self.join_parts:
+                mapped = None
+            cached = None if mapped else self._cached('stress_strain')
+            if mapped:
+                data, metadata = mapped
+                dimensions = {word: metadata[word] for word in ('length', 'width', 'thickness')}
+                self.curve = Curve(data, **dimensions, source=self.file_path)
+                if metadata.get('labels'):
+                    # Saving into the workbook later reuses the stored index instead of scanning its header
+                    cache_label_index(self.file_path, LabelIndex.from_cells(metadata['labels']['cells'],
+                                                                            metadata['labels']['header_rows']))
+            elif cached:
+                arrays, dimensions = cached
+                self.curve = Curve.from_arrays(arrays['stress'], arrays['strain'], **dimensions, dtype=self.dtype,
+                                               source=self.file_path)
+            else:
+                self.open()
+                if self.text_export:
+                    values = get_text_dimensions(self.file_path, self.dimensions)
+                else:
+                    values = [self.index.value_below(word) for word in DIMENSION_WORDS]
+                dimensions = dict(zip(('length', 'width', 'thickness'), values))
+                if self.columns is None:
+                    self.columns = read_workbook_data(self.workbook, self.positions, join_parts=self.join_parts)
+                    self._read_parts()
+                force, stroke = self.columns['Force'], self.columns['Stroke']
+                self.curve = Curve.from_force_stroke(force, stroke, **dimensions, dtype=self.dtype,
+                                                     source=self.file_path)
+                self._store('stress_strain', {'stress': self.stress, 'strain': self.strain}, dimensions)
+            if sidecar and not mapped:
+                with self._stage('save_sidecar', self._rows()):
+                    labels = None if self.index is None else {'header_rows': self.index.header_rows,
+                                                              'cells': self.index.to_cells()}
+                    save_sidecar(self.file_path, self.stress, self.strain, dimensions,
+                                 self.content_hash if self.cache is not None else None, self.join_parts, labels)
+            self.energy_curve = None
+            self.results.update(dimensions)
+            self._complete('stress_strain')
+            stage['rows'] = self._rows()
+        return self.stress, self.strain
+
+    def get_output_curve(self, max_points=None):
+        """Return the stress and strain to write back, thinned to ``output_points`` and ``max_points``."""
+        limit = min(p for p in (self.output_points, max_points, len(self.curve)) if p is not None)
+        if len(self.curve) <= limit:
+            return self.stress, self.strain
+        keep = decimate_min_max(self.strain, self.stress, max(limit // 4, 1))
+        return self.stress[keep], self.strain[keep]
+
+    def calculate_maximum_stress(self):
+        """Find the maximum stress and write it under 'Maximum Stress, σc'."""
+        self._require_curve()
+        with self._stage('max_stress', self._rows()):
+            cached = self._cached('max_stress')
+            if cached:
+                max_stress = cached[1]['max_stress']
+            else:
+                if not len(self.stress):
+                    raise ValueError("No numeric values found in the 'Stress' column.")
+                max_stress = float(np.max(self.stress))
+                self._store('max_stress', scalars={'max_stress': max_stress})
+            self.results['max_stress'] = max_stress
+            self._complete('max_stress')
+        return max_stress
+
+    def calculate_compression_modulus(self, window_size=MODULUS_WINDOW_SIZE, strain_span=None):
+        """Calculate the compression modulus (Ec) and write it under its label.
+
+        With ``strain_span`` (by default the pipeline's ``modulus_span``) the windows cover
+        that much strain and ``window_size`` is not used.
+        """
+        self._require_curve()
+        strain_span = self.modulus_span if strain_span is None else strain_span
+        params = {'strain_span': strain_span} if strain_span else {'window_size': window_size}
+        with self._stage('modulus', self._rows()):
+            cached = self._cached('modulus', **params)
+            if cached:
+                fit = cached[1]['fit']
+                fit = ModulusFit(*fit) if fit is not None else None
+            else:
+                if strain_span:
+                    fit = find_best_span_window(self.stress, self.strain, strain_span)
+                else:
+                    fit = find_best_modulus_window(self.stress, self.strain, window_size)
+                self._store('modulus', scalars={'fit': fit}, **params)
+            modulus = fit.slope if fit else 0
+            self.results['modulus'] = modulus
+            self.results['modulus_fit'] = fit
+            self._complete('modulus')
+        return modulus
+
+    def calculate_energy_upto_strain(self, max_strain_percentage=40):
+        """Calculate the energy up to a strain percentage and write it under its label."""
+        self._require_curve()
+        with self._stage('energy', self._rows()):
+            cached = self._cached('energy', max_strain_percentage=max_strain_percentage)
+            if cached:
+                energy = cached[1]['energy']
+            else:
+                energy = self._get_energy_curve().energy_upto(max_strain_percentage)
+                self._store('energy', scalars={'energy': energy}, max_strain_percentage=max_strain_percentage)
+            self.results['energy'] = energy
+            self.results['energy_strain_percentage'] = max_strain_percentage
+            self._complete('energy')
+        return energy
+
+    def _get_energy_curve(self):
+        """Build the cumulative energy curve once per stress-strain curve."""
+        self._require_curve()
+        if self.energy_curve is None:
+            with self._stage('energy_integral', self._rows()):
+                self.energy_curve = EnergyCurve(self.stress, self.strain)
+        return self.energy_curve
+
+    def calculate_energies(self, max_strain_percentages=ENERGY_STRAIN_PERCENTAGES):
+        """Calculate the energies up to several strain percentages and write those with a label.
+
+        Cutoffs with fewer than two points below them get None and are left out of the output.
+        """
+        max_strain_percentages = list(max_strain_percentages)
+        with self._stage('energies', self._rows()):
+            cached = self._cached('energies', max_strain_percentages=max_strain_percentages)
+            if cached:
+                energies = dict(zip(max_strain_percentages, cached[1]['energies']))
+            else:
+                energies = self._get_energy_curve().energy_upto(max_strain_percentages, strict=False).tolist()
+                energies = [None if np.isnan(energy) else energy for energy in energies]
+                self._store('energies', scalars={'energies': energies},
+                            max_strain_percentages=max_strain_percentages)
+                energies = dict(zip(max_strain_percentages, energies))
+            self.results['energies'] = energies
+            self._complete('energies')
+        return energies
+
+    def calculate_yield(self, offset=YIELD_OFFSET, plateau_range=PLATEAU_STRAIN_RANGE,
+                        window_size=MODULUS_WINDOW_SIZE, strain_span=None):
+        """Find the toe strain, offset yield and plateau stress and write those with a label.
+
+        The modulus line is fitted like Ec but only over the loading region before the
+        plateau or first peak (see :func:`find_loading_fits`). Values that cannot be found
+        are None and are left out of the output.
+        """
+        self._require_curve()
+        strain_span = self.modulus_span if strain_span is None else strain_span
+        params = {'strain_span': strain_span} if strain_span else {'window_size': window_size}
+        params.update(offset=offset, plateau_range=list(plateau_range))
+        with self._stage('yield', self._rows()):
+            cached = self._cached('yield', **params)
+            if cached:
+                values = dict(cached[1])
+                fit = values.pop('fit')
+                fit = ModulusFit(*fit) if fit is not None else None
+            else:
+                result = compute_yield(self.stress, self.strain, None, offset, plateau_range, strain_span,
+                                       window_size=window_size)
+                fit = result.fit
+                values = {key: getattr(result, key) for key in YIELD_LABELS}
+                self._store('yield', scalars={**values, 'fit': fit}, **params)
+            self.results.update(values)
+            self.results['yield_fit'] = fit
+            self.results['yield_offset'] = offset
+            self.results['plateau_range'] = tuple(plateau_range)
+            self._complete('yield')
+        return values
+
+    def plot_stress_strain_curve(self, plot_file=None):
+        """Plot the stress-strain curve in memory and insert it into the workbook.
+
+        The PNG is only written to disk when a plot_file path is given.
+        """
+        self._require_curve()
+        with self._stage('plot', self._rows()):
+            png = render_stress_strain_plot(self.stress, self.strain, plot_file)
+            self.results['plot_image'] = png
+            if plot_file:
+                self.results['plot_file'] = plot_file
+            self._complete('plot')
+        return png
+
+    def run_step(self, step):
+        """Run one step by name."""
+        actions = {
+            'stress_strain': self.calculate_stress_and_strain,
+            'max_stress': self.calculate_maximum_stress,
+            'modulus': self.calculate_compression_modulus,
+            'energy': self.calculate_energy_upto_strain,
+            'energies': self.calculate_energies,
+            'yield': self.calculate_yield,
+            'plot': self.plot_stress_strain_curve,
+        }
+        if step not in actions:
+            raise ValueError(f"Unknown analysis step '{step}'.")
+        return actions[step]()
+
+    def run(self, steps=STEPS):
+        """Run the selected steps in order and save the workbook once at the end."""
+        for step in steps:
+            self.run_step(step)
+        return self.save()
+
+    def save(self, output_path=None):
+        """Save the workbook with every result calculated so far."""
+        if output_path is not None:
+            self.output_path = output_path
+        if self.output_layout is not None:
+            stress, strain = self.get_output_curve() if self.curve is not None else (None, None)
+            with self._stage('save', self._rows()):
+                return write_results_workbook(self.output_path, self.results, stress, strain,
+                                              self.results.get('plot_image'), self.output_layout)
+        if self.sheet is None:
+            # Cached results have no cells to go into yet, so load the input fully
+            self._load_workbook()
+        with self._stage('save', self.sheet.max_row):
+            self.workbook.save(self.output_path)
+        return self.output_path
+
+
 class CompressionTestApp:
     def __init__(self, root):
+        _import_tkinter()
         self.root = root
         self.root.title("Compression Test Analysis")
         self.file_path = None
-        self.stress = None
-        self.strain = None
+        self.pipeline = None
+        self.curve = None
         self.updated_file = None
 
+        # Heavy work runs on one background thread; results come back through root.after
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.job = None
+        self.cancel_event = threading.Event()
+        self.job_progress = (0, None)
+
         # Create GUI elements
         self.label = tk.Label(root, text="Compression Test Analysis", font=("Arial", 16))
         self.label.pack(pady=10)
@@ -247,81 +1600,249 @@ class CompressionTestApp:
         self.energy_button = tk.Button(root, text="Calculate Energy up to 40% Strain", command=self.calculate_energy)
         self.energy_button.pack(pady=5)
 
+        self.yield_button = tk.Button(root, text="Calculate Yield and Plateau Stress", command=self.calculate_yield)
+        self.yield_button.pack(pady=5)
+
         self.plot_button = tk.Button(root, text="Plot Stress-Strain Curve", command=self.plot_curve)
         self.plot_button.pack(pady=5)
 
+        self.run_all_button = tk.Button(root, text="Run Full Analysis", command=self.run_full_analysis)
+        self.run_all_button.pack(pady=5)
+
+        self.instrument_var = tk.BooleanVar(value=False)
+        self.instrument_check = tk.Checkbutton(root, text="Record stage timings", variable=self.instrument_var)
+        self.instrument_check.pack(pady=2)
+
+        self.timings_button = tk.Button(root, text="Show Timings", command=self.show_timings)
+        self.timings_button.pack(pady=5)
+
+        self.progress_bar = ttk.Progressbar(root, length=300, mode='determinate', maximum=100)
+        self.progress_bar.pack(pady=5)
+
+        self.status_label = tk.Label(root, text="Ready")
+        self.status_label.pack(pady=2)
+
+        self.cancel_button = tk.Button(root, text="Cancel", command=self.cancel_job, state=tk.DISABLED)
+        self.cancel_button.pack(pady=5)
+
+        self.action_buttons = [self.load_button, self.calculate_button, self.max_stress_button, self.modulus_button,
+                               self.energy_button, self.yield_button, self.plot_button, self.run_all_button, self.instrument_check,
+                               self.timings_button]
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+
+    def _report_progress(self, done, total):
+        """Record progress from the worker thread, stopping the job if the user cancelled it."""
+        if self.cancel_event.is_set():
+            raise AnalysisCancelled("Analysis cancelled.")
+        self.job_progress = (done, total)
+
+    def _start_job(self, message, job, on_success):
+        """Run a job on the worker thread while the window stays responsive."""
+        if self.job is not None:
+            return
+        self.cancel_event.clear()
+        self.job_progress = (0, None)
+        for button in self.action_buttons:
+            button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        self.status_label.config(text=message)
+        self.progress_bar.config(mode='indeterminate')
+        self.progress_bar.start(10)
+        self.job = self.executor.submit(job)
+        self.root.after(POLL_INTERVAL_MS, self._poll_job, on_success)
+
+    def _poll_job(self, on_success):
+        """Update the progress bar and hand the result of a finished job back to the main loop."""
+        done, total = self.job_progress
+        if total:
+            if str(self.progress_bar.cget('mode')) != 'determinate':
+                self.progress_bar.stop()
+                self.progress_bar.config(mode='determinate')
+            self.progress_bar.config(value=min(100, 100 * done / total))
+
+        if not self.job.done():
+            self.root.after(POLL_INTERVAL_MS, self._poll_job, on_success)
+            return
+
+        job, self.job = self.job, None
+        self.progress_bar.stop()
+        self.progress_bar.config(mode='determinate', value=0)
+        self.cancel_button.config(state=tk.DISABLED)
+        for button in self.action_buttons:
+            button.config(state=tk.NORMAL)
+
+        try:
+            result = job.result()
+        except AnalysisCancelled:
+            self.status_label.config(text="Cancelled")
+            return
+        except Exception as e:
+            self.status_label.config(text="Failed")
+            messagebox.showerror("Error", str(e))
+            return
+        self.status_label.config(text="Ready")
+        on_success(result)
+
+    def _check_cancelled(self):
+        """Stop a job between two steps if the user cancelled it."""
+        if self.cancel_event.is_set():
+            raise AnalysisCancelled("Analysis cancelled.")
+
+    def _run_step(self, step):
+        """Run one pipeline step unless an earlier run already has its result, then save."""
+        self._check_cancelled()
+        if step not in self.pipeline.completed:
+            self.pipeline.run_step(step)
+        self._check_cancelled()
+        return self.pipeline.save()
+
+    def cancel_job(self):
+        """Ask the running job to stop at its next progress report or step."""
+        if self.job is not None:
+            self.cancel_event.set()
+            self.status_label.config(text="Cancelling...")
+
+    def close(self):
+        """Stop any running job and close the window."""
+        self.cancel_event.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
+
     def load_file(self):
         """Load the Excel file."""
-        self.file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx")])
-        if self.file_path:
+        file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx"),
+                                                          ("Testing machine exports", "*.csv *.txt *.tsv *.dat")])
+        if not file_path:
+            return
+
+        instrumentation = Instrumentation() if self.instrument_var.get() else None
+        pipeline = AnalysisPipeline(file_path, SEARCH_WORDS, cache=ResultCache(), progress=self._report_progress,
+                                    instrumentation=instrumentation, cancel_event=self.cancel_event)
+
+        def loaded(_):
+            self.pipeline = pipeline
+            self.file_path = file_path
+            self.curve = self.updated_file = None
             messagebox.showinfo("File Loaded", f"File {self.file_path} loaded successfully.")
 
+        self._start_job(f"Reading {os.path.basename(file_path)}...", pipeline.open, loaded)
+
+    def show_timings(self):
+        """Show the recorded stage timings of the loaded file in a separate window."""
+        if self.pipeline is None or self.pipeline.instrumentation is None:
+            messagebox.showerror("Error", "Tick 'Record stage timings' before loading a file.")
+            return
+        instrumentation = self.pipeline.instrumentation
+
+        window = tk.Toplevel(self.root)
+        window.title("Stage Timings")
+        text = tk.Text(window, width=80, height=20, font=("Courier", 10))
+        text.insert(tk.END, instrumentation.format_report())
+        text.config(state=tk.DISABLED)
+        text.pack(padx=10, pady=10)
+
+        def export_trace():
+            trace_path = filedialog.asksaveasfilename(defaultextension=".json",
+                                                      filetypes=[("Chrome trace", "*.json")])
+            if trace_path:
+                instrumentation.save_trace(trace_path)
+                messagebox.showinfo("Trace Saved", f"Trace saved to:\n{trace_path}")
+
+        tk.Button(window, text="Export Trace", command=export_trace).pack(pady=5)
+
+    def _has_curve(self):
+        """Check that stress and strain have been calculated, telling the user otherwise."""
+        if self.curve is None:
+            messagebox.showerror("Error", "Please calculate stress and strain first.")
+            return False
+        return True
+
     def calculate_stress_strain(self):
         """Calculate stress and strain."""
-        if not self.file_path:
+        if not self.pipeline:
             messagebox.showerror("Error", "Please load an Excel file first.")
             return
 
-        try:
-            self.stress, self.strain, self.updated_file = calculate_stress_and_strain(self.file_path, SEARCH_WORDS)
+        def done(updated_file):
+            self.curve = self.pipeline.curve
+            self.updated_file = updated_file
             messagebox.showinfo("Success", f"Stress and strain calculated and saved to:\n{self.updated_file}")
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+
+        self._start_job("Calculating stress and strain...", lambda: self._run_step('stress_strain'), done)
 
     def calculate_max_stress(self):
         """Calculate maximum stress."""
-        if not self.updated_file:
-            messagebox.showerror("Error", "Please calculate stress and strain first.")
+        if not self._has_curve():
             return
 
-        try:
-            workbook = load_excel(self.updated_file)
-            sheet = workbook.active
-            positions = find_words_in_excel(sheet, SEARCH_WORDS + ['Stress', 'Maximum Stress, σc'])
-            calculate_maximum_stress(sheet, positions, self.updated_file)
-            messagebox.showinfo("Success", "Maximum stress calculated and saved successfully.")
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+        self._start_job("Calculating maximum stress...", lambda: self._run_step('max_stress'),
+                        lambda _: messagebox.showinfo("Success", "Maximum stress calculated and saved successfully."))
 
     def calculate_modulus(self):
         """Calculate compression modulus."""
-        if not self.stress or not self.strain:
-            messagebox.showerror("Error", "Please calculate stress and strain first.")
+        if not self._has_curve():
             return
 
-        try:
-            calculate_compression_modulus(self.stress, self.strain, self.updated_file)
-            messagebox.showinfo("Success", "Compression modulus calculated and saved successfully.")
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+        self._start_job("Calculating compression modulus...", lambda: self._run_step('modulus'),
+                        lambda _: messagebox.showinfo("Success", "Compression modulus calculated and saved successfully."))
 
     def calculate_energy(self):
         """Calculate energy up to 40% strain."""
-        if not self.stress or not self.strain:
-            messagebox.showerror("Error", "Please calculate stress and strain first.")
+        if not self._has_curve():
             return
 
-        try:
-            calculate_energy_upto_strain(self.stress, self.strain, self.updated_file)
-            messagebox.showinfo("Success", "Energy up to 40% strain calculated and saved.")
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+        self._start_job("Calculating energy...", lambda: self._run_step('energy'),
+                        lambda _: messagebox.showinfo("Success", "Energy up to 40% strain calculated and saved."))
+
+    def calculate_yield(self):
+        """Calculate the toe strain, offset yield and plateau stress."""
+        if not self._has_curve():
+            return
+
+        def done(_):
+            found = {label: self.pipeline.results.get(key) for key, label in YIELD_LABELS.items()}
+            found = {label: value for label, value in found.items() if value is not None}
+            if not found:
+                messagebox.showinfo("Result", "No offset yield or plateau found on this curve.")
+                return
+            lines = '\n'.join(f"{label}: {value:.6g}" for label, value in found.items())
+            messagebox.showinfo("Success", f"Calculated and saved:\n{lines}")
+
+        self._start_job("Calculating yield and plateau stress...", lambda: self._run_step('yield'), done)
 
     def plot_curve(self):
         """Plot the stress-strain curve."""
-        if not self.stress or not self.strain:
-            messagebox.showerror("Error", "Please calculate stress and strain first.")
+        if not self._has_curve():
             return
 
-        try:
-            plot_stress_strain_curve(self.stress, self.strain, self.updated_file)
-            messagebox.showinfo("Success", "Stress-strain curve plotted and saved successfully.")
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+        self._start_job("Plotting stress-strain curve...", lambda: self._run_step('plot'),
+                        lambda _: messagebox.showinfo("Success", "Stress-strain curve plotted and saved successfully."))
+
+    def run_full_analysis(self):
+        """Run every calculation and save the results once."""
+        if not self.pipeline:
+            messagebox.showerror("Error", "Please load an Excel file first.")
+            return
+
+        def job():
+            for step in AnalysisPipeline.STEPS:
+                self._check_cancelled()
+                if step not in self.pipeline.completed:
+                    self.pipeline.run_step(step)
+            self._check_cancelled()
+            return self.pipeline.save()
+
+        def done(updated_file):
+            self.updated_file = updated_file
+            self.curve = self.pipeline.curve
+            messagebox.showinfo("Success", f"Full analysis saved to:\n{self.updated_file}")
+
+        self._start_job("Running full analysis...", job, done)
 
 
 # Run the application
 if __name__ == "__main__":
+    _import_tkinter()
     root = tk.Tk()
     app = CompressionTestApp(root)
     root.mainloop()
\ No newline at end of file
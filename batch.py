@@ -0,0 +1,232 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from App import (AnalysisOptions, AnalysisPipeline, ENERGY_STRAIN_PERCENTAGES, OUTPUT_LAYOUTS, SEARCH_WORDS,
+                 YIELD_LABELS, get_energy_label, get_record_parts, is_record_part)
+from cache import ResultCache
+from cli import add_analysis_arguments, get_analysis_options
+from curve import estimate_analysis_bytes, estimate_rows, format_footprint
+from ingest import TEXT_EXTENSIONS
+from instrumentation import Instrumentation, format_report, save_chrome_trace
+from results_db import UPSERT_BATCH_ROWS, ResultsDatabase, make_record
+
+SUMMARY_FILE = 'batch_summary.xlsx'
+SERIES_FILE = 'series_summary.xlsx'  # Written by series.py
+SUMMARY_HEADER = (['File', 'Length, L', 'Width, W', 'Thickness, T', 'Maximum Stress, σc', 'Comp. Modulus, Ec']
+                  + [get_energy_label(p) for p in ENERGY_STRAIN_PERCENTAGES] + list(YIELD_LABELS.values())
+                  + ['Output File', 'Error'])
+
+
+def is_output_file(file_path):
+    """Check whether a workbook was written by a previous analysis run."""
+    name = os.path.basename(file_path)
+    return (name.startswith(('updated_', '~$')) or name.endswith('_results.xlsx')
+            or name in (SUMMARY_FILE, SERIES_FILE))
+
+
+def find_workbooks(source, join_parts=False):
+    """List the specimen workbooks and CSV/TXT exports in a directory or matching a glob pattern.
+
+    With ``join_parts`` the part files continuing a listed record are left out, as they are
+    read with its first file; any other file named like a part is a specimen of its own.
+    """
+    if os.path.isdir(source):
+        patterns = [os.path.join(source, '*' + extension) for extension in ('.xlsx',) + TEXT_EXTENSIONS]
+    else:
+        patterns = [source]
+    files = sorted(path for pattern in patterns for path in glob.glob(pattern) if not is_output_file(path))
+    if join_parts:
+        joined = {part for path in files if not is_record_part(path) for part in get_record_parts(path)[1:]}
+        files = [path for path in files if path not in joined]
+    return files
+
+
+def analyse_workbook(file_path, read_only=True, output_layout=None, plot=True, cache_dir=None, sidecar=False,
+                     profile=False, save=True, lot=None, options=AnalysisOptions()):
+    """Run the full analysis of one workbook and return its scalar results.
+
+    Besides the results, 'memory' holds the size of the curve, 'record' its row of the
+    results database and, with ``profile``, 'stages' the stage report of the run. Without
+    ``save`` nothing is plotted or written, so the workbook is always streamed read-only.
+    """
+    start = time.perf_counter()
+    cache = ResultCache(cache_dir) if cache_dir else None
+    instrumentation = Instrumentation() if profile else None
+    pipeline = AnalysisPipeline(file_path, SEARCH_WORDS, read_only=read_only or not save, output_layout=output_layout,
+                                cache=cache, sidecar=sidecar, instrumentation=instrumentation, **options._asdict())
+    pipeline.calculate_stress_and_strain()
+    pipeline.calculate_maximum_stress()
+    pipeline.calculate_compression_modulus()
+    pipeline.calculate_energy_upto_strain()
+    pipeline.calculate_energies()
+    pipeline.calculate_yield()
+
+    if plot and save:
+        pipeline.plot_stress_strain_curve()
+    output_path = pipeline.save() if save else None
+    seconds = time.perf_counter() - start
+
+    results = pipeline.results
+    return {
+        'file': file_path,
+        'length': results['length'],
+        'width': results['width'],
+        'thickness': results['thickness'],
+        'max_stress': results['max_stress'],
+        'modulus': results['modulus'],
+        'energy': results['energy'],
+        'energies': results['energies'],
+        **{key: results[key] for key in YIELD_LABELS},
+        'output': output_path,
+        'memory': pipeline.curve.memory_footprint(),
+        'stages': instrumentation.report() if profile else None,
+        'record': make_record(file_path, results, len(pipeline.stress), pipeline.get_content_hash(), seconds,
+                              output_path, lot),
+    }
+
+
+def write_summary_workbook(summary_path, results, errors=()):
+    """Write one row per specimen, with failed files listed after the analysed ones."""
+    import openpyxl
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Summary')
+    sheet.append(SUMMARY_HEADER)
+    for result in results:
+        sheet.append([os.path.basename(result['file']), result['length'], result['width'], result['thickness'],
+                      result['max_stress'], result['modulus']]
+                     + [result['energies'][p] for p in ENERGY_STRAIN_PERCENTAGES]
+                     + [result[key] for key in YIELD_LABELS] + [result['output'], None])
+    for file_path, error in errors:
+        sheet.append([os.path.basename(file_path)] + [None] * (len(SUMMARY_HEADER) - 2) + [error])
+    workbook.save(summary_path)
+    return summary_path
+
+
+def run_batch(source, workers=None, summary_path=None, read_only=True, output_layout=None, plot=True,
+              cache_dir=None, sidecar=False, profile=False, trace_path=None, db_path=None, lot=None, save=True,
+              memory_budget=None, options=AnalysisOptions(), progress=print):
+    """Analyse every workbook of a directory or glob across a pool of worker processes.
+
+    Progress and errors are reported through ``progress`` as each file finishes, and a
+    summary workbook with one row per specimen is written at the end. With ``cache_dir``
+    the workers share a ResultCache, so unchanged workbooks are not analysed again, and with
+    ``sidecar`` each parsed curve is kept next to its workbook for later re-plotting.
+    ``profile`` reports the time and memory of every stage of each file, and ``trace_path``
+    also saves them, for all workers, as one Chrome trace. With ``db_path`` every result is
+    recorded in that results database, in bulk as the files finish; ``lot`` overrides the
+    lot recorded (by default the folder name). ``save=False`` writes no updated workbooks,
+    so an existing collection can be back-filled into the database quickly.
+
+    With ``memory_budget`` (bytes) a file is only handed
+    to the pool once the estimated peak memory of the analyses in flight, including its
+    own, fits the budget (see :func:`curve.estimate_analysis_bytes`); a file too large for
+    the budget on its own runs alone. Returns the list of results and the list of (file,
+    error) pairs.
+    """
+    files = find_workbooks(source, options.join_parts)
+    if not files:
+        raise FileNotFoundError(f"No workbooks found for '{source}'.")
+    if summary_path is None:
+        directory = source if os.path.isdir(source) else os.path.dirname(files[0])
+        summary_path = os.path.join(directory, SUMMARY_FILE)
+
+    profile = profile or trace_path is not None
+    database = ResultsDatabase(db_path) if db_path else None
+    pending_records = []
+    results, errors = [], []
+    estimates = {file_path: estimate_analysis_bytes(sum(map(estimate_rows, get_record_parts(file_path)
+                                                            if options.join_parts else [file_path])), options.dtype)
+                 if memory_budget else 0 for file_path in files}
+    queued = list(files)
+    futures = {}
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while queued or futures:
+            in_flight = sum(estimates[file_path] for file_path in futures.values())
+            while queued and (not memory_budget or not futures
+                              or in_flight + estimates[queued[0]] <= memory_budget):
+                file_path = queued.pop(0)
+                futures[executor.submit(analyse_workbook, file_path, read_only, output_layout, plot, cache_dir,
+                                        sidecar, profile, save, lot, options)] = file_path
+                in_flight += estimates[file_path]
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                file_path = futures.pop(future)
+                done += 1
+                name = os.path.basename(file_path)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors.append((file_path, str(e)))
+                    progress(f"[{done}/{len(files)}] {name}: Error: {e}")
+                    continue
+                results.append(result)
+                progress(f"[{done}/{len(files)}] {name}: σc={result['max_stress']:.6g} MPa, "
+                         f"Ec={result['modulus']:.6g} MPa, E0.4={result['energy']:.6g} MPa*%")
+                if profile:
+                    progress(f"Curve: {format_footprint(result['memory'])}")
+                    progress(format_report(result['stages']))
+                if database is not None:
+                    pending_records.append(result['record'])
+                    if len(pending_records) >= UPSERT_BATCH_ROWS:
+                        database.upsert(pending_records)
+                        pending_records = []
+
+    if database is not None:
+        database.upsert(pending_records)
+        database.close()
+        progress(f"Results recorded in: {db_path}")
+
+    results.sort(key=lambda result: result['file'])
+    errors.sort()
+    write_summary_workbook(summary_path, results, errors)
+    if trace_path is not None:
+        save_chrome_trace(trace_path, [result['stages'] for result in results],
+                          [os.path.basename(result['file']) for result in results])
+        progress(f"Stage trace saved to: {trace_path}")
+    progress(f"Analysed {len(results)} of {len(files)} workbooks. Summary saved to: {summary_path}")
+    return results, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse a directory of compression test workbooks.")
+    parser.add_argument('source', help="directory of .xlsx or CSV/TXT files, or a glob pattern")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="number of worker processes (default: CPU count)")
+    parser.add_argument('-s', '--summary', default=None, help=f"summary workbook path (default: {SUMMARY_FILE} next to the inputs)")
+    parser.add_argument('--layout', choices=OUTPUT_LAYOUTS, default=None, help="write only the results instead of an updated copy")
+    parser.add_argument('--full-load', action='store_true', help="load each workbook fully even with --layout (always done without it)")
+    parser.add_argument('--no-plot', action='store_true', help="skip the stress-strain plot")
+    parser.add_argument('--cache-dir', default=None, help="reuse results of unchanged workbooks from this cache directory")
+    parser.add_argument('--sidecar', action='store_true', help="keep each parsed curve in a memory-mapped .curve.npy sidecar")
+    parser.add_argument('--profile', action='store_true', help="report the time and memory of every analysis stage")
+    parser.add_argument('--db', default=None, help="record every result in this SQLite results database")
+    parser.add_argument('--lot', default=None, help="lot recorded in the database (default: the folder name)")
+    parser.add_argument('--no-save', action='store_true', help="write no updated workbooks, e.g. to back-fill the database")
+    parser.add_argument('--trace', default=None, help="save the stage timings of all files as a Chrome trace (JSON)")
+    parser.add_argument('--memory-budget', type=float, default=None,
+                        help="MB of estimated peak memory the analyses in flight may use together")
+    add_analysis_arguments(parser)
+    args = parser.parse_args(argv)
+    # An updated copy of the input needs the whole workbook, so only a results layout is streamed
+    read_only = args.layout is not None and not args.full_load
+
+    try:
+        _, errors = run_batch(args.source, args.workers, args.summary, read_only=read_only,
+                              output_layout=args.layout, plot=not args.no_plot, cache_dir=args.cache_dir,
+                              sidecar=args.sidecar, profile=args.profile, trace_path=args.trace,
+                              db_path=args.db, lot=args.lot, save=not args.no_save,
+                              memory_budget=args.memory_budget * 1e6 if args.memory_budget else None,
+                              options=get_analysis_options(args))
+    except Exception as e:
+        print(f"Error: {e}")
+        return 1
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+import openpyxl
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+BENCHMARK_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+BENCHMARK_DIR = os.path.join(tempfile.gettempdir(), 'compression_benchmark')
+SPECIMEN = {'length': 26.0, 'width': 26.0, 'thickness': 21.5}
+
+# Same label layout as 'For test.xlsx'
+HEADER_ROWS = [
+    ['Inputs', None, 'Outputs', None, None, 'Inputs'],
+    ['Force', 'Stroke', 'Stress', 'Strain', None, 'Length, L', 'Width, W', 'Thickness, T',
+     'Maximum Stress, σc', 'Comp. Modulus, Ec', 'Energy up to 40% Strain, E0.4'],
+    ['N', 'mm', 'MPa', '%', None, 'mm', 'mm', 'mm', 'MPa', 'MPa', 'MPa'],
+]
+
+
+def synthetic_curve(rows, seed=0):
+    """Build a foam-like Force/Stroke record: linear elastic rise, plateau, then densification."""
+    rng = np.random.default_rng(seed)
+    stroke = np.linspace(0, 0.6 * SPECIMEN['thickness'], rows)
+    strain = stroke / SPECIMEN['thickness']
+    stress = 3 * strain / (1 + 5 * strain) + 4 * strain ** 3
+    force = stress * SPECIMEN['length'] * SPECIMEN['width'] + rng.normal(0, 0.5, rows)
+    return force, stroke
+
+
+def generate_workbook(file_path, rows, seed=0):
+    """Write a synthetic compression test workbook with a given number of data rows."""
+    force, stroke = synthetic_curve(rows, seed)
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Sheet1')
+    for row in HEADER_ROWS:
+        sheet.append(row)
+    sheet.append([float(force[0]), float(stroke[0]), None, None, None,
+                  SPECIMEN['length'], SPECIMEN['width'], SPECIMEN['thickness']])
+    for row in zip(force[1:].tolist(), stroke[1:].tolist()):
+        sheet.append(row)
+    workbook.save(file_path)
+    return file_path
+
+
+def get_benchmark_workbook(rows, data_dir=BENCHMARK_DIR):
+    """Return the path of the synthetic workbook for a size, generating it on first use."""
+    os.makedirs(data_dir, exist_ok=True)
+    file_path = os.path.join(data_dir, f'synthetic_{rows}.xlsx')
+    if not os.path.exists(file_path):
+        generate_workbook(file_path, rows)
+    return file_path
+
+
+def peak_rss_mb():
+    """Return the peak resident memory of this process so far, in MB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def benchmark_workbook(file_path):
+    """Time every analysis stage on one workbook and record the peak memory after each.
+
+    Meant to run in a fresh process, so the memory figures belong to this workbook only.
+    """
+    from App import (RESULT_WORDS, SEARCH_WORDS, compute_energy_upto_strain, extract_stress_and_strain,
+                     find_best_modulus_window, find_words_in_excel, insert_plot, load_excel,
+                     render_stress_strain_plot, stream_excel, write_stress_and_strain)
+
+    stages = {}
+
+    def timed(name, function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        stages[name] = {'seconds': time.perf_counter() - start, 'peak_rss_mb': peak_rss_mb()}
+        return result
+
+    def stress_and_strain(sheet, positions):
+        curve = extract_stress_and_strain(sheet, positions)
+        write_stress_and_strain(sheet, positions, *curve)
+        return curve
+
+    timed('stream_excel', stream_excel, file_path)
+    workbook = timed('load_excel', load_excel, file_path)
+    sheet = workbook.active
+    positions = timed('find_words_in_excel', find_words_in_excel, sheet, SEARCH_WORDS + RESULT_WORDS)
+    stress, strain = timed('calculate_stress_and_strain', stress_and_strain, sheet, positions)
+    timed('calculate_compression_modulus', find_best_modulus_window, stress, strain)
+    timed('calculate_energy_upto_strain', compute_energy_upto_strain, stress, strain)
+    timed('plot', lambda: insert_plot(sheet, render_stress_strain_plot(stress, strain)))
+
+    fd, output_path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        timed('save', workbook.save, output_path)
+    finally:
+        os.remove(output_path)
+    return {'rows': len(stress), 'stages': stages}
+
+
+def get_commit():
+    """Return the current git commit of the repository, if there is one."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes=BENCHMARK_SIZES, data_dir=BENCHMARK_DIR, progress=print):
+    """Benchmark every size in its own fresh process and return the report."""
+    report = {
+        'commit': get_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': [],
+    }
+    for rows in sizes:
+        file_path = get_benchmark_workbook(rows, data_dir)
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+            result = executor.submit(benchmark_workbook, file_path).result()
+        report['results'].append(result)
+        for name, stage in result['stages'].items():
+            progress(f"{rows:>9} rows  {name:<31} {stage['seconds']:9.3f} s  {stage['peak_rss_mb'] or 0:9.1f} MB")
+    return report
+
+
+def compare_reports(baseline, current, threshold=1.2):
+    """List (rows, stage, baseline seconds, current seconds, ratio) for every stage of both reports.
+
+    Also returns whether any stage got slower than ``threshold`` times its baseline.
+    """
+    baseline_stages = {result['rows']: result['stages'] for result in baseline['results']}
+    rows_out, regressed = [], False
+    for result in current['results']:
+        for name, stage in result['stages'].items():
+            before = baseline_stages.get(result['rows'], {}).get(name)
+            if before is None:
+                continue
+            ratio = stage['seconds'] / before['seconds'] if before['seconds'] else float('inf')
+            regressed = regressed or ratio > threshold
+            rows_out.append((result['rows'], name, before['seconds'], stage['seconds'], ratio))
+    return rows_out, regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the compression test analysis stages.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate = subparsers.add_parser('generate', help="write synthetic workbooks")
+    generate.add_argument('--sizes', type=int, nargs='+', default=BENCHMARK_SIZES)
+    generate.add_argument('--data-dir', default=BENCHMARK_DIR)
+
+    run = subparsers.add_parser('run', help="time every stage and save the report as JSON")
+    run.add_argument('--sizes', type=int, nargs='+', default=BENCHMARK_SIZES)
+    run.add_argument('--data-dir', default=BENCHMARK_DIR)
+    run.add_argument('-o', '--output', default='benchmark.json')
+
+    compare = subparsers.add_parser('compare', help="compare two JSON reports")
+    compare.add_argument('baseline')
+    compare.add_argument('current')
+    compare.add_argument('--threshold', type=float, default=1.2, help="slowdown ratio reported as a regression")
+    args = parser.parse_args(argv)
+
+    if args.command == 'generate':
+        for rows in args.sizes:
+            print(get_benchmark_workbook(rows, args.data_dir))
+        return 0
+
+    if args.command == 'run':
+        report = run_benchmarks(args.sizes, args.data_dir)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Benchmark report saved to: {args.output}")
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+    rows, regressed = compare_reports(baseline, current, args.threshold)
+    for size, name, before, after, ratio in rows:
+        flag = '  <-- slower' if ratio > args.threshold else ''
+        print(f"{size:>9} rows  {name:<31} {before:9.3f} s -> {after:9.3f} s  x{ratio:5.2f}{flag}")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+# Default cache location and size limit
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.compression_test_cache')
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+CACHE_VERSION = 3  # Bump when the meaning of cached values changes
+
+
+def hash_file(file_path, chunk_size=1 << 20):
+    """Return the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_cache_key(content_hash, **params):
+    """Combine a content hash and the analysis parameters into one cache key."""
+    payload = json.dumps({'hash': content_hash, 'version': CACHE_VERSION, 'params': params},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """On-disk store of analysis results with least-recently-used eviction.
+
+    Every entry is one ``.npz`` file holding named arrays plus a JSON document of scalars.
+    Reading an entry refreshes its modification time, and writing one evicts the least
+    recently used entries until the directory fits in ``max_bytes``. Entries are written
+    to a temporary file and renamed, so several processes can share one directory.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.npz')
+
+    def get(self, key):
+        """Return the (arrays, scalars) stored under a key, or None on a miss."""
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files if name != '__scalars__'}
+                scalars = json.loads(str(data['__scalars__']))
+            os.utime(path)
+        except (OSError, KeyError, ValueError):
+            return None
+        return arrays, scalars
+
+    def put(self, key, arrays=None, scalars=None):
+        """Store arrays and JSON-serializable scalars under a key."""
+        payload = dict(arrays or {})
+        payload['__scalars__'] = np.array(json.dumps(scalars or {}))
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **payload)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Delete the least recently used entries until the cache fits its size limit."""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith('.npz'):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        """Delete every entry of the cache."""
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith('.npz'):
+                    os.remove(entry.path)
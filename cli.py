@@ -0,0 +1,182 @@
+import argparse
+import json
+import sys
+import time
+
+from App import (AnalysisOptions, AnalysisPipeline, OUTPUT_LAYOUTS, SEARCH_WORDS, get_results_file_path,
+                 hash_record, write_results_workbook)
+from cache import ResultCache
+from curve import CURVE_DTYPES
+from incremental import STREAM_SAMPLE_POINTS, analyse_record
+from instrumentation import Instrumentation
+from plotting import render_stress_strain_png
+from results_db import ResultsDatabase, make_record
+
+
+def add_analysis_arguments(parser):
+    """Add the command-line options of every AnalysisOptions field to a parser."""
+    parser.add_argument('--dtype', choices=CURVE_DTYPES, default='float64', help="precision the curves are stored in")
+    parser.add_argument('--modulus-span', type=float, default=None,
+                        help="fit Ec over windows covering this much strain (%%) instead of 50 points")
+    parser.add_argument('--output-points', type=int, default=None,
+                        help="write back at most this many points of each curve (the results use all of them)")
+    parser.add_argument('--join-parts', action='store_true',
+                        help="continue each record on further sheets with Force and Stroke headers and on its _partN files")
+
+
+def get_analysis_options(args):
+    """Build the AnalysisOptions given on the command line (see :func:`add_analysis_arguments`)."""
+    return AnalysisOptions(args.dtype, args.modulus_span, args.output_points, args.join_parts)
+
+
+def describe_step(step, pipeline, value):
+    """Build the line printed after a step has run."""
+    results = pipeline.results
+    if step == 'stress_strain':
+        return f"Stress and strain calculated. Updated file will be saved to: {pipeline.output_path}"
+    if step == 'max_stress':
+        return f"Calculated Maximum Stress: {value} MPa"
+    if step == 'modulus':
+        return f"Calculated Compression Modulus: {value} MPa"
+    if step == 'energy':
+        return f"Energy up to {results['energy_strain_percentage']}% strain: {value} MPa*%"
+    if step == 'energies':
+        return 'Energies: ' + ', '.join(f"{p}%: {energy} MPa*%" for p, energy in value.items())
+    if step == 'yield':
+        return (f"Offset Yield Stress: {value['yield_stress']} MPa at {value['yield_strain']}% strain, "
+                f"Plateau Stress: {value['plateau_stress']} MPa, Toe Strain: {value['toe_strain']}%")
+    return "Stress-strain curve plotted."
+
+
+def get_scalar_results(pipeline, output_path):
+    """Collect the JSON-serializable results of a pipeline."""
+    results = pipeline.results
+    scalars = {key: results[key] for key in ('length', 'width', 'thickness', 'max_stress', 'modulus', 'energy',
+                                             'toe_strain', 'yield_stress', 'yield_strain', 'plateau_stress')
+               if key in results}
+    if 'energies' in results:
+        scalars['energies'] = {str(p): energy for p, energy in results['energies'].items()}
+    if pipeline.curve is not None:
+        scalars['memory'] = pipeline.curve.memory_footprint()
+    scalars['file'] = pipeline.file_path
+    scalars['output'] = output_path
+    return scalars
+
+
+def analyse_file(file_path, steps=AnalysisPipeline.STEPS, read_only=True, output_layout=None, output_path=None,
+                 cache_dir=None, sidecar=False, instrumentation=None, database=None, lot=None, progress=print,
+                 options=AnalysisOptions()):
+    """Run the selected steps on one workbook without a display, report each result, save once and return them.
+
+    Given a ResultsDatabase, the results are also recorded there.
+    """
+    start = time.perf_counter()
+    cache = ResultCache(cache_dir) if cache_dir else None
+    pipeline = AnalysisPipeline(file_path, SEARCH_WORDS, read_only=read_only, output_layout=output_layout,
+                                cache=cache, sidecar=sidecar, instrumentation=instrumentation, **options._asdict())
+    for step in steps:
+        value = pipeline.run_step(step)
+        progress(describe_step(step, pipeline, value))
+    updated_file = pipeline.save(output_path)
+    progress(f"Workbook saved successfully to: {updated_file}")
+    if instrumentation is not None and pipeline.curve is not None:
+        progress(f"Curve: {pipeline.curve.describe()}")
+    if database is not None:
+        database.upsert([make_record(file_path, pipeline.results, len(pipeline.stress), pipeline.get_content_hash(),
+                                     time.perf_counter() - start, updated_file, lot)])
+    return get_scalar_results(pipeline, updated_file)
+
+
+def stream_file(file_path, plot=True, output_path=None, sample_points=STREAM_SAMPLE_POINTS, database=None, lot=None,
+                progress=print, options=AnalysisOptions()):
+    """Analyse a record of any length in bounded memory and write a companion results workbook.
+
+    The record is read chunk by chunk (see :func:`incremental.analyse_record`), so no step
+    ever holds the whole curve: σc, Ec and the energies are calculated at full resolution,
+    and the workbook and plot get a sample of ``sample_points`` to twice as many points.
+    Only ``join_parts`` of the options applies. Returns the scalar results.
+    """
+    start = time.perf_counter()
+    analysis = analyse_record(file_path, sample_points, progress=lambda rows: progress(f"{rows} rows analysed"),
+                              join_parts=options.join_parts)
+    results = analysis.results()
+    stress, strain = analysis.sample()
+    png = render_stress_strain_png(stress, strain) if plot else None
+    output_path = write_results_workbook(output_path or get_results_file_path(file_path), results, stress, strain,
+                                         png, 'companion')
+    progress(f"Results saved to: {output_path}")
+    if analysis.skipped:
+        progress(f"{analysis.skipped} points where the strain does not increase were left out of the energies.")
+    if database is not None:
+        database.upsert([make_record(file_path, results, analysis.rows, hash_record(file_path, options.join_parts),
+                                     time.perf_counter() - start, output_path, lot)])
+    scalars = {key: results[key] for key in ('rows', 'length', 'width', 'thickness', 'max_stress', 'modulus',
+                                             'energy')}
+    scalars['energies'] = {str(p): energy for p, energy in results['energies'].items()}
+    scalars['file'] = file_path
+    scalars['output'] = output_path
+    return scalars
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse compression test workbooks without the GUI.")
+    parser.add_argument('files', nargs='+', help="input .xlsx workbooks or CSV/TXT exports")
+    parser.add_argument('--steps', nargs='+', choices=AnalysisPipeline.STEPS, default=list(AnalysisPipeline.STEPS),
+                        help="steps to run, in order (default: all)")
+    parser.add_argument('--no-plot', action='store_true', help="skip the stress-strain plot")
+    parser.add_argument('-o', '--output', default=None, help="output workbook path (single input only)")
+    parser.add_argument('--layout', choices=OUTPUT_LAYOUTS, default=None, help="write only the results instead of an updated copy")
+    parser.add_argument('--full-load', action='store_true', help="load each workbook fully even with --layout (always done without it)")
+    parser.add_argument('--cache-dir', default=None, help="reuse results of unchanged workbooks from this cache directory")
+    parser.add_argument('--sidecar', action='store_true', help="keep each parsed curve in a memory-mapped .curve.npy sidecar")
+    parser.add_argument('--db', default=None, help="record the results in this SQLite results database")
+    parser.add_argument('--lot', default=None, help="lot recorded in the database (default: the folder name)")
+    parser.add_argument('--json', action='store_true', help="print the results as JSON instead of text")
+    parser.add_argument('--profile', action='store_true', help="report the time and memory of every analysis stage")
+    add_analysis_arguments(parser)
+    parser.add_argument('--stream', action='store_true',
+                        help="analyse records of any length in bounded memory (σc, Ec and energies only)")
+    parser.add_argument('--sample-points', type=int, default=STREAM_SAMPLE_POINTS,
+                        help="points of the curve kept for the results workbook with --stream")
+    args = parser.parse_args(argv)
+    options = get_analysis_options(args)
+    # An updated copy of the input needs the whole workbook, so only a results layout is streamed
+    read_only = args.layout is not None and not args.full_load
+
+    if args.output and len(args.files) > 1:
+        parser.error("--output needs a single input file")
+    steps = [step for step in args.steps if not (args.no_plot and step == 'plot')]
+    progress = (lambda message: None) if args.json else print
+
+    database = ResultsDatabase(args.db) if args.db else None
+    all_results, failed = [], False
+    for file_path in args.files:
+        instrumentation = Instrumentation() if args.profile else None
+        try:
+            if args.stream:
+                results = stream_file(file_path, 'plot' in steps, args.output, args.sample_points, database, args.lot,
+                                      progress, options)
+            else:
+                results = analyse_file(file_path, steps, read_only, args.layout, args.output, args.cache_dir,
+                                       args.sidecar, instrumentation, database, args.lot, progress, options)
+        except Exception as e:
+            failed = True
+            if args.json:
+                all_results.append({'file': file_path, 'error': str(e)})
+            else:
+                print(f"Error: {e}")
+            continue
+        if instrumentation is not None:
+            results['stages'] = instrumentation.report()
+            progress(instrumentation.format_report())
+        all_results.append(results)
+    if database is not None:
+        database.close()
+
+    if args.json:
+        print(json.dumps(all_results, indent=2, ensure_ascii=False))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,9 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def sample_workbook():
+    """Path of the sample workbook shipped with the repository."""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'For test.xlsx')
@@ -0,0 +1,160 @@
+import os
+import sys
+
+import numpy as np
+
+from ingest import is_text_export
+from sidecar import is_sidecar_current, load_sidecar_metadata
+
+CURVE_DTYPES = ('float64', 'float32')
+ANALYSIS_BYTES_PER_ROW = 192  # Peak float64 working arrays per point while parsing, fitting and integrating
+XLSX_BYTES_PER_ROW = 40  # Compressed workbook bytes per data row, when the sheet does not record its size
+SAMPLE_BYTES = 1 << 16  # Bytes read from a text export to estimate its line length
+
+
+class Curve:
+    """Stress-strain curve of one specimen, held as one contiguous (2, n) array.
+
+    Stress is the first row and strain the second, as in the ``.curve.npy`` sidecar, so a
+    memory-mapped sidecar is used as it is without copying. The values are float64 by
+    default; float32 halves the memory of long records, and the calculations still run in
+    float64 on the points they read. :attr:`stress` and :attr:`strain` are read-only views,
+    so every consumer shares the same memory.
+    """
+
+    __slots__ = ('_data', 'length', 'width', 'thickness', 'source')
+
+    def __init__(self, data, length=None, width=None, thickness=None, source=None):
+        data = np.asanyarray(data)  # Keeps a sidecar's memmap a memmap
+        if data.ndim != 2 or data.shape[0] != 2:
+            raise ValueError(f"A curve needs a (2, n) array, not {data.shape}.")
+        if data.dtype.name not in CURVE_DTYPES:
+            raise ValueError(f"Unsupported curve dtype '{data.dtype}'; use one of {', '.join(CURVE_DTYPES)}.")
+        self._data = data
+        self.length, self.width, self.thickness = length, width, thickness
+        self.source = source
+
+    @classmethod
+    def from_force_stroke(cls, force, stroke, length, width, thickness, dtype='float64', source=None):
+        """Convert Force and Stroke columns into stress (MPa) and strain (%), stored as ``dtype``."""
+        force = np.asarray(force, dtype=float)
+        stroke = np.asarray(stroke, dtype=float)
+        if len(force) != len(stroke):
+            raise ValueError("Force and Stroke lengths mismatch.")
+        data = np.empty((2, len(force)), dtype=dtype)
+        data[0] = force / (length * width)
+        data[1] = (stroke / thickness) * 100
+        return cls(data, length, width, thickness, source)
+
+    @classmethod
+    def from_arrays(cls, stress, strain, length=None, width=None, thickness=None, dtype='float64', source=None):
+        """Copy separate stress and strain arrays into one curve."""
+        if len(stress) != len(strain):
+            raise ValueError("Stress and strain lengths mismatch.")
+        data = np.empty((2, len(stress)), dtype=dtype)
+        data[0], data[1] = stress, strain
+        return cls(data, length, width, thickness, source)
+
+    def __len__(self):
+        return self._data.shape[1]
+
+    def __repr__(self):
+        return f"Curve({len(self)} points, {self.dtype}, source={self.source!r})"
+
+    def _row(self, index):
+        view = self._data[index].view()
+        view.flags.writeable = False
+        return view
+
+    @property
+    def stress(self):
+        return self._row(0)
+
+    @property
+    def strain(self):
+        return self._row(1)
+
+    @property
+    def data(self):
+        """The (2, n) array, read-only."""
+        view = self._data.view()
+        view.flags.writeable = False
+        return view
+
+    @property
+    def dtype(self):
+        return self._data.dtype
+
+    @property
+    def dimensions(self):
+        return {'length': self.length, 'width': self.width, 'thickness': self.thickness}
+
+    @property
+    def mapped(self):
+        """Whether the values are memory-mapped from a sidecar rather than held in memory."""
+        return isinstance(self._data, np.memmap)
+
+    @property
+    def nbytes(self):
+        return self._data.nbytes
+
+    def astype(self, dtype):
+        """Return the curve stored as ``dtype``, or the curve itself if it already is."""
+        if self.dtype == np.dtype(dtype):
+            return self
+        return Curve(self._data.astype(dtype), self.length, self.width, self.thickness, self.source)
+
+    def memory_footprint(self):
+        """Report the bytes taken by the values and by the object itself."""
+        return {
+            'rows': len(self),
+            'dtype': self.dtype.name,
+            'array_bytes': self.nbytes,
+            'object_bytes': sys.getsizeof(self),
+            'mapped': self.mapped,
+        }
+
+    def describe(self):
+        """Summarize the size of the curve in one line."""
+        return format_footprint(self.memory_footprint())
+
+
+def format_footprint(footprint):
+    """Format a memory footprint from :meth:`Curve.memory_footprint` as one line."""
+    where = 'memory-mapped' if footprint['mapped'] else 'in memory'
+    return f"{footprint['rows']} points, {footprint['dtype']}, {footprint['array_bytes'] / 1e6:.2f} MB {where}"
+
+
+def estimate_rows(file_path):
+    """Estimate the number of data rows of a workbook or text export without parsing it.
+
+    A current sidecar gives the exact count. Workbooks are asked for the size recorded in
+    their sheet, or judged by their file size when they record none; text exports are
+    judged by their size and the length of their first lines.
+    """
+    metadata = load_sidecar_metadata(file_path)
+    if is_sidecar_current(file_path, metadata):
+        return metadata['rows']
+    size = os.path.getsize(file_path)
+    if is_text_export(file_path):
+        with open(file_path, 'rb') as f:
+            sample = f.read(SAMPLE_BYTES)
+        lines = sample.count(b'\n')
+        return size // max(len(sample) // max(lines, 1), 1)
+
+    import openpyxl
+
+    try:
+        workbook = openpyxl.load_workbook(file_path, read_only=True)
+    except Exception:
+        return size // XLSX_BYTES_PER_ROW
+    try:
+        rows = workbook.active.max_row
+    finally:
+        workbook.close()
+    return rows if rows else size // XLSX_BYTES_PER_ROW
+
+
+def estimate_analysis_bytes(rows, dtype='float64'):
+    """Estimate the peak memory of analysing a curve of ``rows`` points stored as ``dtype``."""
+    return rows * (2 * np.dtype(dtype).itemsize + ANALYSIS_BYTES_PER_ROW)
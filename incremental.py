@@ -0,0 +1,445 @@
+import argparse
+import sys
+
+import numpy as np
+
+from App import (DATA_WORDS, DIMENSION_WORDS, ENERGY_STRAIN_PERCENTAGES, MODULUS_WINDOW_SIZE, EnergyCurve,
+                 compute_stress_and_strain, fit_modulus_window, get_text_dimensions, iter_record,
+                 sliding_window_regression)
+from ingest import CHUNK_ROWS, follow_text_export, iter_text_export, load_dimensions_file
+
+INITIAL_CAPACITY = 4096
+STREAM_SAMPLE_POINTS = 10000  # Points of the curve kept by a streaming analysis for the output
+
+
+class GrowingArray:
+    """Float array that doubles its capacity when full, so appending n values costs O(n) overall."""
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self._data = np.empty(capacity)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def extend(self, values):
+        """Append values at the end."""
+        values = np.asarray(values, dtype=float)
+        size = self.size + len(values)
+        if size > len(self._data):
+            data = np.empty(max(size, 2 * len(self._data)))
+            data[:self.size] = self._data[:self.size]
+            self._data = data
+        self._data[self.size:size] = values
+        self.size = size
+
+    def truncate(self, size):
+        """Drop every value from ``size`` on."""
+        self.size = min(self.size, size)
+
+    def view(self):
+        """Return the values as a read-only array, without copying them."""
+        values = self._data[:self.size]
+        values.flags.writeable = False
+        return values
+
+
+def _simpson_subintervals(f1, f2, f3, x21, x32):
+    """Integrate the first interval of each point triple, as scipy's cumulative_simpson does.
+
+    Written with the same operations in the same order, so the running integral built from
+    these pieces is identical to the one computed over the whole curve at once.
+    """
+    x31 = x21 + x32
+    x21_x31 = x21 / x31
+    x21_x32 = x21 / x32
+    x21x21_x31x32 = x21_x31 * x21_x32
+    coeff1 = 3 - x21_x31
+    coeff2 = 3 + x21x21_x31x32 + x21_x31
+    coeff3 = -x21x21_x31x32
+    return x21 / 6 * (coeff1 * f1 + coeff2 * f2 + coeff3 * f3)
+
+
+class IncrementalAnalysis:
+    """Analysis of a test record that grows while the press is running.
+
+    Each :meth:`append` of a (force, stroke) chunk updates the curve, the running maximum
+    stress, the best modulus window and the cumulative energy integral in O(chunk) time:
+
+    - only the windows ending inside the new chunk are fitted, with the same cumulative-sum
+      regression as :func:`App.find_best_modulus_window`, and the best one is refitted
+      exactly and kept if its r beats the best so far (earlier windows win ties);
+    - cumulative Simpson's rule gives each interval a value from its neighbouring points
+      only, so every interval is final once the point after it has arrived. Only the last
+      interval is provisional and is recomputed on the next append.
+
+    :meth:`snapshot` returns the same results as the batch functions for the curve so far,
+    up to the rounding of near-identical modulus windows. Points that do not move the strain
+    forward are left out of the energy integral, as in :class:`StreamingAnalysis`; for a
+    repeated strain this is what :class:`App.EnergyCurve` does too, while a strain that falls
+    back would make the batch code re-sort the whole curve.
+    """
+
+    def __init__(self, length, width, thickness, window_size=MODULUS_WINDOW_SIZE, energy_strain_percentage=40,
+                 max_strain_percentages=ENERGY_STRAIN_PERCENTAGES):
+        self.length, self.width, self.thickness = length, width, thickness
+        self.window_size = window_size
+        self.energy_strain_percentage = energy_strain_percentage
+        self.max_strain_percentages = list(max_strain_percentages)
+        self._stress = GrowingArray()
+        self._strain = GrowingArray()
+        # Points that move the strain forward, and the running energy integral at each of them
+        self._energy_stress = GrowingArray()
+        self._energy_strain = GrowingArray()
+        self._cumulative = GrowingArray()
+        self._cumulative.extend([0.0])
+        self._final_intervals = 0  # Intervals whose Simpson integral can no longer change
+        self.skipped = 0  # Points left out of the energy integral
+        self.max_stress = None
+        self.fit = None
+
+    @property
+    def stress(self):
+        return self._stress.view()
+
+    @property
+    def strain(self):
+        return self._strain.view()
+
+    def __len__(self):
+        return len(self._stress)
+
+    def append(self, force, stroke):
+        """Add a chunk of force and stroke values and update every result."""
+        stress, strain = compute_stress_and_strain(force, stroke, self.length, self.width, self.thickness)
+        if not len(stress):
+            return len(self)
+        previous = len(self)
+        self._stress.extend(stress)
+        self._strain.extend(strain)
+
+        chunk_max = float(np.max(stress))
+        if self.max_stress is None or chunk_max > self.max_stress:
+            self.max_stress = chunk_max
+        self._update_modulus(previous)
+
+        # Keep only the points that move the strain forward
+        last = self._energy_strain.view()[-1:]
+        top = np.maximum.accumulate(np.concatenate([last, strain]))
+        forward = strain > (top[:-1] if len(last) else np.r_[-np.inf, top[:-1]])
+        self.skipped += int(np.count_nonzero(~forward))
+        if np.any(forward):
+            self._energy_stress.extend(stress[forward])
+            self._energy_strain.extend(strain[forward])
+            self._update_cumulative()
+        return len(self)
+
+    def _update_modulus(self, previous):
+        """Fit the windows that end inside the newly appended points."""
+        size, window_size = len(self), self.window_size
+        first = max(previous - window_size + 1, 0)
+        if size - first < window_size:
+            return
+        stress, strain = self.stress[first:], self.strain[first:]
+        _, _, r = sliding_window_regression(stress, strain, window_size)
+        if np.all(np.isnan(r)):
+            return
+        fit = fit_modulus_window(self.stress, self.strain, first + int(np.nanargmax(r)), window_size)
+        if self.fit is None or fit.r > self.fit.r:
+            self.fit = fit
+
+    def _update_cumulative(self):
+        """Extend the running energy integral over the newly final intervals."""
+        size = len(self._energy_stress)
+        self._cumulative.truncate(self._final_intervals + 1)  # Drop the provisional last value
+        if size < 3:
+            return
+        x, y = self._energy_strain.view(), self._energy_stress.view()
+
+        # Even intervals use the point after them (scipy's h1 pieces), odd ones the point before (h2)
+        k = np.arange(self._final_intervals, size - 2)
+        if len(k):
+            even = k % 2 == 0
+            other = np.where(even, k + 2, k - 1)
+            f1 = np.where(even, y[k], y[k + 1])
+            f2 = np.where(even, y[k + 1], y[k])
+            x32 = np.where(even, x[np.minimum(k + 2, size - 1)] - x[k + 1], x[k] - x[np.maximum(k - 1, 0)])
+            pieces = _simpson_subintervals(f1, f2, y[other], x[k + 1] - x[k], x32)
+            cumulative = self._cumulative.view()
+            self._cumulative.extend(np.cumsum(np.concatenate(([cumulative[-1]], pieces)))[1:])
+            self._final_intervals = size - 2
+
+        # The last interval can only use the point before it until another point arrives
+        last = _simpson_subintervals(y[-1], y[-2], y[-3], x[-1] - x[-2], x[-2] - x[-3])
+        self._cumulative.extend([self._cumulative.view()[-1] + last])
+
+    def energy_curve(self):
+        """Return the EnergyCurve of the points so far, reusing the running integral when possible."""
+        stress, strain = self._energy_stress.view(), self._energy_strain.view()
+        if len(stress) >= 3:
+            return EnergyCurve.from_cumulative(stress, strain, self._cumulative.view())
+        return EnergyCurve(stress, strain)
+
+    def snapshot(self):
+        """Return the current results, with the same keys as AnalysisPipeline.results.
+
+        Energies whose cutoff is not reached by at least two points yet are None.
+        """
+        percentages = self.max_strain_percentages + [self.energy_strain_percentage]
+        if len(self._energy_stress) >= 2:
+            energies = self.energy_curve().energy_upto(percentages, strict=False).tolist()
+            energies = [None if np.isnan(energy) else energy for energy in energies]
+        else:
+            energies = [None] * len(percentages)
+        return {
+            'rows': len(self),
+            'length': self.length,
+            'width': self.width,
+            'thickness': self.thickness,
+            'max_stress': self.max_stress,
+            'modulus': self.fit.slope if self.fit else 0,
+            'modulus_fit': self.fit,
+            'energy': energies[-1],
+            'energy_strain_percentage': self.energy_strain_percentage,
+            'energies': dict(zip(self.max_strain_percentages, energies[:-1])),
+        }
+
+
+class StreamingAnalysis:
+    """Analysis of a record of any length in bounded memory, one chunk at a time.
+
+    Unlike :class:`IncrementalAnalysis`, the curve is not kept. Only what the next chunk
+    needs is: the last ``window_size - 1`` points for the modulus windows, the last three
+    points and their running integral for the energies, and the energy cutoffs not reached
+    yet. Every cutoff is resolved once the curve has passed it. The results are those of
+    the batch functions on the whole curve, as long as the strain never falls back; points
+    where it does are left out of the energy integral, as the curve cannot be re-sorted
+    without holding all of it. Repeated strains are left out as in :class:`App.EnergyCurve`.
+
+    A strided sample of the curve, of ``sample_points`` to twice as many points, is kept
+    for writing the results and plotting; the stride doubles whenever the sample fills up.
+    """
+
+    def __init__(self, length, width, thickness, window_size=MODULUS_WINDOW_SIZE, energy_strain_percentage=40,
+                 max_strain_percentages=ENERGY_STRAIN_PERCENTAGES, sample_points=STREAM_SAMPLE_POINTS):
+        self.length, self.width, self.thickness = length, width, thickness
+        self.window_size = window_size
+        self.energy_strain_percentage = energy_strain_percentage
+        self.max_strain_percentages = list(max_strain_percentages)
+        self.sample_points = sample_points
+        self.rows = 0
+        self.max_stress = None
+        self.fit = None
+        self.skipped = 0  # Points left out of the energy integral
+        # Last points of the curve, for the modulus windows ending in the next chunk
+        self._window_stress = self._window_strain = np.empty(0)
+        # Last energy points from absolute point _energy_base on, and the running integral at them
+        self._energy_stress = self._energy_strain = np.empty(0)
+        self._energy_cumulative = np.zeros(1)
+        self._energy_base = self._energy_points = self._final_intervals = 0
+        self._energies = {}
+        self._pending = sorted(set(self.max_strain_percentages + [energy_strain_percentage]))
+        self._sample_stress, self._sample_strain, self._sample_index = GrowingArray(), GrowingArray(), GrowingArray()
+        self._stride = 1
+
+    def __len__(self):
+        return self.rows
+
+    def append(self, force, stroke):
+        """Add a chunk of force and stroke values and update every result."""
+        stress, strain = compute_stress_and_strain(force, stroke, self.length, self.width, self.thickness)
+        if not len(stress):
+            return self.rows
+        previous, self.rows = self.rows, self.rows + len(stress)
+
+        chunk_max = float(np.max(stress))
+        if self.max_stress is None or chunk_max > self.max_stress:
+            self.max_stress = chunk_max
+        self._update_modulus(previous, stress, strain)
+        self._update_energy(stress, strain)
+        self._update_sample(previous, stress, strain)
+        return self.rows
+
+    def _update_modulus(self, previous, stress, strain):
+        """Fit the windows that end inside the new chunk, as IncrementalAnalysis does."""
+        stress = np.concatenate([self._window_stress, stress])
+        strain = np.concatenate([self._window_strain, strain])
+        first = previous - len(self._window_stress)  # Absolute index of the first point kept
+        kept = max(len(stress) - self.window_size + 1, 0)
+        self._window_stress, self._window_strain = stress[kept:], strain[kept:]
+        if len(stress) < self.window_size:
+            return
+        _, _, r = sliding_window_regression(stress, strain, self.window_size)
+        if np.all(np.isnan(r)):
+            return
+        fit = fit_modulus_window(stress, strain, int(np.nanargmax(r)), self.window_size)
+        if self.fit is None or fit.r > self.fit.r:
+            self.fit = fit._replace(start=fit.start + first, end=fit.end + first)
+
+    def _update_energy(self, stress, strain):
+        """Extend the running energy integral and resolve the cutoffs the curve has passed."""
+        # Keep only the points that move the strain forward
+        top = np.maximum.accumulate(np.concatenate([self._energy_strain[-1:], strain]))
+        forward = strain > (top[:-1] if len(self._energy_strain) else np.r_[-np.inf, top[:-1]])
+        self.skipped += int(np.count_nonzero(~forward))
+        x = np.concatenate([self._energy_strain, strain[forward]])
+        y = np.concatenate([self._energy_stress, stress[forward]])
+        base, size = self._energy_base, self._energy_points + int(np.count_nonzero(forward))
+        self._energy_points = size
+        if size < 3:
+            self._energy_stress, self._energy_strain = y, x
+            return
+
+        # Drop the provisional last value, then add the intervals that became final (see IncrementalAnalysis)
+        cumulative = self._energy_cumulative[:self._final_intervals + 1 - base]
+        k = np.arange(self._final_intervals, size - 2)
+        if len(k):
+            even = k % 2 == 0
+            j = k - base  # Positions in the kept points
+            other = np.where(even, j + 2, j - 1)
+            f1 = np.where(even, y[j], y[j + 1])
+            f2 = np.where(even, y[j + 1], y[j])
+            x32 = np.where(even, x[np.minimum(j + 2, len(x) - 1)] - x[j + 1], x[j] - x[np.maximum(j - 1, 0)])
+            pieces = _simpson_subintervals(f1, f2, y[other], x[j + 1] - x[j], x32)
+            cumulative = np.cumsum(np.concatenate(([cumulative[-1]], pieces)))
+            cumulative = np.concatenate([self._energy_cumulative[:self._final_intervals - base], cumulative])
+            self._final_intervals = size - 2
+        last = _simpson_subintervals(y[-1], y[-2], y[-3], x[-1] - x[-2], x[-2] - x[-3])
+        cumulative = np.concatenate([cumulative, [cumulative[-1] + last]])
+
+        reached = [p for p in self._pending if p / 100 < x[-1]]
+        if reached:
+            energies = EnergyCurve.from_cumulative(y, x, cumulative).energy_upto(reached, strict=False)
+            self._resolve(reached, energies)
+
+        # The next intervals need the point before the first of them and the last three points
+        drop = max(size - 3 - base, 0)
+        self._energy_stress, self._energy_strain, self._energy_cumulative = y[drop:], x[drop:], cumulative[drop:]
+        self._energy_base = base + drop
+
+    def _resolve(self, percentages, energies):
+        for percentage, energy in zip(percentages, np.atleast_1d(energies).tolist()):
+            self._energies[percentage] = None if np.isnan(energy) else energy
+            self._pending.remove(percentage)
+
+    def _update_sample(self, previous, stress, strain):
+        """Keep every point whose index is a multiple of the stride, doubling the stride when full."""
+        index = np.arange(previous, self.rows)
+        keep = index % self._stride == 0
+        self._sample_stress.extend(stress[keep])
+        self._sample_strain.extend(strain[keep])
+        self._sample_index.extend(index[keep])
+        while len(self._sample_index) > 2 * self.sample_points:
+            self._stride *= 2
+            keep = self._sample_index.view() % self._stride == 0
+            samples = [array.view()[keep] for array in (self._sample_stress, self._sample_strain, self._sample_index)]
+            for array, values in zip((self._sample_stress, self._sample_strain, self._sample_index), samples):
+                array.truncate(0)
+                array.extend(values)
+
+    def sample(self):
+        """Return the sampled stress and strain."""
+        return self._sample_stress.view(), self._sample_strain.view()
+
+    def finish(self):
+        """Resolve the energy cutoffs the curve never passed, once the last chunk is in."""
+        if not self._pending:
+            return
+        if self._energy_points >= 3:
+            curve = EnergyCurve.from_cumulative(self._energy_stress, self._energy_strain, self._energy_cumulative)
+        else:
+            curve = EnergyCurve(self._energy_stress, self._energy_strain)
+        if self._energy_points >= 2:
+            self._resolve(list(self._pending), curve.energy_upto(list(self._pending), strict=False))
+        else:
+            self._resolve(list(self._pending), [np.nan] * len(self._pending))
+
+    def results(self):
+        """Return the results, with the same keys as AnalysisPipeline.results.
+
+        Energies whose cutoff has not been passed yet are None until :meth:`finish`.
+        """
+        energies = {p: self._energies.get(p) for p in self.max_strain_percentages}
+        return {
+            'rows': self.rows,
+            'length': self.length,
+            'width': self.width,
+            'thickness': self.thickness,
+            'max_stress': self.max_stress,
+            'modulus': self.fit.slope if self.fit else 0,
+            'modulus_fit': self.fit,
+            'energy': self._energies.get(self.energy_strain_percentage),
+            'energy_strain_percentage': self.energy_strain_percentage,
+            'energies': energies,
+        }
+
+
+def analyse_record(file_path, sample_points=STREAM_SAMPLE_POINTS, chunk_rows=CHUNK_ROWS, progress=None,
+                   join_parts=False):
+    """Analyse a workbook or text export of any length in bounded memory.
+
+    With ``join_parts`` the record also continues on further sheets and part files (see :func:`App.iter_record`).
+    ``progress(rows)`` is called after every chunk. Returns the finished StreamingAnalysis.
+    """
+    record = iter_record(file_path, DATA_WORDS, chunk_rows, join_parts)
+    analysis = StreamingAnalysis(*next(record), sample_points=sample_points)
+    for chunk in record:
+        if len(chunk['Force']):
+            analysis.append(chunk['Force'], chunk['Stroke'])
+            if progress is not None:
+                progress(analysis.rows)
+    analysis.finish()
+    return analysis
+
+
+def format_snapshot(snapshot):
+    """Format the main results of a snapshot as one status line."""
+    def number(value):
+        return '-' if value is None else f"{value:.6g}"
+
+    return (f"{snapshot['rows']} rows: σc={number(snapshot['max_stress'])} MPa, "
+            f"Ec={number(snapshot['modulus'])} MPa, "
+            f"E{snapshot['energy_strain_percentage'] / 100:g}={number(snapshot['energy'])} MPa*%")
+
+
+def watch_text_export(file_path, follow=True, poll_interval=0.5, idle_timeout=None, stop=None, progress=print):
+    """Analyse a CSV/TXT export chunk by chunk, reporting the results after every chunk.
+
+    With ``follow`` the file is tailed while the testing machine writes it (see
+    :func:`ingest.follow_text_export`). Returns the final IncrementalAnalysis.
+    """
+    if follow:
+        chunks = follow_text_export(file_path, DATA_WORDS, DIMENSION_WORDS, poll_interval, idle_timeout, stop)
+    else:
+        chunks = iter_text_export(file_path, DATA_WORDS, DIMENSION_WORDS)
+    dimensions = next(chunks)
+    for word, value in load_dimensions_file(file_path, DIMENSION_WORDS).items():
+        dimensions.setdefault(word, value)
+    analysis = IncrementalAnalysis(*get_text_dimensions(file_path, dimensions))
+    for chunk in chunks:
+        if len(chunk['Force']):  # Chunks of units rows or footers carry no data
+            analysis.append(chunk['Force'], chunk['Stroke'])
+            progress(format_snapshot(analysis.snapshot()))
+    return analysis
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Follow a CSV/TXT export and update the results as rows arrive.")
+    parser.add_argument('file', help="CSV/TXT export being written by the testing machine")
+    parser.add_argument('--no-follow', action='store_true', help="read the file once instead of waiting for new rows")
+    parser.add_argument('--poll', type=float, default=0.5, help="seconds between checks for new rows")
+    parser.add_argument('--idle-timeout', type=float, default=None, help="stop after this many seconds without new rows")
+    args = parser.parse_args(argv)
+
+    try:
+        watch_text_export(args.file, not args.no_follow, args.poll, args.idle_timeout)
+    except KeyboardInterrupt:
+        return 0
+    except Exception as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
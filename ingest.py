@@ -0,0 +1,225 @@
+import json
+import os
+import re
+import time
+from array import array
+from itertools import islice
+
+import numpy as np
+
+TEXT_EXTENSIONS = ('.csv', '.txt', '.tsv', '.dat')
+CHUNK_ROWS = 65536  # Data lines parsed per np.loadtxt call
+HEADER_LINES = 200  # The column header must appear within these first lines
+DELIMITERS = ('\t', ';', ',')
+NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+DECIMAL_COMMA_NUMBER = re.compile(r'[-+]?(?:\d+[.,]?\d*|[.,]\d+)(?:[eE][-+]?\d+)?')
+
+
+def is_text_export(file_path):
+    """Check whether a file is a delimited text export rather than a workbook."""
+    return os.path.splitext(file_path)[1].lower() in TEXT_EXTENSIONS
+
+
+def get_dimensions_path(file_path):
+    """Build the path of the JSON file that may hold a text export's specimen dimensions."""
+    stem, _ = os.path.splitext(file_path)
+    return stem + '.specimen.json'
+
+
+def _label_key(label):
+    """Reduce a label like 'Length, L' or 'Force (N)' to its leading word, in lower case."""
+    return re.split(r'[\s,(\[:=]', label.strip().strip('"\''), maxsplit=1)[0].lower()
+
+
+def _split_line(line, delimiter):
+    """Split a line on a delimiter, or on runs of whitespace when the delimiter is None."""
+    return [field.strip().strip('"\'') for field in line.split(delimiter)]
+
+
+def _find_header(line, data_words):
+    """Return the delimiter and the column of every data word if a line is the column header."""
+    keys = [_label_key(word) for word in data_words]
+    for delimiter in DELIMITERS + (None,):
+        fields = _split_line(line, delimiter)
+        if delimiter is None:
+            # Units in brackets are separate fields when splitting on whitespace
+            fields = [field for field in fields if not field.startswith(('(', '['))]
+        fields = [_label_key(field) if field else '' for field in fields]
+        if all(key in fields for key in keys):
+            return delimiter, [fields.index(key) for key in keys]
+    return None
+
+
+def _read_dimension(line, dimension_words, decimal_comma=False):
+    """Return (word, value) if a header-block line gives one of the specimen dimensions.
+
+    With ``decimal_comma`` a comma inside the number is read as its decimal point.
+    """
+    text = line.strip().strip('"\'')
+    for word in dimension_words:
+        # Skip the label before looking for the number, so the 'L' of 'Length, L' is not read
+        if text.lower().startswith(word.lower()):
+            rest = text[len(word):]
+        elif _label_key(text) == _label_key(word):
+            rest = text[len(_label_key(word)):]
+        else:
+            continue
+        match = (DECIMAL_COMMA_NUMBER if decimal_comma else NUMBER).search(rest)
+        if match:
+            return word, float(match.group().replace(',', '.'))
+    return None
+
+
+def load_dimensions_file(file_path, dimension_words):
+    """Read the specimen dimensions of a text export from its ``.specimen.json``, if it has one.
+
+    Keys may be the labels themselves ('Length, L') or their leading words ('length').
+    """
+    try:
+        with open(get_dimensions_path(file_path), encoding='utf-8') as f:
+            values = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    values = {_label_key(key): value for key, value in values.items()}
+    return {word: float(values[_label_key(word)]) for word in dimension_words if _label_key(word) in values}
+
+
+def _parse_lines(lines, delimiter, columns):
+    """Parse the given columns of a chunk of data lines into a (rows, len(columns)) array.
+
+    The whole chunk goes through np.loadtxt; if any line in it is not numeric (units rows,
+    blank lines, footers), the chunk is parsed again line by line and those lines are skipped.
+    Unless the delimiter is a comma, commas are read as decimal points.
+    """
+    if delimiter != ',' and any(',' in line for line in lines):
+        lines = [line.replace(',', '.') for line in lines]
+    try:
+        return np.loadtxt(lines, delimiter=delimiter, usecols=columns, ndmin=2, dtype=float, quotechar='"')
+    except (ValueError, IndexError):
+        pass
+    rows = array('d')
+    for line in lines:
+        fields = _split_line(line, delimiter)
+        try:
+            rows.extend(float(fields[column]) for column in columns)
+        except (ValueError, IndexError):
+            continue
+    return np.frombuffer(rows, dtype=float).reshape(-1, len(columns))
+
+
+def _read_header_block(f, file_path, data_words, dimension_words, header_lines):
+    """Read lines up to the column header, collecting the dimensions given above it.
+
+    The dimensions are only parsed once the header gives the delimiter, as a file that is
+    not comma-delimited may use decimal commas. Returns the dimensions, the delimiter and
+    the column of every data word, and the number of characters read.
+    """
+    block, position = [], 0
+    for line in islice(f, header_lines):
+        position += len(line)
+        header = _find_header(line, data_words)
+        if header is not None:
+            dimensions = {}
+            for block_line in block:
+                dimension = _read_dimension(block_line, dimension_words, decimal_comma=header[0] != ',')
+                if dimension is not None:
+                    dimensions.setdefault(*dimension)
+            return dimensions, header, position
+        block.append(line)
+    raise ValueError(f"No column header with {', '.join(data_words)} found in {file_path}.")
+
+
+def _parse_chunk(lines, delimiter, columns, data_words):
+    """Parse a chunk of data lines into one array per data word."""
+    values = _parse_lines(lines, delimiter, columns)
+    return {word: values[:, i] for i, word in enumerate(data_words)}
+
+
+def iter_text_export(file_path, data_words, dimension_words=(), chunk_rows=CHUNK_ROWS, header_lines=HEADER_LINES):
+    """Read a delimited Force/Stroke export in chunks.
+
+    The lines above the column header form the header block, where a line starting with a
+    dimension label (e.g. ``Thickness, T: 21.5``) gives that dimension. The column header is
+    the first line naming every data word; labels match on their leading word, so
+    'Force (kN)' and 'force' both map to 'Force'. Tab, semicolon, comma and whitespace
+    delimiters are recognized.
+
+    The first item yielded is the dict of dimensions found in the header block; every
+    following item is a dict with one array per data word plus the number of characters
+    read so far under 'position', for progress reporting.
+    """
+    with open(file_path, encoding='utf-8-sig', errors='replace', newline='') as f:
+        dimensions, (delimiter, columns), position = _read_header_block(f, file_path, data_words, dimension_words,
+                                                                         header_lines)
+        yield dimensions
+
+        while True:
+            lines = list(islice(f, chunk_rows))
+            if not lines:
+                break
+            position += sum(len(line) for line in lines)
+            chunk = _parse_chunk(lines, delimiter, columns, data_words)
+            chunk['position'] = position
+            yield chunk
+
+
+def follow_text_export(file_path, data_words, dimension_words=(), poll_interval=0.5, idle_timeout=None,
+                       stop=None, chunk_rows=CHUNK_ROWS, header_lines=HEADER_LINES):
+    """Read a text export that the testing machine is still writing, like ``tail -f``.
+
+    Yields the header-block dimensions first, as :func:`iter_text_export` does, then one
+    dict of arrays per batch of complete lines as they are appended; a line still being
+    written is held back until its end arrives. Reading stops once ``stop()`` returns True
+    or no new line has arrived for ``idle_timeout`` seconds (None waits indefinitely).
+    """
+    with open(file_path, encoding='utf-8-sig', errors='replace', newline='') as f:
+        dimensions, (delimiter, columns), _ = _read_header_block(f, file_path, data_words, dimension_words,
+                                                                  header_lines)
+        yield dimensions
+
+        lines, partial = [], ''
+        last_data = time.monotonic()
+        while stop is None or not stop():
+            line = f.readline()
+            if line:
+                partial += line
+                if partial.endswith('\n'):
+                    lines.append(partial)
+                    partial = ''
+                if len(lines) < chunk_rows:
+                    continue
+            if lines:
+                yield _parse_chunk(lines, delimiter, columns, data_words)
+                lines = []
+                last_data = time.monotonic()
+                continue
+            if idle_timeout is not None and time.monotonic() - last_data > idle_timeout:
+                break
+            time.sleep(poll_interval)
+
+        lines += [partial] if partial else []
+        if lines:
+            yield _parse_chunk(lines, delimiter, columns, data_words)
+
+
+def read_text_export(file_path, data_words, dimension_words=(), chunk_rows=CHUNK_ROWS, progress=None):
+    """Read a whole delimited export into one array per data word, plus its dimensions.
+
+    Dimensions missing from the header block are taken from the ``.specimen.json`` next to
+    the file. ``progress(characters_read, file_size)`` is called after every chunk and may
+    raise to stop the read.
+    """
+    total = os.path.getsize(file_path)
+    chunks = iter_text_export(file_path, data_words, dimension_words, chunk_rows)
+    dimensions = next(chunks)
+    for word, value in load_dimensions_file(file_path, dimension_words).items():
+        dimensions.setdefault(word, value)
+
+    parts = {word: [] for word in data_words}
+    for chunk in chunks:
+        for word in data_words:
+            parts[word].append(chunk[word])
+        if progress is not None:
+            progress(min(chunk['position'], total), total)
+    columns = {word: np.concatenate(parts[word]) if parts[word] else np.empty(0) for word in data_words}
+    return columns, dimensions
@@ -0,0 +1,136 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class Instrumentation:
+    """Opt-in record of the wall time, CPU time, peak memory and row count of analysis stages.
+
+    Stages are opened with :meth:`stage` and may nest; the record of each one keeps its
+    depth and parent so reports can be shown flat or as a tree. Peak memory is measured
+    with tracemalloc as the most memory allocated at any point of the stage above what was
+    allocated when it started. Tracing slows allocation-heavy code noticeably, so it can be
+    turned off with ``trace_memory=False``. CPU time is the time of the whole process,
+    including NumPy's helper threads. One instance is meant to be used by one thread at a time.
+    """
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.records = []
+        self.origin = time.perf_counter()
+        self.epoch = time.time()  # Wall clock at the origin, to line up traces of several processes
+        self._stack = []
+        self._started_tracing = False
+
+    def _start_memory_frame(self):
+        """Start measuring a stage's peak memory without losing its parent's peak so far."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+        tracemalloc.reset_peak()
+        return {'base': current, 'peak': current}
+
+    def _end_memory_frame(self, frame):
+        """Return the peak memory of a stage above its start and hand the peak to its parent."""
+        peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+        if self._stack:
+            self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+        return peak - frame['base']
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """Measure the code inside a ``with`` block as one stage.
+
+        Yields the stage's record, so the row count can be filled in once it is known.
+        """
+        record = {
+            'name': name,
+            'rows': rows,
+            'depth': len(self._stack),
+            'parent': self._stack[-1]['record']['name'] if self._stack else None,
+            'thread': threading.get_ident(),
+        }
+        frame = self._start_memory_frame() if self.trace_memory else {}
+        frame['record'] = record
+        self._stack.append(frame)
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record['cpu_seconds'] = time.process_time() - cpu_start
+            record['start_seconds'] = wall_start - self.origin
+            record['wall_seconds'] = time.perf_counter() - wall_start
+            self._stack.pop()
+            record['peak_bytes'] = self._end_memory_frame(frame) if self.trace_memory else None
+            self.records.append(record)
+            if self._started_tracing and not self._stack:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+    def report(self):
+        """Return the recorded stages in the order they started, as a JSON-serializable dict."""
+        return {
+            'pid': os.getpid(),
+            'epoch': self.epoch,
+            'stages': sorted(self.records, key=lambda record: record['start_seconds']),
+        }
+
+    def format_report(self):
+        """Format the report as a text table, one indented line per stage."""
+        return format_report(self.report())
+
+    def save_trace(self, trace_path):
+        """Write the stages as a Chrome trace (chrome://tracing or Perfetto)."""
+        return save_chrome_trace(trace_path, [self.report()])
+
+
+def format_report(report):
+    """Format a stage report as a text table, one line per stage, nested stages indented."""
+    lines = [f"{'Stage':<28} {'Rows':>10} {'Wall (s)':>10} {'CPU (s)':>10} {'Peak (MB)':>10}"]
+    for record in report['stages']:
+        name = '  ' * record['depth'] + record['name']
+        rows = '' if record['rows'] is None else record['rows']
+        peak = '' if record['peak_bytes'] is None else f"{record['peak_bytes'] / 1e6:.1f}"
+        lines.append(f"{name:<28} {rows:>10} {record['wall_seconds']:>10.3f} "
+                     f"{record['cpu_seconds']:>10.3f} {peak:>10}")
+    return '\n'.join(lines)
+
+
+def chrome_trace_events(report, label=None):
+    """Convert a stage report into Chrome trace 'complete' events, with times in microseconds.
+
+    Times are taken from the wall clock, so reports of different processes line up, and
+    ``label`` (e.g. the input file) is added to the arguments of every event.
+    """
+    events = []
+    for record in report['stages']:
+        args = {key: record[key] for key in ('rows', 'cpu_seconds', 'peak_bytes')}
+        if label is not None:
+            args['file'] = label
+        events.append({
+            'name': record['name'],
+            'ph': 'X',
+            'pid': report['pid'],
+            'tid': record['thread'],
+            'ts': (report['epoch'] + record['start_seconds']) * 1e6,
+            'dur': record['wall_seconds'] * 1e6,
+            'args': args,
+        })
+    return events
+
+
+def save_chrome_trace(trace_path, reports, labels=None):
+    """Write one or more stage reports, e.g. one per batch file, as a single Chrome trace."""
+    labels = labels or [None] * len(reports)
+    events = []
+    for report, label in zip(reports, labels):
+        events.extend(chrome_trace_events(report, label))
+    with open(trace_path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms', 'reports': list(reports)}, f, indent=1)
+    return trace_path
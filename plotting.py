@@ -0,0 +1,129 @@
+import io
+
+import numpy as np
+
+# Plot appearance
+PLOT_SIZE = (8, 6)  # Inches
+PLOT_DPI = 100
+MARKER_LIMIT = 200  # Markers are only drawn when no more points than this are plotted
+EXCEL_IMAGE_SIZE = (400, 300)  # Pixels
+EXCEL_IMAGE_ANCHOR = 'A20'
+
+
+class PngBuffer(io.BytesIO):
+    """In-memory PNG that can be embedded in a workbook that is saved more than once.
+
+    openpyxl closes an image's file object after writing it into the archive; this buffer
+    rewinds instead, so the same image can go into every save.
+    """
+
+    def close(self):
+        self.seek(0)
+
+
+def decimate_min_max(x, y, columns):
+    """Return the indices of the points that keep a curve's shape at a given pixel width.
+
+    The x range is split into ``columns`` pixel columns. Each column keeps its lowest and
+    highest point and its first and last point in curve order, so peaks and line joins
+    survive. Curves already short enough are returned whole.
+    """
+    n = len(x)
+    if n <= 4 * columns:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    low, high = x.min(), x.max()
+    if high > low:
+        column = np.minimum(((x - low) / (high - low) * columns).astype(int), columns - 1)
+    else:
+        column = np.zeros(n, dtype=int)
+
+    def group_ends(order):
+        # First and last entry of every run of equal columns in a column-sorted order
+        sorted_column = column[order]
+        starts = np.flatnonzero(np.r_[True, sorted_column[1:] != sorted_column[:-1]])
+        ends = np.r_[starts[1:], n] - 1
+        return order[starts], order[ends]
+
+    lowest, highest = group_ends(np.lexsort((y, column)))
+    first, last = group_ends(np.argsort(column, kind='stable'))
+    return np.unique(np.concatenate([lowest, highest, first, last]))
+
+
+def render_stress_strain_png(stress, strain, size=PLOT_SIZE, dpi=PLOT_DPI):
+    """Draw the stress-strain curve with the Agg canvas and return it as an in-memory PNG.
+
+    The figure is built directly rather than through pyplot, so no global state is shared
+    between threads or processes, and the curve is decimated to the plot's pixel width first.
+    matplotlib is only imported here, so analyses that do not plot never load it.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    stress = np.asarray(stress, dtype=float)
+    strain = np.asarray(strain, dtype=float)
+    if len(stress) != len(strain):
+        raise ValueError("Stress and strain lengths mismatch.")
+
+    keep = decimate_min_max(strain, stress, int(size[0] * dpi))
+    marker = 'o' if len(keep) <= MARKER_LIMIT else None
+
+    figure = Figure(figsize=size, dpi=dpi)
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    axes.plot(strain[keep], stress[keep], marker=marker, label='Stress-Strain Curve')
+    axes.set_xlabel('Strain (%)')
+    axes.set_ylabel('Stress (MPa)')
+    axes.set_title('Stress-Strain Curve')
+    axes.grid(True)
+    axes.legend()
+
+    png = PngBuffer()
+    figure.savefig(png, format='png')
+    png.seek(0)
+    return png
+
+
+def render_series_png(curves, grid, mean, std, minimum, maximum, size=PLOT_SIZE, dpi=PLOT_DPI):
+    """Draw every specimen's curve over the mean, ±1 std band and min/max envelope of a series.
+
+    ``curves`` is a list of (label, stress, strain); each curve is decimated to the plot's
+    pixel width before drawing. Returns the chart as an in-memory PNG.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=size, dpi=dpi)
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    columns = int(size[0] * dpi)
+    for label, stress, strain in curves:
+        stress = np.asarray(stress, dtype=float)
+        strain = np.asarray(strain, dtype=float)
+        keep = decimate_min_max(strain, stress, columns)
+        axes.plot(strain[keep], stress[keep], linewidth=0.8, alpha=0.5, label=label)
+    axes.fill_between(grid, mean - std, mean + std, color='black', alpha=0.15, label='Mean ± 1 std')
+    axes.plot(grid, mean, color='black', linewidth=2, label='Mean')
+    axes.plot(grid, minimum, color='black', linewidth=1, linestyle='--', label='Min / Max')
+    axes.plot(grid, maximum, color='black', linewidth=1, linestyle='--')
+    axes.set_xlabel('Strain (%)')
+    axes.set_ylabel('Stress (MPa)')
+    axes.set_title(f'Stress-Strain Curves of {len(curves)} Specimens')
+    axes.grid(True)
+    axes.legend(fontsize='small', ncol=2 if len(curves) > 8 else 1)
+
+    png = PngBuffer()
+    figure.savefig(png, format='png')
+    png.seek(0)
+    return png
+
+
+def make_excel_image(png):
+    """Wrap a PNG buffer or file path as an image sized for the results sheet."""
+    from openpyxl.drawing.image import Image
+
+    img = Image(png)
+    img.width, img.height = EXCEL_IMAGE_SIZE
+    return img
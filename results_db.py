@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+
+RESULTS_DB = os.path.join(os.path.expanduser('~'), '.compression_test_results.sqlite')
+SCHEMA_VERSION = 1
+UPSERT_BATCH_ROWS = 200  # Records written per transaction during batch runs
+
+# Scalar columns of the specimens table, in order
+SPECIMEN_COLUMNS = ('file', 'name', 'lot', 'source_hash', 'analysed_at', 'seconds', 'rows', 'length', 'width',
+                    'thickness', 'max_stress', 'modulus', 'modulus_start', 'modulus_end', 'modulus_r2', 'energy',
+                    'energy_strain_percentage', 'output')
+TEXT_COLUMNS = ('file', 'name', 'lot', 'source_hash', 'analysed_at', 'output')
+FILTER_OPERATORS = ('<=', '>=', '!=', '<', '>', '=')
+FILTER = re.compile(r'^\s*(\w+)\s*(' + '|'.join(re.escape(op) for op in FILTER_OPERATORS) + r')\s*(.+?)\s*$')
+ENERGY_COLUMN = re.compile(r'^energy_(\d+(?:\.\d+)?)$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS specimens (
+    file TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    lot TEXT,
+    source_hash TEXT,
+    analysed_at TEXT NOT NULL,
+    seconds REAL,
+    rows INTEGER,
+    length REAL,
+    width REAL,
+    thickness REAL,
+    max_stress REAL,
+    modulus REAL,
+    modulus_start INTEGER,
+    modulus_end INTEGER,
+    modulus_r2 REAL,
+    energy REAL,
+    energy_strain_percentage REAL,
+    output TEXT
+);
+CREATE TABLE IF NOT EXISTS energies (
+    file TEXT NOT NULL REFERENCES specimens(file) ON DELETE CASCADE,
+    max_strain_percentage REAL NOT NULL,
+    energy REAL,
+    PRIMARY KEY (file, max_strain_percentage)
+);
+CREATE INDEX IF NOT EXISTS specimens_lot ON specimens(lot);
+CREATE INDEX IF NOT EXISTS specimens_hash ON specimens(source_hash);
+CREATE INDEX IF NOT EXISTS specimens_max_stress ON specimens(max_stress);
+CREATE INDEX IF NOT EXISTS specimens_modulus ON specimens(modulus);
+CREATE INDEX IF NOT EXISTS energies_cutoff ON energies(max_strain_percentage, energy);
+"""
+
+
+def make_record(file_path, results, rows=None, source_hash=None, seconds=None, output_path=None, lot=None):
+    """Turn the results of one analysis into a database record.
+
+    ``results`` has the keys of AnalysisPipeline.results. The lot defaults to the name of
+    the folder holding the file.
+    """
+    file_path = os.path.abspath(file_path)
+    fit = results.get('modulus_fit')
+    return {
+        'file': file_path,
+        'name': os.path.basename(file_path),
+        'lot': lot if lot is not None else os.path.basename(os.path.dirname(file_path)),
+        'source_hash': source_hash,
+        'analysed_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'seconds': seconds,
+        'rows': rows,
+        'length': results.get('length'),
+        'width': results.get('width'),
+        'thickness': results.get('thickness'),
+        'max_stress': results.get('max_stress'),
+        'modulus': results.get('modulus'),
+        'modulus_start': fit.start if fit else None,
+        'modulus_end': fit.end if fit else None,
+        'modulus_r2': fit.r ** 2 if fit else None,
+        'energy': results.get('energy'),
+        'energy_strain_percentage': results.get('energy_strain_percentage'),
+        'output': output_path,
+        'energies': dict(results.get('energies') or {}),
+    }
+
+
+def parse_filter(text):
+    """Parse a filter such as 'modulus<0.05' or 'lot=A12' into (column, operator, value)."""
+    match = FILTER.match(text)
+    if not match:
+        raise ValueError(f"Cannot read filter '{text}'; use e.g. 'modulus<0.05'.")
+    return match.groups()
+
+
+class ResultsDatabase:
+    """Local SQLite index of the scalar results of every analysed specimen.
+
+    One row per input file holds L, W, T, σc, Ec with its fit window and r², the energy at
+    the main cutoff, the source hash, the row count and the analysis time; the energies at
+    every cutoff go into a second table. Analysing a file again replaces its rows.
+    """
+
+    def __init__(self, path=RESULTS_DB):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+            self.connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def upsert(self, records):
+        """Insert or replace many records in one transaction."""
+        records = list(records)
+        placeholders = ', '.join('?' * len(SPECIMEN_COLUMNS))
+        updates = ', '.join(f'{column} = excluded.{column}' for column in SPECIMEN_COLUMNS[1:])
+        with self.connection:
+            self.connection.executemany(
+                f'INSERT INTO specimens ({", ".join(SPECIMEN_COLUMNS)}) VALUES ({placeholders}) '
+                f'ON CONFLICT(file) DO UPDATE SET {updates}',
+                [tuple(record[column] for column in SPECIMEN_COLUMNS) for record in records])
+            self.connection.executemany('DELETE FROM energies WHERE file = ?',
+                                        [(record['file'],) for record in records])
+            self.connection.executemany(
+                'INSERT INTO energies (file, max_strain_percentage, energy) VALUES (?, ?, ?)',
+                [(record['file'], float(p), energy) for record in records for p, energy in record['energies'].items()])
+        return len(records)
+
+    def query(self, filters=(), order_by='name', limit=None):
+        """Return the specimens matching every (column, operator, value) filter, as dicts.
+
+        Columns are those of the specimens table, plus 'energy_<cutoff>' (e.g. 'energy_40')
+        for the energy at a strain cutoff. Each result carries its energies under 'energies'.
+        """
+        conditions, params = [], []
+        for column, operator, value in filters:
+            if operator not in FILTER_OPERATORS:
+                raise ValueError(f"Unknown operator '{operator}'.")
+            if column not in TEXT_COLUMNS:
+                try:
+                    value = float(value)
+                except ValueError:
+                    raise ValueError(f"'{column}' needs a number, not '{value}'.")
+            energy = ENERGY_COLUMN.match(column)
+            if energy:
+                conditions.append('EXISTS (SELECT 1 FROM energies e WHERE e.file = specimens.file '
+                                  f'AND e.max_strain_percentage = ? AND e.energy {operator} ?)')
+                params += [float(energy.group(1)), value]
+            elif column in SPECIMEN_COLUMNS:
+                conditions.append(f'{column} {operator} ?')
+                params.append(value)
+            else:
+                raise ValueError(f"Unknown column '{column}'.")
+        if order_by not in SPECIMEN_COLUMNS:
+            raise ValueError(f"Unknown column '{order_by}'.")
+
+        selection = 'SELECT * FROM specimens'
+        if conditions:
+            selection += ' WHERE ' + ' AND '.join(conditions)
+        selection += f' ORDER BY {order_by}'
+        if limit is not None:
+            selection += f' LIMIT {int(limit)}'
+        specimens = [dict(row) for row in self.connection.execute(selection, params)]
+
+        energies = {}
+        rows = self.connection.execute(
+            f'SELECT e.* FROM energies e JOIN ({selection}) s ON e.file = s.file ORDER BY e.max_strain_percentage',
+            params)
+        for row in rows:
+            energies.setdefault(row['file'], {})[row['max_strain_percentage']] = row['energy']
+        for specimen in specimens:
+            specimen['energies'] = energies.get(specimen['file'], {})
+        return specimens
+
+    def find_by_hash(self, source_hash):
+        """Return the specimens whose input had the given content hash."""
+        rows = self.connection.execute('SELECT * FROM specimens WHERE source_hash = ?', (source_hash,))
+        return [dict(row) for row in rows]
+
+
+def format_table(specimens, columns=('name', 'lot', 'max_stress', 'modulus', 'modulus_r2', 'energy')):
+    """Format query results as a plain text table."""
+    lines = ['  '.join(f'{column:>14}' for column in columns)]
+    for specimen in specimens:
+        cells = []
+        for column in columns:
+            value = specimen[column]
+            cells.append(f'{value:>14.6g}' if isinstance(value, float) else f'{str(value):>14}')
+        lines.append('  '.join(cells))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the results database of analysed specimens.")
+    parser.add_argument('--db', default=RESULTS_DB, help=f"database path (default: {RESULTS_DB})")
+    parser.add_argument('-w', '--where', action='append', default=[],
+                        help="filter such as 'modulus<0.05', 'lot=A12' or 'energy_40>=0.002'; may be repeated")
+    parser.add_argument('--lot', default=None, help="only specimens of this lot")
+    parser.add_argument('--order-by', default='name', choices=SPECIMEN_COLUMNS)
+    parser.add_argument('--limit', type=int, default=None)
+    parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        filters = [parse_filter(text) for text in args.where]
+        if args.lot is not None:
+            filters.append(('lot', '=', args.lot))
+        with ResultsDatabase(args.db) as database:
+            specimens = database.query(filters, args.order_by, args.limit)
+    except (ValueError, sqlite3.Error) as e:
+        print(f"Error: {e}")
+        return 1
+
+    if args.json:
+        print(json.dumps(specimens, indent=2, ensure_ascii=False))
+    else:
+        print(format_table(specimens))
+        print(f"{len(specimens)} specimens")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+import argparse
+import os
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from App import (AnalysisOptions, AnalysisPipeline, ENERGY_STRAIN_PERCENTAGES, MODULUS_LABEL, SEARCH_WORDS,
+                 YIELD_LABELS, compute_yield_batch, get_energy_label)
+from batch import SERIES_FILE, find_workbooks
+from cache import ResultCache
+from cli import add_analysis_arguments, get_analysis_options
+from plotting import make_excel_image, render_series_png
+
+SERIES_GRID_POINTS = 500
+STATISTICS = ('Mean', 'Std', 'Min', 'Max', 'CV (%)')
+SERIES_YIELD_PROPERTIES = (('yield_stress', 'MPa'), ('plateau_stress', 'MPa'))
+
+Specimen = namedtuple('Specimen', ['name', 'stress', 'strain', 'results'])
+
+
+def get_property_columns(max_strain_percentages=ENERGY_STRAIN_PERCENTAGES):
+    """List the (label, unit) of every per-specimen property in the series summary."""
+    return ([('Maximum Stress, σc', 'MPa'), (MODULUS_LABEL, 'MPa')]
+            + [(get_energy_label(p), 'MPa*%') for p in max_strain_percentages]
+            + [(YIELD_LABELS[key], unit) for key, unit in SERIES_YIELD_PROPERTIES])
+
+
+def analyse_specimen(file_path, read_only=True, cache_dir=None, sidecar=False,
+                     max_strain_percentages=ENERGY_STRAIN_PERCENTAGES, options=AnalysisOptions()):
+    """Calculate the curve and scalar results of one specimen without writing anything."""
+    cache = ResultCache(cache_dir) if cache_dir else None
+    pipeline = AnalysisPipeline(file_path, SEARCH_WORDS, read_only=read_only, cache=cache, sidecar=sidecar,
+                                **options._asdict())
+    pipeline.calculate_stress_and_strain()
+    pipeline.calculate_maximum_stress()
+    pipeline.calculate_compression_modulus()
+    pipeline.calculate_energies(max_strain_percentages)
+    results = {key: pipeline.results[key] for key in ('length', 'width', 'thickness', 'max_stress', 'modulus',
+                                                      'modulus_fit', 'energies')}
+    return Specimen(os.path.basename(file_path), np.asarray(pipeline.stress), np.asarray(pipeline.strain), results)
+
+
+def make_strain_grid(strains, points=SERIES_GRID_POINTS):
+    """Build an evenly spaced strain grid from 0 to the largest strain of any specimen."""
+    largest = max((float(np.max(strain)) for strain in strains if len(strain)), default=0.0)
+    return np.linspace(0.0, largest, points)
+
+
+def resample_curves(stresses, strains, grid):
+    """Interpolate every curve onto a common strain grid in one vectorized pass.
+
+    Each curve's strain is scaled into [0, 1) and shifted by its specimen number, so all
+    curves form one increasing key array and a single searchsorted finds the neighbours of
+    every grid point of every curve. Returns an (n_specimens, len(grid)) array with NaN
+    where the grid lies outside a specimen's strain range.
+    """
+    grid = np.asarray(grid, dtype=float)
+    count = len(strains)
+    resampled = np.full((count, len(grid)), np.nan)
+    if not count or not len(grid):
+        return resampled
+
+    curves = []
+    for stress, strain in zip(stresses, strains):
+        stress = np.asarray(stress, dtype=float)
+        strain = np.asarray(strain, dtype=float)
+        if np.any(np.diff(strain) < 0):
+            order = np.argsort(strain, kind='stable')
+            stress, strain = stress[order], strain[order]
+        curves.append((stress, strain))
+
+    low = min(min((strain[0] for _, strain in curves if len(strain)), default=0.0), grid[0])
+    high = max(max((strain[-1] for _, strain in curves if len(strain)), default=0.0), grid[-1])
+    scale = (high - low) * (1 + 1e-9) or 1.0
+    keys = np.concatenate([(strain - low) / scale + i for i, (_, strain) in enumerate(curves)])
+    values = np.concatenate([stress for stress, _ in curves])
+    lengths = np.array([len(strain) for _, strain in curves])
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+    queries = (grid - low) / scale + np.arange(count)[:, None]
+    right = np.searchsorted(keys, queries, side='right')
+    left = right - 1
+    first, last = starts[:, None], (starts + lengths - 1)[:, None]
+    inside = (left >= first) & (left <= last) & (lengths[:, None] > 0)
+    inside &= (right <= last) | (keys[np.clip(left, 0, len(keys) - 1)] == queries)
+
+    left = np.clip(left, 0, len(keys) - 1)
+    right = np.clip(right, 0, len(keys) - 1)
+    x0, x1 = keys[left], keys[right]
+    y0, y1 = values[left], values[right]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.where((x1 > x0) & (right > left), (queries - x0) / (x1 - x0), 0.0)
+    resampled[inside] = (y0 + fraction * (y1 - y0))[inside]
+    return resampled
+
+
+def compute_envelope(resampled):
+    """Return the mean, std, min, max and count of the resampled curves at every grid point.
+
+    Grid points covered by a single specimen get a std of 0; those covered by none get NaN.
+    """
+    count = np.sum(~np.isnan(resampled), axis=0)
+    covered = count > 0
+    envelope = {'count': count}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        filled = np.where(np.isnan(resampled), 0.0, resampled)
+        mean = np.where(covered, filled.sum(axis=0) / np.maximum(count, 1), np.nan)
+        squares = np.where(np.isnan(resampled), 0.0, (resampled - mean) ** 2).sum(axis=0)
+        envelope['mean'] = mean
+        envelope['std'] = np.where(count > 1, np.sqrt(squares / np.maximum(count - 1, 1)),
+                                   np.where(covered, 0.0, np.nan))
+    envelope['min'] = np.where(covered, np.where(np.isnan(resampled), np.inf, resampled).min(axis=0), np.nan)
+    envelope['max'] = np.where(covered, np.where(np.isnan(resampled), -np.inf, resampled).max(axis=0), np.nan)
+    return envelope
+
+
+def get_property_matrix(specimens, max_strain_percentages=ENERGY_STRAIN_PERCENTAGES):
+    """Collect σc, Ec, the energies, σy and σpl of every specimen into one (n_specimens, n_properties) array."""
+    rows = []
+    for specimen in specimens:
+        results = specimen.results
+        energies = [results['energies'].get(p) for p in max_strain_percentages]
+        rows.append([results['max_stress'], results['modulus']] + energies
+                    + [results.get(key) for key, _ in SERIES_YIELD_PROPERTIES])
+    return np.array(rows, dtype=float).reshape(len(specimens), len(get_property_columns(max_strain_percentages)))
+
+
+def compute_property_statistics(matrix):
+    """Return the mean, sample std, min, max and coefficient of variation of every property column.
+
+    Missing values (NaN) are left out of their column. The result has one row per entry
+    of STATISTICS.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        counts = np.sum(~np.isnan(matrix), axis=0)
+        mean = np.nansum(matrix, axis=0) / counts
+        std = np.sqrt(np.nansum((matrix - mean) ** 2, axis=0) / np.maximum(counts - 1, 1))
+        std = np.where(counts > 1, std, np.where(counts == 1, 0.0, np.nan))
+        minimum = np.where(counts > 0, np.nanmin(np.where(counts > 0, matrix, 0.0), axis=0), np.nan)
+        maximum = np.where(counts > 0, np.nanmax(np.where(counts > 0, matrix, 0.0), axis=0), np.nan)
+        cv = 100 * std / np.abs(mean)
+    return np.vstack([mean, std, minimum, maximum, cv])
+
+
+def write_series_workbook(output_path, specimens, grid, envelope, statistics, chart=None,
+                          max_strain_percentages=ENERGY_STRAIN_PERCENTAGES, errors=()):
+    """Write the series summary: per-specimen properties with their statistics, the envelope curves and the chart.
+
+    Files that could not be analysed are listed after the specimens, with their (file, error).
+    """
+    import openpyxl
+
+    def cell(value):
+        return None if value is None or np.isnan(value) else float(value)
+
+    columns = get_property_columns(max_strain_percentages)
+    matrix = get_property_matrix(specimens, max_strain_percentages)
+    workbook = openpyxl.Workbook(write_only=True)
+
+    summary = workbook.create_sheet('Series')
+    summary.append(['Specimen', 'Length, L', 'Width, W', 'Thickness, T'] + [label for label, _ in columns]
+                   + ['Error'])
+    summary.append([None, 'mm', 'mm', 'mm'] + [unit for _, unit in columns])
+    for specimen, row in zip(specimens, matrix):
+        results = specimen.results
+        summary.append([specimen.name, results['length'], results['width'], results['thickness']]
+                       + [cell(value) for value in row])
+    for file_path, error in errors:
+        summary.append([os.path.basename(file_path)] + [None] * (3 + len(columns)) + [error])
+    summary.append([])
+    for name, row in zip(STATISTICS, statistics):
+        summary.append([name, None, None, None] + [cell(value) for value in row])
+    if chart is not None:
+        summary.add_image(make_excel_image(chart), f'A{len(specimens) + len(errors) + len(STATISTICS) + 5}')
+
+    curves = workbook.create_sheet('Envelope')
+    curves.append(['Strain', 'Mean Stress', 'Std', 'Min Stress', 'Max Stress', 'Specimens'])
+    curves.append(['%', 'MPa', 'MPa', 'MPa', 'MPa', None])
+    for row in zip(grid.tolist(), envelope['mean'].tolist(), envelope['std'].tolist(), envelope['min'].tolist(),
+                   envelope['max'].tolist(), envelope['count'].tolist()):
+        curves.append([cell(value) for value in row[:-1]] + [row[-1]])
+
+    workbook.save(output_path)
+    return output_path
+
+
+def analyse_series(files, output_path, grid_points=SERIES_GRID_POINTS, workers=None, read_only=True,
+                   cache_dir=None, sidecar=False, plot=True, progress=print, options=AnalysisOptions()):
+    """Analyse the specimens of a test series together and write one series summary workbook.
+
+    The specimens are analysed across a pool of worker processes; nothing is written for
+    the individual files. The offset yield and plateau stress of all of them are then
+    found together with :func:`App.compute_yield_batch`. A file that fails is reported through
+    ``progress`` and listed in the summary, and the series is built from the others.
+    Returns the specimens, the strain grid, the envelope, the property statistics and the
+    list of (file, error) pairs.
+    """
+    files = sorted(files)
+    if not files:
+        raise FileNotFoundError("No specimens to analyse.")
+    analysed, errors = {}, []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(analyse_specimen, file_path, read_only, cache_dir, sidecar,
+                                   ENERGY_STRAIN_PERCENTAGES, options): file_path for file_path in files}
+        for future in as_completed(futures):
+            file_path = futures[future]
+            try:
+                analysed[file_path] = future.result()
+            except Exception as e:
+                errors.append((file_path, str(e)))
+                progress(f"{os.path.basename(file_path)}: Error: {e}")
+    if not analysed:
+        raise ValueError("None of the specimens could be analysed.")
+    specimens = [analysed[file_path] for file_path in files if file_path in analysed]
+    errors.sort()
+    # The offset yield and plateau of the whole series come from one batched pass, fitted as a single analysis would
+    yields = compute_yield_batch([(s.stress, s.strain) for s in specimens],
+                                 strain_span=options.modulus_span)
+    for specimen, result in zip(specimens, yields):
+        specimen.results.update({key: getattr(result, key) for key in YIELD_LABELS})
+        progress(f"{specimen.name}: σc={specimen.results['max_stress']:.6g} MPa, "
+                 f"Ec={specimen.results['modulus']:.6g} MPa")
+
+    grid = make_strain_grid([specimen.strain for specimen in specimens], grid_points)
+    envelope = compute_envelope(resample_curves([s.stress for s in specimens], [s.strain for s in specimens], grid))
+    statistics = compute_property_statistics(get_property_matrix(specimens))
+    chart = None
+    if plot:
+        chart = render_series_png([(s.name, s.stress, s.strain) for s in specimens], grid, envelope['mean'],
+                                  envelope['std'], envelope['min'], envelope['max'])
+    write_series_workbook(output_path, specimens, grid, envelope, statistics, chart, errors=errors)
+    progress(f"Series of {len(specimens)} specimens: σc = {statistics[0, 0]:.6g} ± {statistics[1, 0]:.6g} MPa, "
+             f"Ec = {statistics[0, 1]:.6g} ± {statistics[1, 1]:.6g} MPa. Summary saved to: {output_path}")
+    if errors:
+        progress(f"{len(errors)} of {len(files)} files could not be analysed and are listed in the summary.")
+    return specimens, grid, envelope, statistics, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse the replicates of a test series together.")
+    parser.add_argument('source', help="directory of specimen files or a glob pattern")
+    parser.add_argument('-o', '--output', default=None, help=f"series summary path (default: {SERIES_FILE} next to the inputs)")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="number of worker processes (default: CPU count)")
+    parser.add_argument('--grid-points', type=int, default=SERIES_GRID_POINTS, help="points of the common strain grid")
+    parser.add_argument('--full-load', action='store_true', help="load each workbook fully instead of streaming it")
+    parser.add_argument('--cache-dir', default=None, help="reuse results of unchanged workbooks from this cache directory")
+    parser.add_argument('--sidecar', action='store_true', help="keep each parsed curve in a memory-mapped .curve.npy sidecar")
+    parser.add_argument('--no-plot', action='store_true', help="skip the overlay chart")
+    add_analysis_arguments(parser)
+    args = parser.parse_args(argv)
+    options = get_analysis_options(args)
+
+    files = find_workbooks(args.source, options.join_parts)
+    output_path = args.output
+    if output_path is None:
+        directory = args.source if os.path.isdir(args.source) else os.path.dirname(files[0] if files else args.source)
+        output_path = os.path.join(directory, SERIES_FILE)
+    try:
+        *_, errors = analyse_series(files, output_path, args.grid_points, args.workers, not args.full_load,
+                                    args.cache_dir, args.sidecar, not args.no_plot, options=options)
+    except Exception as e:
+        print(f"Error: {e}")
+        return 1
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
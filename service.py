@@ -0,0 +1,323 @@
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from App import AnalysisOptions, AnalysisPipeline, SEARCH_WORDS
+from cache import CACHE_DIR, ResultCache, make_cache_key
+from cli import add_analysis_arguments, get_analysis_options, get_scalar_results
+from curve import CURVE_DTYPES
+from ingest import TEXT_EXTENSIONS
+
+SERVICE_HOST = '127.0.0.1'  # Only the local machine can reach the service by default
+SERVICE_PORT = 8765
+MAX_QUEUED = 16  # Requests waiting for a worker before new ones are turned away
+MAX_UPLOAD_BYTES = 1 << 30
+UPLOAD_EXTENSIONS = ('.xlsx',) + TEXT_EXTENSIONS
+WARM_MODULES = ('openpyxl', 'scipy.integrate', 'matplotlib.backends.backend_agg', 'matplotlib.figure')
+ARTIFACTS = {'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'png': 'image/png'}
+
+
+class ServiceBusy(Exception):
+    """Raised when every worker is busy and the queue is full."""
+
+
+def _warm_up():
+    """Import the analysis stack once per worker process, so no request pays for it."""
+    for name in WARM_MODULES:
+        importlib.import_module(name)
+
+
+def get_upload_options(query):
+    """Read the analysis options of an upload from its query string.
+
+    The fields of AnalysisOptions are passed to the pipeline (``join_parts=1`` to join the
+    parts of a record); ``plot=0`` skips the plot.
+    """
+    options = {
+        'modulus_span': float(query['modulus_span']) if query.get('modulus_span') else None,
+        'dtype': query.get('dtype') or 'float64',
+        'output_points': int(query['output_points']) if query.get('output_points') else None,
+        'plot': query.get('plot', '1') not in ('0', 'false', 'no'),
+        'join_parts': query.get('join_parts', '0') in ('1', 'true', 'yes'),
+    }
+    if options['dtype'] not in CURVE_DTYPES:
+        raise ValueError(f"Unsupported curve dtype '{options['dtype']}'.")
+    return options
+
+
+def analyse_upload(data, name, options, cache_dir=None):
+    """Analyse an uploaded workbook or export in a scratch directory.
+
+    Every step runs in read-only mode and the results go into a companion workbook. With
+    ``cache_dir`` the pipeline reuses the cached curve and scalars of the same content.
+    Returns the scalar results, the results workbook and the plot (None without one).
+    """
+    cache = ResultCache(cache_dir) if cache_dir else None
+    steps = [step for step in AnalysisPipeline.STEPS if options['plot'] or step != 'plot']
+    with tempfile.TemporaryDirectory(prefix='compression_test_') as directory:
+        file_path = os.path.join(directory, name)
+        with open(file_path, 'wb') as f:
+            f.write(data)
+        pipeline = AnalysisPipeline(file_path, SEARCH_WORDS, read_only=True, output_layout='companion', cache=cache,
+                                    **{field: options[field] for field in AnalysisOptions._fields})
+        for step in steps:
+            pipeline.run_step(step)
+        output_path = pipeline.save()
+        with open(output_path, 'rb') as f:
+            xlsx = f.read()
+    png = pipeline.results.get('plot_image')
+    scalars = get_scalar_results(pipeline, os.path.basename(output_path))
+    scalars['file'] = name
+    return scalars, xlsx, png.getvalue() if png is not None else None
+
+
+class AnalysisService:
+    """Analysis of uploads on a pool of worker processes kept warm between requests.
+
+    At most ``workers`` analyses run at once and ``max_queued`` more wait for a worker;
+    :meth:`submit` raises :class:`ServiceBusy` beyond that, rather than letting requests
+    pile up. Uploads are identified by the hash of their content and options: one already
+    analysed is served from the ResultCache without touching the pool, and one still
+    being analysed is joined rather than run twice.
+    """
+
+    def __init__(self, workers=None, max_queued=MAX_QUEUED, cache_dir=CACHE_DIR):
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_up)
+        self.cache_dir = cache_dir
+        self.cache = ResultCache(cache_dir)
+        self._slots = threading.BoundedSemaphore(self.workers + max_queued)
+        self._lock = threading.Lock()
+        self._running = {}  # Job key -> Future of the analysis
+        self.stats = {'requests': 0, 'analysed': 0, 'cached': 0, 'joined': 0, 'rejected': 0, 'failed': 0}
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def status(self):
+        """Report the pool size, the jobs in flight and the request counters."""
+        with self._lock:
+            in_flight = len(self._running)
+            return {'workers': self.workers, 'running': min(in_flight, self.workers),
+                    'queued': max(in_flight - self.workers, 0), **self.stats}
+
+    def get_artifact(self, key, kind):
+        """Return the bytes of a cached results workbook ('xlsx') or plot ('png'), or None."""
+        cached = self.cache.get(key)
+        if cached is None or kind not in cached[0]:
+            return None
+        return cached[0][kind].tobytes()
+
+    def submit(self, data, name, options):
+        """Analyse an upload, or serve it from the cache, and return (job key, scalars, cached)."""
+        name = os.path.basename(name)
+        if os.path.splitext(name)[1].lower() not in UPLOAD_EXTENSIONS:
+            raise ValueError(f"Unsupported file type '{name}'; upload one of {', '.join(UPLOAD_EXTENSIONS)}.")
+        self._count('requests')
+        key = make_cache_key(hashlib.sha256(data).hexdigest(), step='service',
+                             extension=os.path.splitext(name)[1].lower(), **options)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._count('cached')
+            return key, cached[1], True
+
+        with self._lock:
+            future = self._running.get(key)
+            owner = future is None
+            cached = self.cache.get(key) if owner else None
+            if cached is not None:
+                self.stats['cached'] += 1  # Finished since the first look
+                return key, cached[1], True
+            if owner:
+                if not self._slots.acquire(blocking=False):
+                    self.stats['rejected'] += 1
+                    raise ServiceBusy(f"{self.workers} analyses are running and the queue is full.")
+                future = self._running[key] = self.executor.submit(analyse_upload, data, name, options,
+                                                                   self.cache_dir)
+            else:
+                self.stats['joined'] += 1
+        try:
+            scalars, xlsx, png = future.result()
+            if owner:
+                # Cached before the job is released, so an identical upload either joins it or hits the cache
+                arrays = {'xlsx': np.frombuffer(xlsx, dtype=np.uint8)}
+                if png is not None:
+                    arrays['png'] = np.frombuffer(png, dtype=np.uint8)
+                self.cache.put(key, arrays, scalars)
+                self._count('analysed')
+        except Exception:
+            if owner:
+                self._count('failed')
+            raise
+        finally:
+            if owner:
+                with self._lock:
+                    del self._running[key]
+                self._slots.release()
+        return key, scalars, False
+
+
+class AnalysisRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front of an AnalysisService.
+
+    - ``POST /analyse?name=<file name>`` with the raw file as the body runs the analysis
+      and answers with the scalar results and the links to its artifacts, as JSON.
+    - ``GET /results/<key>.xlsx`` and ``GET /results/<key>.png`` return the artifacts.
+    - ``GET /status`` reports the workers, the jobs in flight and the request counters.
+    """
+
+    service = None  # Set on the subclass made by make_server
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, body, content_type='application/json'):
+        if content_type == 'application/json':
+            body = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if status == 503:
+            self.send_header('Retry-After', '1')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urllib.parse.urlsplit(self.path).path
+        if path == '/status':
+            return self._send(200, self.service.status())
+        directory, _, file_name = path.rpartition('/')
+        key, _, kind = file_name.partition('.')
+        if directory == '/results' and kind in ARTIFACTS:
+            artifact = self.service.get_artifact(key, kind)
+            if artifact is not None:
+                return self._send(200, artifact, ARTIFACTS[kind])
+        self._send(404, {'error': f"Nothing at {path}."})
+
+    def do_POST(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path != '/analyse':
+            return self._send(404, {'error': f"Nothing at {url.path}."})
+        length = self.headers.get('Content-Length')
+        if length is None:
+            return self._send(411, {'error': "Content-Length is required."})
+        if int(length) > MAX_UPLOAD_BYTES:
+            return self._send(413, {'error': f"Uploads are limited to {MAX_UPLOAD_BYTES} bytes."})
+        data = self.rfile.read(int(length))
+        query = dict(urllib.parse.parse_qsl(url.query))
+        try:
+            options = get_upload_options(query)
+            key, results, cached = self.service.submit(data, query.get('name', 'upload.xlsx'), options)
+        except ServiceBusy as e:
+            return self._send(503, {'error': str(e)})
+        except ValueError as e:
+            return self._send(400, {'error': str(e)})
+        except Exception as e:
+            return self._send(500, {'error': str(e)})
+        links = {kind: f"/results/{key}.{kind}" for kind in ARTIFACTS if kind == 'xlsx' or options['plot']}
+        self._send(200, {'id': key, 'cached': cached, 'results': results, **links})
+
+
+def make_server(service, host=SERVICE_HOST, port=SERVICE_PORT, verbose=False):
+    """Build a threaded HTTP server answering requests with ``service``; port 0 picks a free one."""
+    handler = type('Handler', (AnalysisRequestHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.verbose = verbose
+    return server
+
+
+def analyse_remote(file_path, url=f'http://{SERVICE_HOST}:{SERVICE_PORT}', output_dir=None, timeout=None,
+                   **options):
+    """Upload a file to a running service and return its JSON answer.
+
+    ``options`` are sent as query parameters (see :func:`get_upload_options`). With
+    ``output_dir`` the results workbook and plot are downloaded there as well.
+    """
+    query = {'name': os.path.basename(file_path)}
+    query.update({name: value for name, value in options.items() if value is not None})
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    request = urllib.request.Request(f"{url}/analyse?{urllib.parse.urlencode(query)}", data=data, method='POST',
+                                     headers={'Content-Type': 'application/octet-stream'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            answer = json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        raise RuntimeError(json.loads(e.read()).get('error', str(e)))
+    if output_dir is not None:
+        stem = os.path.splitext(os.path.basename(file_path))[0]
+        for kind in ARTIFACTS:
+            if kind in answer:
+                path = os.path.join(output_dir, f"{stem}_results.{kind}")
+                with urllib.request.urlopen(url + answer[kind], timeout=timeout) as response, open(path, 'wb') as f:
+                    f.write(response.read())
+                answer[kind] = path
+    return answer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the analysis over HTTP on this machine, or use the service.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help="run the service")
+    serve.add_argument('--host', default=SERVICE_HOST, help=f"address to listen on (default: {SERVICE_HOST})")
+    serve.add_argument('--port', type=int, default=SERVICE_PORT, help=f"port to listen on (default: {SERVICE_PORT})")
+    serve.add_argument('-w', '--workers', type=int, default=None, help="number of worker processes (default: CPU count)")
+    serve.add_argument('--max-queued', type=int, default=MAX_QUEUED,
+                       help=f"requests that may wait for a worker (default: {MAX_QUEUED})")
+    serve.add_argument('--cache-dir', default=CACHE_DIR, help="cache of results, shared by the workers")
+    serve.add_argument('-v', '--verbose', action='store_true', help="log every request")
+    submit = commands.add_parser('submit', help="analyse files on a running service")
+    submit.add_argument('files', nargs='+', help="input .xlsx workbooks or CSV/TXT exports")
+    submit.add_argument('--url', default=f'http://{SERVICE_HOST}:{SERVICE_PORT}', help="address of the service")
+    submit.add_argument('-o', '--output-dir', default=None, help="download the results workbook and plot here")
+    submit.add_argument('--no-plot', action='store_true', help="skip the stress-strain plot")
+    add_analysis_arguments(submit)
+    args = parser.parse_args(argv)
+
+    if args.command == 'submit':
+        answers, failed = [], False
+        for file_path in args.files:
+            try:
+                answers.append(analyse_remote(file_path, args.url, args.output_dir, plot=0 if args.no_plot else None,
+                                              **dict(get_analysis_options(args)._asdict(),
+                                                     join_parts=1 if args.join_parts else None)))
+            except Exception as e:
+                failed = True
+                answers.append({'file': file_path, 'error': str(e)})
+        print(json.dumps(answers, indent=2, ensure_ascii=False))
+        return 1 if failed else 0
+
+    service = AnalysisService(args.workers, args.max_queued, args.cache_dir)
+    server = make_server(service, args.host, args.port, args.verbose)
+    print(f"Serving on http://{args.host}:{server.server_port} with {service.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from cache import hash_file, make_cache_key
+from ingest import get_dimensions_path
+
+SIDECAR_VERSION = 2
+
+
+def get_sidecar_paths(file_path):
+    """Build the paths of the curve array and its metadata, next to the input file."""
+    stem, _ = os.path.splitext(file_path)
+    return stem + '.curve.npy', stem + '.curve.json'
+
+
+def hash_source(file_path):
+    """Hash a source file together with the ``.specimen.json`` that may give its dimensions."""
+    digest = hash_file(file_path)
+    dimensions_path = get_dimensions_path(file_path)
+    if os.path.exists(dimensions_path):
+        return make_cache_key(digest, dimensions=hash_file(dimensions_path))
+    return digest
+
+
+def _dimensions_stat(file_path):
+    """Return the size and modification time of a source's ``.specimen.json``, or None without one."""
+    try:
+        stat = os.stat(get_dimensions_path(file_path))
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _replace_atomically(path, write):
+    """Write a file through a temporary file in the same directory, then rename it."""
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def save_sidecar(file_path, stress, strain, dimensions, source_hash=None, join_parts=False, labels=None):
+    """Persist a parsed curve as a binary sidecar of its source workbook.
+
+    The curve goes into a ``.npy`` file as a (2, n) array, stress first, so each row can
+    be memory-mapped as one contiguous array. A JSON header next to it records L, W, T,
+    the number of rows, the dtype, whether further sheets were joined to the curve and the
+    hash, size and modification time of the source file, and of its ``.specimen.json`` if
+    it has one, plus the header labels of the workbook if given (see
+    :meth:`App.LabelIndex.to_cells`). float32 curves stay float32; anything else is
+    stored as float64.
+    """
+    array_path, meta_path = get_sidecar_paths(file_path)
+    stress, strain = np.asarray(stress), np.asarray(strain)
+    curve = np.vstack([stress, strain]).astype(np.result_type(stress, strain, np.float32), copy=False)
+    stat = os.stat(file_path)
+    metadata = {
+        'version': SIDECAR_VERSION,
+        'source': os.path.basename(file_path),
+        'source_hash': source_hash or hash_source(file_path),
+        'source_size': stat.st_size,
+        'source_mtime_ns': stat.st_mtime_ns,
+        'dimensions_stat': _dimensions_stat(file_path),
+        'rows': curve.shape[1],
+        'dtype': str(curve.dtype),
+        'join_parts': join_parts,
+        'length': dimensions['length'],
+        'width': dimensions['width'],
+        'thickness': dimensions['thickness'],
+        'labels': labels,
+    }
+
+    _replace_atomically(array_path, lambda f: np.save(f, curve))
+    _replace_atomically(meta_path, lambda f: f.write(json.dumps(metadata, indent=2).encode('utf-8')))
+    return array_path
+
+
+def load_sidecar_metadata(file_path):
+    """Return the metadata of a workbook's sidecar, or None if it has none."""
+    _, meta_path = get_sidecar_paths(file_path)
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_sidecar_current(file_path, metadata):
+    """Check that a sidecar still describes the current content of its source workbook and dimensions file."""
+    if metadata is None or metadata.get('version') != SIDECAR_VERSION:
+        return False
+    stat = os.stat(file_path)
+    if stat.st_size != metadata['source_size']:
+        return False
+    if (stat.st_mtime_ns == metadata['source_mtime_ns']
+            and _dimensions_stat(file_path) == metadata.get('dimensions_stat')):
+        return True
+    # A file was touched; only the content decides whether the sidecar is stale
+    return hash_source(file_path) == metadata['source_hash']
+
+
+def load_sidecar_array(file_path):
+    """Open the sidecar of a workbook as one read-only memory-mapped (2, n) array.
+
+    Nothing is read from disk until the array is used. Returns (curve, metadata), or None
+    when the sidecar is missing or older than the workbook.
+    """
+    metadata = load_sidecar_metadata(file_path)
+    if not is_sidecar_current(file_path, metadata):
+        return None
+    array_path, _ = get_sidecar_paths(file_path)
+    try:
+        curve = np.load(array_path, mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    if curve.ndim != 2 or curve.shape != (2, metadata['rows']):
+        return None
+    return curve, metadata
+
+
+def load_sidecar(file_path):
+    """Open the sidecar of a workbook as read-only memory-mapped stress and strain arrays.
+
+    Returns (stress, strain, metadata), or None when the sidecar is missing or older than
+    the workbook.
+    """
+    loaded = load_sidecar_array(file_path)
+    if loaded is None:
+        return None
+    curve, metadata = loaded
+    return curve[0], curve[1], metadata
@@ -0,0 +1,8 @@
+from batch import analyse_workbook
+
+
+def test_unsaved_analysis_streams_the_workbook(sample_workbook):
+    result = analyse_workbook(sample_workbook, read_only=False, plot=False, profile=True, save=False)
+    stages = {stage['name'] for stage in result['stages']['stages']}
+    assert 'stream_excel' in stages and 'load_excel' not in stages
+    assert result['output'] is None and result['record']['rows'] == 18
@@ -0,0 +1,54 @@
+import json
+import os
+
+import numpy as np
+
+from App import AnalysisPipeline
+from cache import ResultCache, make_cache_key
+
+EXPORT = "Force (N),Stroke (mm)\n0,0\n10,0.1\n20,0.2\n30,0.3\n40,0.4\n"
+
+
+def write_export(tmp_path, length):
+    file_path = tmp_path / 'specimen.csv'
+    file_path.write_text(EXPORT)
+    (tmp_path / 'specimen.specimen.json').write_text(json.dumps({'length': length, 'width': 2, 'thickness': 4}))
+    return str(file_path)
+
+
+def analyse(file_path, cache=None, sidecar=False):
+    pipeline = AnalysisPipeline(file_path, cache=cache, sidecar=sidecar)
+    pipeline.calculate_maximum_stress()
+    return pipeline.results
+
+
+def test_cache_sees_changed_dimensions_file(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    file_path = write_export(tmp_path, 10)
+    assert analyse(file_path, cache)['max_stress'] == 2.0
+    write_export(tmp_path, 20)
+    results = analyse(file_path, cache)
+    assert results['length'] == 20 and results['max_stress'] == 1.0
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=1 << 30)
+    keys = [make_cache_key(str(n)) for n in range(4)]
+    for age, key in enumerate(keys[:3]):
+        cache.put(key, {'values': np.zeros(1000)}, {'n': age})
+        os.utime(cache._path(key), (1000 + age, 1000 + age))
+    size = os.path.getsize(cache._path(keys[0]))
+    assert cache.get(keys[0])[1] == {'n': 0}  # Read last, so the oldest entry is now keys[1]
+
+    cache.max_bytes = 3 * size
+    cache.put(keys[3], {'values': np.zeros(1000)}, {'n': 3})
+    assert cache.get(keys[1]) is None
+    assert all(cache.get(key) is not None for key in (keys[0], keys[2], keys[3]))
+
+
+def test_sidecar_sees_changed_dimensions_file(tmp_path):
+    file_path = write_export(tmp_path, 10)
+    assert analyse(file_path, sidecar=True)['max_stress'] == 2.0
+    write_export(tmp_path, 20)
+    results = analyse(file_path, sidecar=True)
+    assert results['length'] == 20 and results['max_stress'] == 1.0
@@ -0,0 +1,51 @@
+import shutil
+import threading
+
+import numpy as np
+import pytest
+
+from App import AnalysisCancelled, AnalysisPipeline, EnergyCurve, compute_energies
+
+
+def test_repeated_strain_is_integrated_once():
+    stress = np.array([0.0, 1.0, 1.2, 2.0, 3.0, 3.5])
+    strain = np.array([0.0, 0.5, 0.5, 1.0, 1.5, 2.0])
+    unique = np.array([True, True, False, True, True, True])
+    energy = EnergyCurve(stress, strain).energy_upto([100, 150, 200])
+    expected = EnergyCurve(stress[unique], strain[unique]).energy_upto([100, 150, 200])
+    np.testing.assert_array_equal(energy, expected)
+    assert np.all(np.isfinite(energy))
+
+
+def test_repeated_strain_after_sorting():
+    stress = np.array([0.0, 2.0, 1.0, 1.0, 3.0])
+    strain = np.array([0.0, 1.0, 0.5, 0.5, 1.5])
+    energies = compute_energies(stress, strain, [100, 150])
+    assert all(energy is not None and np.isfinite(energy) for energy in energies.values())
+
+
+def test_pipeline_with_repeated_stroke(tmp_path, sample_workbook):
+    import openpyxl
+
+    file_path = tmp_path / 'repeated.xlsx'
+    shutil.copy(sample_workbook, file_path)
+    workbook = openpyxl.load_workbook(file_path)
+    sheet = workbook.active
+    sheet['B6'] = sheet['B5'].value
+    workbook.save(file_path)
+
+    pipeline = AnalysisPipeline(str(file_path), output_layout='companion')
+    pipeline.run([step for step in AnalysisPipeline.STEPS if step != 'plot'])
+    assert np.isfinite(pipeline.results['energy'])
+
+
+def test_cancel_stops_the_next_stage(sample_workbook):
+    cancel_event = threading.Event()
+    pipeline = AnalysisPipeline(sample_workbook, read_only=True, cancel_event=cancel_event)
+    pipeline.calculate_stress_and_strain()
+    cancel_event.set()
+    with pytest.raises(AnalysisCancelled):
+        pipeline.calculate_energy_upto_strain()
+    with pytest.raises(AnalysisCancelled):
+        pipeline.calculate_compression_modulus()
+    assert pipeline.completed == ['stress_strain'] and pipeline.energy_curve is None
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from App import compute_energies, compute_energy_upto_strain, compute_stress_and_strain, find_best_modulus_window
+from benchmark import SPECIMEN, synthetic_curve
+from incremental import IncrementalAnalysis, StreamingAnalysis
+
+DIMENSIONS = (SPECIMEN['length'], SPECIMEN['width'], SPECIMEN['thickness'])
+
+
+def random_chunks(force, stroke, seed):
+    """Split a record at random points, including chunks of one or two rows."""
+    rng = np.random.default_rng(seed)
+    cuts = np.unique(rng.integers(1, len(force), size=rng.integers(1, 40)))
+    return zip(np.split(force, cuts), np.split(stroke, cuts))
+
+
+def batch_results(force, stroke):
+    stress, strain = compute_stress_and_strain(force, stroke, *DIMENSIONS)
+    return {
+        'max_stress': float(np.max(stress)),
+        'modulus_fit': find_best_modulus_window(stress, strain),
+        'energy': compute_energy_upto_strain(stress, strain),
+        'energies': compute_energies(stress, strain),
+    }
+
+
+def assert_same_results(results, expected):
+    assert results['max_stress'] == expected['max_stress']
+    assert results['energy'] == expected['energy']
+    assert results['energies'] == expected['energies']
+    fit, expected_fit = results['modulus_fit'], expected['modulus_fit']
+    assert (fit.start, fit.end) == (expected_fit.start, expected_fit.end)
+    assert fit.slope == pytest.approx(expected_fit.slope, rel=1e-12)
+
+
+def analyse(analysis, force, stroke, seed):
+    for force_chunk, stroke_chunk in random_chunks(force, stroke, seed):
+        analysis.append(force_chunk, stroke_chunk)
+    return analysis
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_incremental_matches_batch_for_random_chunkings(seed):
+    force, stroke = synthetic_curve(2000, seed)
+    analysis = analyse(IncrementalAnalysis(*DIMENSIONS), force, stroke, seed)
+    assert_same_results(analysis.snapshot(), batch_results(force, stroke))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_streaming_matches_batch_for_random_chunkings(seed):
+    force, stroke = synthetic_curve(2000, seed)
+    analysis = analyse(StreamingAnalysis(*DIMENSIONS), force, stroke, seed)
+    analysis.finish()
+    assert_same_results(analysis.results(), batch_results(force, stroke))
+
+
+def test_repeated_strain_matches_batch():
+    force, stroke = synthetic_curve(2000, 1)
+    stroke[1::7] = stroke[:-1:7]  # Every seventh reading repeats the stroke before it
+    incremental = analyse(IncrementalAnalysis(*DIMENSIONS), force, stroke, 1)
+    streaming = analyse(StreamingAnalysis(*DIMENSIONS), force, stroke, 1)
+    streaming.finish()
+    expected = batch_results(force, stroke)
+    assert incremental.skipped == streaming.skipped == len(stroke[1::7])
+    assert_same_results(incremental.snapshot(), expected)
+    assert_same_results(streaming.results(), expected)
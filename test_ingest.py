@@ -0,0 +1,23 @@
+import numpy as np
+
+from ingest import read_text_export
+
+DIMENSION_WORDS = ['Length, L', 'Width, W', 'Thickness, T']
+
+
+def test_decimal_commas_in_a_semicolon_export(tmp_path):
+    file_path = tmp_path / 'specimen.csv'
+    file_path.write_text("Length, L;26\nWidth, W;26,0\nThickness, T;21,5\n"
+                         "Force (N);Stroke (mm)\n0;0\n10,5;0,1\n20,25;0,2\n")
+    columns, dimensions = read_text_export(str(file_path), ['Force', 'Stroke'], DIMENSION_WORDS)
+    assert dimensions == {'Length, L': 26.0, 'Width, W': 26.0, 'Thickness, T': 21.5}
+    np.testing.assert_array_equal(columns['Force'], [0.0, 10.5, 20.25])
+    np.testing.assert_array_equal(columns['Stroke'], [0.0, 0.1, 0.2])
+
+
+def test_comma_export_keeps_decimal_points(tmp_path):
+    file_path = tmp_path / 'specimen.csv'
+    file_path.write_text("Thickness, T,21.5\nForce (N),Stroke (mm)\n0,0\n10.5,0.1\n")
+    columns, dimensions = read_text_export(str(file_path), ['Force', 'Stroke'], DIMENSION_WORDS)
+    assert dimensions == {'Thickness, T': 21.5}
+    np.testing.assert_array_equal(columns['Force'], [0.0, 10.5])
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from scipy.stats import linregress
+
+from App import find_best_modulus_window, read_stress_and_strain, sliding_window_regression
+
+
+def brute_force_windows(stress, strain, window_size):
+    """Fit every window with linregress and pick the best r, as the original loop did."""
+    fits = [linregress(strain[i:i + window_size], stress[i:i + window_size])
+            for i in range(len(strain) - window_size + 1)]
+    best, max_r = 0, -1
+    for i, fit in enumerate(fits):
+        if fit.rvalue > max_r:
+            best, max_r = i, fit.rvalue
+    return fits, best
+
+
+def make_curve(points=2000, seed=0):
+    """A toe, a linear region and a plateau, with measurement noise."""
+    rng = np.random.default_rng(seed)
+    strain = np.linspace(0, 60, points)
+    stress = np.where(strain < 2, 0.05 * strain ** 2, 0.2 + 0.2 * (strain - 2))
+    stress = np.minimum(stress, 1.5 + 0.01 * strain) + rng.normal(0, 0.005, points)
+    return stress, strain
+
+
+def assert_matches_linregress(stress, strain, window_size):
+    fits, best = brute_force_windows(stress, strain, window_size)
+    slope, intercept, r = sliding_window_regression(stress, strain, window_size)
+    assert slope == pytest.approx([fit.slope for fit in fits], rel=1e-9, abs=1e-9)
+    assert intercept == pytest.approx([fit.intercept for fit in fits], rel=1e-9, abs=1e-9)
+    assert r == pytest.approx([fit.rvalue for fit in fits], rel=1e-9, abs=1e-9)
+
+    fit = find_best_modulus_window(stress, strain, window_size)
+    assert (fit.start, fit.end) == (best, best + window_size)
+    assert fit.slope == pytest.approx(fits[best].slope, rel=1e-12)
+    assert fit.r == pytest.approx(fits[best].rvalue, rel=1e-12)
+
+
+@pytest.mark.parametrize('window_size', [3, 5, 10])
+def test_sample_windows_match_linregress(sample_workbook, window_size):
+    # The sample record is shorter than the default 50-point window
+    stress, strain = read_stress_and_strain(sample_workbook)
+    assert_matches_linregress(np.asarray(stress), np.asarray(strain), window_size)
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_synthetic_windows_match_linregress(seed):
+    assert_matches_linregress(*make_curve(seed=seed), 50)
@@ -0,0 +1,48 @@
+import pytest
+
+from App import ModulusFit
+from results_db import ResultsDatabase, make_record, parse_filter
+
+
+def make_results(max_stress, modulus, energies):
+    return {'length': 26.0, 'width': 26.0, 'thickness': 21.5, 'max_stress': max_stress, 'modulus': modulus,
+            'modulus_fit': ModulusFit(modulus, 0.0, 0.9, 10, 60), 'energy': energies[40],
+            'energy_strain_percentage': 40, 'energies': energies}
+
+
+@pytest.fixture
+def database(tmp_path):
+    with ResultsDatabase(str(tmp_path / 'results.sqlite')) as database:
+        database.upsert([
+            make_record(str(tmp_path / 'A1' / 'a.xlsx'), make_results(0.5, 0.04, {20: 1.0, 40: 2.0}), 100, 'ha'),
+            make_record(str(tmp_path / 'A1' / 'b.xlsx'), make_results(0.7, 0.06, {20: 1.5, 40: 3.0}), 100, 'hb'),
+            make_record(str(tmp_path / 'B2' / 'c.xlsx'), make_results(0.9, 0.03, {20: 2.5, 40: 4.0}), 100, 'hc'),
+        ])
+        yield database
+
+
+def test_query_filters(database):
+    assert [s['name'] for s in database.query([parse_filter('modulus<0.05')])] == ['a.xlsx', 'c.xlsx']
+    assert [s['name'] for s in database.query([parse_filter('lot=A1')], order_by='max_stress')] == ['a.xlsx', 'b.xlsx']
+    assert [s['name'] for s in database.query([parse_filter('energy_20>=1.5')])] == ['b.xlsx', 'c.xlsx']
+    specimen, = database.query([parse_filter('name=a.xlsx')])
+    assert specimen['energies'] == {20.0: 1.0, 40.0: 2.0}
+    assert specimen['modulus_r2'] == pytest.approx(0.81) and specimen['modulus_start'] == 10
+
+
+def test_upsert_replaces_a_reanalysed_file(database, tmp_path):
+    database.upsert([make_record(str(tmp_path / 'A1' / 'a.xlsx'), make_results(0.6, 0.05, {40: 2.2}), 120, 'ha2')])
+    specimen, = database.query([parse_filter('name=a.xlsx')])
+    assert specimen['max_stress'] == 0.6 and specimen['rows'] == 120
+    assert specimen['energies'] == {40.0: 2.2}
+    assert database.find_by_hash('ha') == [] and len(database.find_by_hash('ha2')) == 1
+    assert len(database.query()) == 3
+
+
+def test_query_rejects_unknown_columns(database):
+    with pytest.raises(ValueError):
+        database.query([parse_filter('colour=red')])
+    with pytest.raises(ValueError):
+        database.query([('modulus', '<', 'low')])
+    with pytest.raises(ValueError):
+        parse_filter('modulus')
@@ -0,0 +1,30 @@
+import shutil
+
+from batch import find_workbooks
+from series import SERIES_FILE, analyse_series
+
+
+def test_summaries_are_not_listed_as_specimens(tmp_path):
+    for name in ('a.xlsx', SERIES_FILE, 'batch_summary.xlsx', 'updated_a.xlsx', 'a_results.xlsx'):
+        (tmp_path / name).touch()
+    assert find_workbooks(str(tmp_path)) == [str(tmp_path / 'a.xlsx')]
+
+
+def test_failed_file_does_not_stop_the_series(tmp_path, sample_workbook):
+    import openpyxl
+
+    for name in ('a.xlsx', 'b.xlsx'):
+        shutil.copy(sample_workbook, tmp_path / name)
+    broken = tmp_path / 'broken.xlsx'
+    broken.write_bytes(b'not a workbook')
+    output_path = str(tmp_path / 'series_summary.xlsx')
+    messages = []
+
+    specimens, *_, errors = analyse_series([str(tmp_path / name) for name in ('a.xlsx', 'broken.xlsx', 'b.xlsx')],
+                                           output_path, workers=1, plot=False, progress=messages.append)
+    assert [specimen.name for specimen in specimens] == ['a.xlsx', 'b.xlsx']
+    assert [file_path for file_path, _ in errors] == [str(broken)]
+    assert any(message.startswith('broken.xlsx: Error') for message in messages)
+
+    rows = list(openpyxl.load_workbook(output_path)['Series'].values)
+    assert rows[4][0] == 'broken.xlsx' and rows[4][-1] == errors[0][1]
@@ -0,0 +1,41 @@
+import threading
+
+import pytest
+
+from service import AnalysisService, analyse_remote, get_upload_options, make_server
+
+
+@pytest.fixture
+def service_url(tmp_path):
+    service = AnalysisService(workers=1, cache_dir=str(tmp_path / 'cache'))
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}', service
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+
+def test_upload_is_analysed_once(service_url, sample_workbook, tmp_path):
+    url, service = service_url
+    first = analyse_remote(sample_workbook, url, str(tmp_path), plot=0)
+    assert not first['cached'] and first['results']['thickness'] == 21.5
+    assert 'png' not in first and open(first['xlsx'], 'rb').read(2) == b'PK'
+
+    second = analyse_remote(sample_workbook, url, plot=0)
+    assert second['cached'] and second['id'] == first['id']
+    assert second['results'] == first['results']
+    assert analyse_remote(sample_workbook, url, plot=0, modulus_span=1)['id'] != first['id']
+    assert service.status()['analysed'] == 2 and service.status()['cached'] == 1
+
+
+def test_bad_uploads_are_rejected(service_url, tmp_path):
+    url, service = service_url
+    file_path = tmp_path / 'notes.txt.bak'
+    file_path.write_text("not a record")
+    with pytest.raises(RuntimeError, match="Unsupported file type"):
+        analyse_remote(str(file_path), url)
+    with pytest.raises(ValueError):
+        get_upload_options({'dtype': 'int8'})
+    assert service.status()['requests'] == 0
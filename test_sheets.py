@@ -0,0 +1,95 @@
+import os
+import shutil
+
+import pytest
+
+import numpy as np
+
+from App import AnalysisPipeline, LabelIndex, iter_excel_chunks, load_excel, read_workbook_data, stream_excel
+from batch import find_workbooks
+from benchmark import generate_workbook
+from cache import ResultCache
+
+
+def add_sheet(tmp_path, sample_workbook):
+    import openpyxl
+
+    file_path = tmp_path / 'sheets.xlsx'
+    shutil.copy(sample_workbook, file_path)
+    workbook = openpyxl.load_workbook(file_path)
+    sheet = workbook.create_sheet('Other test')
+    sheet.append(['Force', 'Stroke'])
+    for row in ([1.0, 0.1], [2.0, 0.2], [3.0, 0.3]):
+        sheet.append(row)
+    workbook.save(file_path)
+    return str(file_path)
+
+
+def count_rows(file_path, read_only=False, join_parts=False, cache=None, sidecar=False):
+    pipeline = AnalysisPipeline(file_path, read_only=read_only, output_layout='companion', cache=cache,
+                                sidecar=sidecar, join_parts=join_parts)
+    return len(pipeline.calculate_stress_and_strain()[0])
+
+
+@pytest.mark.parametrize('read_only', [False, True])
+def test_further_sheets_are_only_joined_on_request(tmp_path, sample_workbook, read_only):
+    file_path = add_sheet(tmp_path, sample_workbook)
+    rows = count_rows(sample_workbook, read_only)
+    assert count_rows(file_path, read_only) == rows
+    assert count_rows(file_path, read_only, join_parts=True) == rows + 3
+
+
+@pytest.mark.parametrize('read_only', [False, True])
+def test_part_files_are_only_joined_on_request(tmp_path, sample_workbook, read_only):
+    for name in ('record.xlsx', 'record_part2.xlsx'):
+        shutil.copy(sample_workbook, tmp_path / name)
+    file_path = str(tmp_path / 'record.xlsx')
+    rows = count_rows(file_path, read_only)
+    assert count_rows(file_path, read_only, join_parts=True) == 2 * rows
+
+
+def test_part_files_are_listed_unless_their_record_is(tmp_path):
+    for name in ('record.xlsx', 'record_part2.xlsx', 'foam_part2.xlsx'):
+        (tmp_path / name).touch()
+    names = [os.path.basename(path) for path in find_workbooks(str(tmp_path), join_parts=True)]
+    assert names == ['foam_part2.xlsx', 'record.xlsx']
+    assert len(find_workbooks(str(tmp_path))) == 3
+
+
+def test_short_write_only_workbook_streams(tmp_path):
+    # Write-only workbooks record no sheet size, so the end of the rows must close the header region
+    file_path = generate_workbook(str(tmp_path / 'short.xlsx'), 20)
+    index, columns = stream_excel(file_path)
+    assert index.value_below('Thickness, T') is not None
+    assert len(columns['Force']) == len(columns['Stroke']) == 20
+
+
+def test_blank_cells_drop_the_whole_row(tmp_path):
+    import openpyxl
+
+    file_path = generate_workbook(str(tmp_path / 'gaps.xlsx'), 300)
+    workbook = openpyxl.load_workbook(file_path)
+    sheet = workbook.active
+    positions = LabelIndex.from_sheet(sheet).positions(['Force', 'Stroke'])
+    (force_row, force_column), = positions['Force']
+    (_, stroke_column), = positions['Stroke']
+    sheet.cell(row=force_row + 10, column=force_column).value = None
+    sheet.cell(row=force_row + 200, column=stroke_column).value = 'n/a'
+    workbook.save(file_path)
+
+    chunks = list(iter_excel_chunks(file_path, chunk_rows=64))[1:]
+    assert all(len(chunk['Force']) == len(chunk['Stroke']) for chunk in chunks)
+    workbook = load_excel(file_path)
+    expected = read_workbook_data(workbook, LabelIndex.from_sheet(workbook.active).positions(['Force', 'Stroke']))
+    assert len(expected['Force']) == len(expected['Stroke']) == 298
+    for word in ('Force', 'Stroke'):
+        np.testing.assert_array_equal(np.concatenate([chunk[word] for chunk in chunks]), expected[word])
+
+
+def test_cache_and_sidecar_keep_joined_curves_apart(tmp_path, sample_workbook):
+    file_path = add_sheet(tmp_path, sample_workbook)
+    cache = ResultCache(str(tmp_path / 'cache'))
+    rows = count_rows(file_path, cache=cache, sidecar=True)
+    assert count_rows(file_path, join_parts=True, cache=cache) == rows + 3
+    assert count_rows(file_path, join_parts=True, sidecar=True) == rows + 3
+    assert count_rows(file_path, cache=cache, sidecar=True) == rows
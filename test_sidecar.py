@@ -0,0 +1,61 @@
+import os
+import shutil
+
+import numpy as np
+
+import App
+from App import AnalysisPipeline, LabelIndex
+from sidecar import get_sidecar_paths, load_sidecar, save_sidecar
+
+DIMENSIONS = {'length': 26.0, 'width': 26.0, 'thickness': 21.5}
+
+
+def test_sidecar_round_trip(tmp_path):
+    file_path = tmp_path / 'specimen.csv'
+    file_path.write_text("Force,Stroke\n0,0\n")
+    stress, strain = np.linspace(0, 1, 100, dtype=np.float32), np.linspace(0, 5, 100, dtype=np.float32)
+    save_sidecar(str(file_path), stress, strain, DIMENSIONS)
+    loaded_stress, loaded_strain, metadata = load_sidecar(str(file_path))
+    assert isinstance(loaded_stress, np.memmap) and loaded_stress.dtype == np.float32
+    assert np.array_equal(loaded_stress, stress) and np.array_equal(loaded_strain, strain)
+    assert metadata['rows'] == 100 and metadata['thickness'] == 21.5
+
+
+def test_sidecar_follows_source_content(tmp_path):
+    file_path = tmp_path / 'specimen.csv'
+    file_path.write_text("Force,Stroke\n0,0\n")
+    save_sidecar(str(file_path), np.zeros(3), np.zeros(3), DIMENSIONS)
+    os.utime(file_path, (0, 0))
+    assert load_sidecar(str(file_path)) is not None  # Touched but unchanged
+    file_path.write_text("Force,Stroke\n1,0\n")
+    assert load_sidecar(str(file_path)) is None
+
+
+def test_pipeline_reuses_sidecar(tmp_path, sample_workbook):
+    file_path = str(tmp_path / 'specimen.xlsx')
+    shutil.copy(sample_workbook, file_path)
+    first = AnalysisPipeline(file_path, sidecar=True)
+    first.calculate_stress_and_strain()
+    assert first.workbook is not None
+    assert all(os.path.exists(path) for path in get_sidecar_paths(file_path))
+
+    second = AnalysisPipeline(file_path, sidecar=True)
+    second.calculate_stress_and_strain()
+    assert second.workbook is None  # Read from the sidecar without opening the workbook
+    assert np.array_equal(second.stress, first.stress) and np.array_equal(second.strain, first.strain)
+
+
+def test_sidecar_keeps_the_label_index(tmp_path, sample_workbook, monkeypatch):
+    file_path = str(tmp_path / 'specimen.xlsx')
+    shutil.copy(sample_workbook, file_path)
+    first = AnalysisPipeline(file_path, sidecar=True)
+    first.calculate_stress_and_strain()
+
+    monkeypatch.setattr(App, '_label_index_cache', {})  # As in a new process
+    monkeypatch.setattr(LabelIndex, 'from_sheet', None)
+    second = AnalysisPipeline(file_path, sidecar=True)
+    second.calculate_stress_and_strain()
+    second.calculate_maximum_stress()
+    second.open()
+    assert second.index.labels == first.index.labels
+    assert second.index.value_below('Thickness, T') == 21.5
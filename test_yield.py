@@ -0,0 +1,60 @@
+import json
+
+import numpy as np
+import pytest
+
+from App import AnalysisPipeline, compute_stress_and_strain, compute_yield, compute_yield_batch
+from benchmark import SPECIMEN, synthetic_curve
+
+
+def foam_curve(rows):
+    force, stroke = synthetic_curve(rows)
+    stress, strain = compute_stress_and_strain(force, stroke, SPECIMEN['length'], SPECIMEN['width'],
+                                               SPECIMEN['thickness'])
+    return np.asarray(stress), np.asarray(strain)
+
+
+@pytest.mark.parametrize('rows', [1000, 10000])
+@pytest.mark.parametrize('strain_span', [None, 1.0, 2.0])
+def test_foam_yield_comes_from_the_initial_rise(rows, strain_span):
+    stress, strain = foam_curve(rows)
+    result = compute_yield(stress, strain, strain_span=strain_span)
+    assert strain[result.fit.end - 1] < 20
+    assert result.toe_strain < 0.5
+    assert result.yield_strain is not None and result.yield_strain < 10
+    assert result.plateau_stress is not None
+
+
+def test_loading_region_ends_at_the_first_peak():
+    strain = np.linspace(0, 40, 801)
+    stress = np.where(strain < 5, 0.1 * strain, 0.5 - 0.02 * (strain - 5))
+    stress = np.where(strain > 25, stress + 0.2 * (strain - 25), stress)
+    result = compute_yield(stress, strain, strain_span=1.0)
+    assert strain[result.fit.end - 1] <= 5
+    assert result.fit.slope == pytest.approx(0.1)
+    assert result.toe_strain == pytest.approx(0.0, abs=1e-9)
+
+
+def test_defaults_match_the_pipeline(tmp_path):
+    force, stroke = synthetic_curve(2000)
+    file_path = tmp_path / 'foam.csv'
+    file_path.write_text("Force,Stroke\n" + "".join(f"{f},{s}\n" for f, s in zip(force, stroke)))
+    (tmp_path / 'foam.specimen.json').write_text(json.dumps(SPECIMEN))
+    pipeline = AnalysisPipeline(str(file_path))
+    pipeline.calculate_stress_and_strain()
+    pipeline.calculate_yield()
+    assert len(pipeline.stress) == 2000
+    result = compute_yield(np.asarray(pipeline.stress), np.asarray(pipeline.strain))
+    assert result.fit == pipeline.results['yield_fit']
+    assert result.toe_strain == pipeline.results['toe_strain']
+    assert result.yield_stress == pipeline.results['yield_stress']
+
+
+def test_batch_matches_single_curves():
+    curves = [foam_curve(1000), foam_curve(3000)]
+    for strain_span in (None, 1.0):
+        batch = compute_yield_batch(curves, strain_span=strain_span)
+        for (stress, strain), result in zip(curves, batch):
+            single = compute_yield(stress, strain, strain_span=strain_span)
+            assert result[:4] == single[:4]
+            assert result.plateau_stress == pytest.approx(single.plateau_stress, rel=1e-12)